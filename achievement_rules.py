@@ -0,0 +1,57 @@
+from typing import Iterable, List
+
+# Catálogo dos achievements: tipo -> (bit na máscara, nome gravado, descrição)
+# A máscara (players.achievements_mask) guarda o conjunto desbloqueado num único inteiro.
+ACHIEVEMENTS = {
+    'default': (1 << 0, 'Membro Verificado', 'Se registrou no bot'),
+    'first_win': (1 << 1, '🎯 Primeira Vitória', 'Vença sua primeira partida'),
+    'win_streak_3': (1 << 2, '🔥 Win Streak 3', 'Vença 3 partidas consecutivas'),
+    'win_streak_5': (1 << 3, '🌟 Win Streak 5', 'Vença 5 partidas consecutivas'),
+    'rating_1500': (1 << 4, '⭐ Rating 1500+', 'Atinja rating de 1500 ou mais'),
+    'rating_1800': (1 << 5, '👑 Rating 1800+', 'Atinja rating de 1800 ou mais'),
+    'tournament_winner': (1 << 6, 'Campeão', 'Vença um torneio'),
+    'head_to_head_5': (1 << 7, '🎪 Rival', 'Jogue 5 partidas contra o mesmo adversário'),
+}
+
+ACHIEVEMENT_BITS = {achievement_type: info[0] for achievement_type, info in ACHIEVEMENTS.items()}
+
+# Regras avaliadas a cada partida, sobre o evento em memória:
+# {'result': 'win'|'loss'|'draw', 'rating': rating no modo após a partida,
+#  'win_streak': sequência atual de vitórias (já contando esta partida), 'h2h_games': partidas contra o adversário}
+ACHIEVEMENT_RULES = (
+    ('first_win', lambda event: event['result'] == 'win'),
+    ('win_streak_3', lambda event: event['win_streak'] >= 3),
+    ('win_streak_5', lambda event: event['win_streak'] >= 5),
+    ('rating_1500', lambda event: (event.get('rating') or 0) >= 1500),
+    ('rating_1800', lambda event: (event.get('rating') or 0) >= 1800),
+    ('head_to_head_5', lambda event: (event.get('h2h_games') or 0) >= 5),
+)
+
+_RULES = tuple((achievement_type, ACHIEVEMENT_BITS[achievement_type], rule) for achievement_type, rule in ACHIEVEMENT_RULES)
+
+
+def mask_of(achievement_types: Iterable[str]) -> int:
+    """Máscara de bits de um conjunto de tipos (tipos desconhecidos são ignorados)."""
+    mask = 0
+    for achievement_type in achievement_types:
+        mask |= ACHIEVEMENT_BITS.get(achievement_type, 0)
+    return mask
+
+
+def mask_case_sql(column: str = 'achievement_type') -> str:
+    """Expressão SQL com o bit de cada tipo; SUM() dela por jogador dá a máscara (tipos são únicos por jogador)."""
+    cases = " ".join(f"WHEN '{achievement_type}' THEN {bit}" for achievement_type, bit in ACHIEVEMENT_BITS.items())
+    return f"CASE {column} {cases} ELSE 0 END"
+
+
+def next_win_streak(win_streak: int, result: str) -> int:
+    """Sequência de vitórias após a partida: vitória soma, empate ou derrota zera."""
+    return (win_streak or 0) + 1 if result == 'win' else 0
+
+
+def evaluate(event: dict, unlocked_mask: int = 0) -> List[str]:
+    """Tipos que a partida desbloqueia. Regras já desbloqueadas na máscara nem são avaliadas."""
+    return [
+        achievement_type for achievement_type, bit, rule in _RULES
+        if not unlocked_mask & bit and rule(event)
+    ]
@@ -0,0 +1,195 @@
+"""
+Concede retroativamente todos os achievements a todos os jogadores (ex: após criar um tipo novo).
+
+Uma passada em streaming pelo game_history, em ordem de played_at, reavalia as regras de
+achievement_rules partida a partida (sequências de vitórias e confrontos diretos reconstruídos em
+memória). Depois cada jogador recebe um evento final com o estado das tabelas (rating atual, pico do
+rating_history e head_to_head). As conquistas vão para uma tabela temporária e entram de uma vez com
+INSERT OR IGNORE ... SELECT; máscaras e sequências são recalculadas na mesma transação.
+
+Uso:
+    python backfill_achievements.py           # dry-run: mostra o que seria concedido e desfaz
+    python backfill_achievements.py --apply   # grava
+"""
+import argparse
+import time
+
+import database
+from achievement_rules import ACHIEVEMENT_BITS, ACHIEVEMENTS, evaluate, mask_case_sql, next_win_streak
+from bracket_seeding import RATING_MODES
+
+BATCH_SIZE = 5000
+PROGRESS_EVERY = 20000
+
+
+def _player_result(game, player_id: str) -> str:
+    """Resultado da partida do ponto de vista do jogador (None se não reconhecido)."""
+    if game['winner_id']:
+        return 'win' if game['winner_id'] == player_id else 'loss'
+    return 'draw' if game['result'] == 'draw' else None
+
+
+def scan_games(conn, progress=print):
+    """
+    Reavalia as regras em cada partida do histórico.
+
+    Retorna (unlocks, players): unlocks é um set de (player_id, tipo) e players é
+    {player_id: {'mask', 'win_streak', 'best_win_streak'}} para quem aparece no histórico.
+    """
+    players = {}
+    h2h_games = {}
+    unlocks = set()
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT player1_id, player2_id, winner_id, result, player1_rating_after, player2_rating_after
+        FROM game_history
+        ORDER BY played_at, id
+    """)
+    scanned = 0
+    while True:
+        rows = cursor.fetchmany(BATCH_SIZE)
+        if not rows:
+            break
+        for game in rows:
+            player1_id, player2_id = game['player1_id'], game['player2_id']
+            if not player1_id or not player2_id or player1_id == player2_id:
+                continue
+            pair = (min(player1_id, player2_id), max(player1_id, player2_id))
+            h2h_games[pair] = h2h_games.get(pair, 0) + 1
+
+            for player_id, rating in ((player1_id, game['player1_rating_after']), (player2_id, game['player2_rating_after'])):
+                result = _player_result(game, player_id)
+                if result is None:
+                    continue
+                state = players.setdefault(player_id, {'mask': 0, 'win_streak': 0, 'best_win_streak': 0})
+                state['win_streak'] = next_win_streak(state['win_streak'], result)
+                state['best_win_streak'] = max(state['best_win_streak'], state['win_streak'])
+                event = {'result': result, 'rating': rating, 'win_streak': state['win_streak'], 'h2h_games': h2h_games[pair]}
+                for achievement_type in evaluate(event, state['mask']):
+                    state['mask'] |= ACHIEVEMENT_BITS[achievement_type]
+                    unlocks.add((player_id, achievement_type))
+
+        scanned += len(rows)
+        if scanned % PROGRESS_EVERY < BATCH_SIZE:
+            progress(f"  ... {scanned} partidas processadas")
+
+    progress(f"📜 {scanned} partidas lidas do histórico, {len(players)} jogadores")
+    return unlocks, players
+
+
+def evaluate_current_state(conn, players: dict, unlocks: set):
+    """Evento final por jogador com o estado atual: maior rating (atual ou pico) e maior confronto direto."""
+    rating_expr = "MAX(" + ", ".join(f"COALESCE(rating_{mode}, 0)" for mode in RATING_MODES) + ")"
+    rows = conn.execute(f"""
+        SELECT p.discord_id,
+               MAX({rating_expr}, COALESCE((SELECT MAX(rating) FROM rating_history rh WHERE rh.player_id = p.discord_id), 0)) AS rating,
+               (SELECT MAX(player1_wins + player2_wins + draws) FROM head_to_head h
+                WHERE h.player1_id = p.discord_id OR h.player2_id = p.discord_id) AS h2h_games
+        FROM players p
+    """).fetchall()
+
+    for row in rows:
+        state = players.get(row['discord_id']) or {'mask': 0, 'win_streak': 0}
+        event = {'result': None, 'rating': row['rating'], 'win_streak': state['win_streak'], 'h2h_games': row['h2h_games']}
+        for achievement_type in evaluate(event, state['mask']):
+            unlocks.add((row['discord_id'], achievement_type))
+    return len(rows)
+
+
+def achievement_counts(conn) -> dict:
+    return {row[0]: row[1] for row in conn.execute("SELECT achievement_type, COUNT(*) FROM achievements GROUP BY achievement_type")}
+
+
+def write_backfill(conn, unlocks: set, players: dict):
+    """Grava tudo com SQL em conjunto (a transação é controlada por quem chama)."""
+    cursor = conn.cursor()
+    cursor.execute("CREATE TEMP TABLE backfill_catalog (achievement_type TEXT PRIMARY KEY, achievement_name TEXT, description TEXT)")
+    cursor.executemany(
+        "INSERT INTO backfill_catalog VALUES (?, ?, ?)",
+        [(achievement_type, name, description) for achievement_type, (_, name, description) in ACHIEVEMENTS.items()]
+    )
+    cursor.execute("CREATE TEMP TABLE backfill_unlocks (player_id TEXT, achievement_type TEXT)")
+    cursor.executemany("INSERT INTO backfill_unlocks VALUES (?, ?)", sorted(unlocks))
+
+    # Regras avaliadas em memória
+    cursor.execute("""
+        INSERT OR IGNORE INTO achievements (player_id, achievement_type, achievement_name, description)
+        SELECT u.player_id, u.achievement_type, c.achievement_name, c.description
+        FROM backfill_unlocks u
+        JOIN backfill_catalog c ON c.achievement_type = u.achievement_type
+        JOIN players p ON p.discord_id = u.player_id
+    """)
+    # Regras que não dependem de partidas: registro no bot e campeões de torneio
+    cursor.execute("""
+        INSERT OR IGNORE INTO achievements (player_id, achievement_type, achievement_name, description)
+        SELECT p.discord_id, c.achievement_type, c.achievement_name, c.description
+        FROM players p JOIN backfill_catalog c ON c.achievement_type = 'default'
+    """)
+    cursor.execute("""
+        INSERT OR IGNORE INTO achievements (player_id, achievement_type, achievement_name, description)
+        SELECT DISTINCT t.winner_id, c.achievement_type, c.achievement_name, c.description
+        FROM tournaments t
+        JOIN players p ON p.discord_id = t.winner_id
+        JOIN backfill_catalog c ON c.achievement_type = 'tournament_winner'
+        WHERE t.status = 'finished'
+    """)
+
+    cursor.execute(f"""
+        UPDATE players SET achievements_mask = (
+            SELECT COALESCE(SUM({mask_case_sql()}), 0)
+            FROM achievements WHERE achievements.player_id = players.discord_id
+        )
+    """)
+    cursor.executemany(
+        "UPDATE players SET win_streak = ?, best_win_streak = MAX(COALESCE(best_win_streak, 0), ?) WHERE discord_id = ?",
+        [(state['win_streak'], state['best_win_streak'], player_id) for player_id, state in players.items()]
+    )
+    cursor.execute("DROP TABLE backfill_unlocks")
+    cursor.execute("DROP TABLE backfill_catalog")
+
+
+def backfill(conn, apply: bool = False, progress=print) -> dict:
+    """Executa o backfill numa única transação (desfeita sem apply). Retorna {tipo: quantidade concedida}."""
+    before = achievement_counts(conn)
+    conn.execute("BEGIN")
+    try:
+        unlocks, players = scan_games(conn, progress)
+        total_players = evaluate_current_state(conn, players, unlocks)
+        progress(f"🧮 Regras avaliadas para {total_players} jogadores ({len(unlocks)} conquistas candidatas)")
+        write_backfill(conn, unlocks, players)
+        after = achievement_counts(conn)
+        if apply:
+            conn.commit()
+        else:
+            conn.rollback()
+    except Exception:
+        conn.rollback()
+        raise
+    return {achievement_type: after[achievement_type] - before.get(achievement_type, 0)
+            for achievement_type in after if after[achievement_type] != before.get(achievement_type, 0)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concede retroativamente os achievements a todos os jogadores.")
+    parser.add_argument('--apply', action='store_true', help="Grava o resultado (sem isso é só dry-run)")
+    args = parser.parse_args()
+
+    conn = database.get_conn()
+    try:
+        started = time.perf_counter()
+        granted = backfill(conn, args.apply)
+        elapsed = time.perf_counter() - started
+        print(f"🏆 Backfill em {elapsed:.2f}s")
+        if not granted:
+            print("✅ Nenhum achievement pendente.")
+        for achievement_type, count in sorted(granted.items()):
+            print(f"  {ACHIEVEMENTS.get(achievement_type, (0, achievement_type))[1]:<24} +{count}")
+        if not args.apply:
+            print("ℹ️ Dry-run: nada foi gravado. Use --apply para aplicar.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+from typing import List, Optional, Sequence, Tuple
+
+# Modos com coluna de rating própria em players (rating_<modo>)
+RATING_MODES = ('bullet', 'blitz', 'rapid', 'classic')
+
+
+def bracket_size(num_players: int) -> int:
+    """Menor potência de 2 que comporta todos os jogadores."""
+    size = 1
+    while size < num_players:
+        size *= 2
+    return size
+
+
+def seed_order(size: int) -> List[int]:
+    """
+    Ordem padrão das seeds no bracket (1 x N, com as melhores seeds se encontrando só no fim).
+
+    Ex: seed_order(8) -> [1, 8, 4, 5, 2, 7, 3, 6]; partidas = pares consecutivos.
+    """
+    order = [1]
+    while len(order) < size:
+        total = len(order) * 2 + 1
+        order = [seed for top in order for seed in (top, total - top)]
+    return order
+
+
+def build_first_round(seeded_player_ids: Sequence[str]) -> List[Tuple[int, str, Optional[str]]]:
+    """
+    Monta a primeira rodada a partir dos jogadores já ordenados por seed (melhor primeiro).
+
+    Retorna [(match_number, player1_id, player2_id)] na ordem do bracket. Seeds acima do número
+    de jogadores viram byes (player2_id None) e caem sempre contra as melhores seeds, espalhadas
+    pelas duas metades do bracket. O vencedor da partida 2m-1 enfrenta o da partida 2m.
+    """
+    num_players = len(seeded_player_ids)
+    if num_players < 2:
+        return []
+
+    order = seed_order(bracket_size(num_players))
+    matches = []
+    for i in range(0, len(order), 2):
+        seed1, seed2 = order[i], order[i + 1]
+        player1_id = seeded_player_ids[seed1 - 1]
+        player2_id = seeded_player_ids[seed2 - 1] if seed2 <= num_players else None
+        matches.append((i // 2 + 1, player1_id, player2_id))
+    return matches
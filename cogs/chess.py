@@ -18,7 +18,7 @@ import stockfish_analysis
 from datetime import datetime
 
 # Importar configurações de achievements de statistics.py
-from cogs.statistics import ACHIEVEMENTS_CONFIG, HistoryView, get_mode_emoji
+from cogs.statistics import ACHIEVEMENTS_CONFIG, HistoryView, format_rivalry_line, get_mode_emoji, player_agg_fields
 from typing import Optional
 
 logger = logging.getLogger(__name__)
@@ -129,6 +129,19 @@ class PerfilView(View):
         except Exception as e:
             logger.warning(f"Não foi possível buscar achievements para o perfil de {self.target_id}: {e}")
 
+        try:
+            rivalries = await database.get_rivalries(str(self.target_id), limit=3)
+            if rivalries:
+                embed.add_field(name="⚔️ ➜ Rivais", value="\n".join(format_rivalry_line(r) for r in rivalries), inline=False)
+        except Exception as e:
+            logger.warning(f"Não foi possível buscar rivais para o perfil de {self.target_id}: {e}")
+
+        try:
+            for name, value in player_agg_fields(await database.get_player_stats_agg(str(self.target_id))):
+                embed.add_field(name=name, value=value, inline=False)
+        except Exception as e:
+            logger.warning(f"Não foi possível buscar estatísticas agregadas para o perfil de {self.target_id}: {e}")
+
         if player['lichess_username']:
             embed.add_field(name="", value=f"<:perfil:1434606210212036819> [{player['lichess_username']}](https://lichess.org/@/{player['lichess_username']})", inline=False)
 
@@ -221,7 +234,7 @@ class PerfilView(View):
 
     @discord.ui.button(label="Histórico", style=discord.ButtonStyle.primary, custom_id="perfil_history", row=1)
     async def history_button(self, interaction: discord.Interaction, button: Button):
-        history_view = HistoryView(self.bot, self.author_id, self.target_id, page=0)
+        history_view = HistoryView(self.bot, self.author_id, self.target_id)
         await history_view.show_history(interaction, is_new_message=True)
 
     @discord.ui.button(label="Fechar", style=discord.ButtonStyle.danger, custom_id="perfil_close", row=1)
@@ -1368,6 +1381,19 @@ class Chess(commands.Cog):
                     embed.add_field(name="🏅 ➜ Achievements", value=badges_str, inline=False)
         except Exception as e:
             logger.warning(f"Não foi possível buscar achievements para o perfil de {discord_id}: {e}")
+
+        try:
+            rivalries = await database.get_rivalries(discord_id, limit=3)
+            if rivalries:
+                embed.add_field(name="⚔️ ➜ Rivais", value="\n".join(format_rivalry_line(r) for r in rivalries), inline=False)
+        except Exception as e:
+            logger.warning(f"Não foi possível buscar rivais para o perfil de {discord_id}: {e}")
+
+        try:
+            for name, value in player_agg_fields(await database.get_player_stats_agg(discord_id)):
+                embed.add_field(name=name, value=value, inline=False)
+        except Exception as e:
+            logger.warning(f"Não foi possível buscar estatísticas agregadas para o perfil de {discord_id}: {e}")
             
         if player['lichess_username']:
             embed.add_field(name="", value=f"<:perfil:1434606210212036819> [{player['lichess_username']}](https://lichess.org/@/{player['lichess_username']})", inline=False)
@@ -1376,6 +1402,68 @@ class Chess(commands.Cog):
         
         await interaction.response.send_message(embed=embed, view=view)
 
+    @app_commands.command(name="analisar", description="Analisa uma partida do Lichess com o Stockfish do bot.")
+    @app_commands.describe(partida="URL da partida no Lichess (deixe em branco para a sua última partida).")
+    async def analisar(self, interaction: discord.Interaction, partida: str = None):
+        """Análise pós-partida no pool de engines do bot (posições repetidas saem do cache)."""
+        await interaction.response.defer(thinking=True)
+
+        game_url = partida
+        if not game_url:
+            recent = await database.get_player_game_page(str(interaction.user.id), limit=5)
+            game_url = next((game['game_url'] for game in recent if game.get('game_url') and _extract_game_id(game['game_url'])), None)
+        game_id = _extract_game_id(game_url) if game_url else None
+        if not game_id:
+            await interaction.followup.send("❌ Informe a URL de uma partida do Lichess (não encontrei nenhuma partida sua com link).")
+            return
+
+        pgn = await lichess_api.get_game_pgn(game_id)
+        start_fen, moves, chess960 = stockfish_analysis.moves_from_pgn(pgn) if pgn else (None, None, False)
+        if not moves:
+            await interaction.followup.send("❌ Não consegui obter os lances dessa partida no Lichess.")
+            return
+        if chess960:
+            # As engines do pool rodam sem UCI_Chess960 (roques em notação padrão)
+            await interaction.followup.send("❌ A análise local ainda não suporta partidas de Chess960.")
+            return
+
+        try:
+            analysis = await stockfish_analysis.analyze_game_with_engine(
+                moves, interaction.user.id, fen=start_fen, depth=stockfish_analysis.ANALYSIS_DEPTH
+            )
+        except Exception as e:
+            logger.error(f"Erro ao analisar a partida {game_id}: {e}", exc_info=True)
+            await interaction.followup.send("❌ Erro ao analisar a partida. Tente novamente mais tarde.")
+            return
+        if analysis is None:
+            await interaction.followup.send("❌ A análise local não está disponível (Stockfish não configurado).")
+            return
+
+        summary = stockfish_analysis.summarize_analysis(analysis)
+        embed = discord.Embed(
+            title="🔍 ➜ Análise da Partida",
+            description=f"[Partida {game_id}](https://lichess.org/{game_id}) • {len(moves)} meios-lances • profundidade {stockfish_analysis.ANALYSIS_DEPTH}",
+            color=0xCD0000
+        )
+        for color, label in (('white', "⚪ ➜ Brancas"), ('black', "⚫ ➜ Pretas")):
+            side = summary[color]
+            embed.add_field(
+                name=label,
+                value=(f"🎯 Melhor lance: **{side['best']}/{side['moves']}**\n"
+                       f"⚠️ Imprecisões: **{side['inaccuracies']}**\n"
+                       f"❌ Erros: **{side['mistakes']}**\n"
+                       f"💥 Erros graves: **{side['blunders']}**"),
+                inline=True
+            )
+        if summary['worst']:
+            lines = [
+                f"{(move['ply'] + 1) // 2}{'.' if move['color'] == 'white' else '...'} `{move['move']}` "
+                f"(-{move['loss'] / 100:.1f})" + (f" • melhor: `{move['best_move']}`" if move['best_move'] else "")
+                for move in summary['worst']
+            ]
+            embed.add_field(name="📉 ➜ Piores Lances", value="\n".join(lines), inline=False)
+        await interaction.followup.send(embed=embed)
+
     @app_commands.command(name="agendar-partida", description="[ADMIN] Agenda um desafio programado entre dois jogadores.")
     @app_commands.describe(
         jogador1="Primeiro jogador da partida",
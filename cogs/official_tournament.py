@@ -6,8 +6,15 @@ from discord.ui import View, Button
 import logging
 import database
 import asyncio
-from typing import Literal
+from tournament_formats import FORMAT_ARENA, FORMAT_KNOCKOUT, FORMAT_ROUND_ROBIN
+from cogs.tournaments import participant_rating, resolve_display_names
+from typing import Literal, Optional
 import io
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 try:
     from PIL import Image, ImageDraw, ImageFont
     HAS_PIL = True
@@ -16,148 +23,253 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
-async def get_player_rating(discord_id: str, mode: str) -> int:
-    """Busca o rating de um jogador para um modo específico."""
+# Opções do comando /torneio_oficial criar -> formato salvo em tournaments.format
+FORMAT_CHOICES = {
+    "eliminatoria": FORMAT_KNOCKOUT,
+    "todos_contra_todos": FORMAT_ROUND_ROBIN,
+    "arena": FORMAT_ARENA,
+}
+FORMAT_LABELS = {
+    FORMAT_KNOCKOUT: "Eliminação Simples (Bracket)",
+    FORMAT_ROUND_ROBIN: "Todos contra Todos",
+    FORMAT_ARENA: "Arena",
+}
+
+# Dimensões e cores do bracket
+BRACKET_BOX_W = 170
+BRACKET_BOX_H = 25
+BRACKET_MATCH_H = 2 * BRACKET_BOX_H  # Altura total do bloco da partida
+BRACKET_MATCH_GAP = 20  # Espaço vertical entre partidas
+BRACKET_ROUND_GAP = 60  # Espaço horizontal entre rodadas
+BRACKET_BG = (54, 57, 63)  # Discord dark bg
+BRACKET_LINE = (200, 200, 200)
+
+# Cache de renderização: PNGs prontos por (tournament_id, versão) e o canvas base de cada torneio,
+# reaproveitado para repintar só as caixas de partidas que mudaram
+BRACKET_CACHE_SIZE = 32
+_bracket_png_cache = OrderedDict()     # (tournament_id, versão) -> bytes
+_bracket_canvas_cache = OrderedDict()  # tournament_id -> {'layout_key', 'image', 'boxes'}
+_bracket_cache_lock = threading.Lock()
+_bracket_tournament_locks = {}         # tournament_id -> threading.Lock
+_bracket_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="bracket-render")
+
+
+@functools.lru_cache(maxsize=1)
+def get_bracket_font():
+    """Carrega a fonte do bracket uma única vez."""
     try:
-        player_stats = await database.get_all_player_stats(discord_id)
-        if player_stats:
-            rating_key = f"rating_{mode}"
-            return player_stats.get(rating_key, 1200)
-        return 1200
-    except Exception as e:
-        logger.warning(f"Erro ao buscar rating para {discord_id}: {e}")
-        return 1200
+        return ImageFont.truetype("arial.ttf", 14)
+    except Exception:
+        return ImageFont.load_default()
+
+
+def _bracket_player_name(player_id, player_names, empty_label: str = "Bye") -> str:
+    name = str(player_names.get(player_id, empty_label if player_id is None else f"ID: {player_id[:4]}"))
+    if len(name) > 16:
+        name = name[:14] + ".."
+    return name
+
+
+def _empty_slot_label(match) -> str:
+    """Vaga vazia: partida aguardando o vencedor anterior ou bye."""
+    return "A definir" if match.get('status') == 'waiting' else "Bye"
+
 
 def draw_match_box(draw, x, y, match, player_names, font, w, h):
     """Desenha a caixa de uma partida específica."""
-    # Player 1
-    p1_id = match['player1_id']
-    p1_name = str(player_names.get(p1_id, "Bye" if p1_id is None else f"ID: {p1_id[:4]}"))
-    if len(p1_name) > 16: p1_name = p1_name[:14] + ".."
-    
-    p1_bg = (47, 49, 54) # Dark gray
-    p1_border = (100, 100, 100)
-    if match['winner_id'] == p1_id and p1_id is not None:
-        p1_bg = (46, 125, 50) # Green
-        p1_border = (46, 204, 113)
-        
-    draw.rectangle([x, y, x + w, y + h], fill=p1_bg, outline=p1_border)
-    draw.text((x + 5, y + 6), p1_name, fill="white", font=font)
-    
-    # Player 2
-    p2_id = match['player2_id']
-    p2_name = str(player_names.get(p2_id, "Bye" if p2_id is None else f"ID: {p2_id[:4]}"))
-    if len(p2_name) > 16: p2_name = p2_name[:14] + ".."
-    
-    p2_bg = (47, 49, 54)
-    p2_border = (100, 100, 100)
-    if match['winner_id'] == p2_id and p2_id is not None:
-        p2_bg = (46, 125, 50)
-        p2_border = (46, 204, 113)
-        
-    draw.rectangle([x, y + h, x + w, y + 2 * h], fill=p2_bg, outline=p2_border)
-    draw.text((x + 5, y + h + 6), p2_name, fill="white", font=font)
+    empty_label = _empty_slot_label(match)
+    for offset, player_id in ((0, match['player1_id']), (h, match['player2_id'])):
+        bg = (47, 49, 54)  # Dark gray
+        border = (100, 100, 100)
+        if match['winner_id'] == player_id and player_id is not None:
+            bg = (46, 125, 50)  # Green
+            border = (46, 204, 113)
+
+        draw.rectangle([x, y + offset, x + w, y + offset + h], fill=bg, outline=border)
+        draw.text((x + 5, y + offset + 6), _bracket_player_name(player_id, player_names, empty_label), fill="white", font=font)
+
+
+def _match_box_state(match, player_names) -> tuple:
+    """Tudo o que determina o desenho de uma caixa de partida."""
+    empty_label = _empty_slot_label(match)
+    return (
+        _bracket_player_name(match['player1_id'], player_names, empty_label),
+        _bracket_player_name(match['player2_id'], player_names, empty_label),
+        match['winner_id'] is not None and match['winner_id'] == match['player1_id'],
+        match['winner_id'] is not None and match['winner_id'] == match['player2_id'],
+    )
 
-def create_bracket_image(matches, player_names):
-    """Gera uma imagem PNG do bracket."""
-    if not HAS_PIL:
-        logger.error("Biblioteca Pillow (PIL) não encontrada. Instale com 'pip install Pillow'.")
-        return None
 
-    # Agrupa por rodada
+def bracket_version(matches, player_names) -> str:
+    """Versão do bracket: muda sempre que alguma caixa precisar ser redesenhada."""
+    states = sorted(
+        (m['round_number'], m['match_number']) + _match_box_state(m, player_names)
+        for m in matches
+    )
+    return hashlib.sha1(repr(states).encode('utf-8')).hexdigest()
+
+
+def _compute_bracket_layout(matches):
+    """Calcula posições das caixas e linhas de conexão (depende só da estrutura do bracket)."""
     rounds = {}
     for m in matches:
-        r = m['round_number']
-        if r not in rounds:
-            rounds[r] = []
-        rounds[r].append(m)
-    
+        rounds.setdefault(m['round_number'], []).append(m)
+
     if not rounds:
         return None
-        
+
     # Ordena partidas em cada rodada
     for r in rounds:
         rounds[r].sort(key=lambda x: x['match_number'])
-        
+
     num_rounds = max(rounds.keys())
     # Assume que a rodada 1 define a altura máxima
     max_matches_in_round = len(rounds.get(1, []))
     if max_matches_in_round == 0:
         max_matches_in_round = max(len(m) for m in rounds.values())
 
-    # Dimensões
-    BOX_W = 170
-    BOX_H = 25
-    MATCH_H = 2 * BOX_H # Altura total do bloco da partida
-    MATCH_GAP = 20 # Espaço vertical entre partidas
-    ROUND_GAP = 60 # Espaço horizontal entre rodadas
-    
     # Tamanho do canvas
-    width = num_rounds * (BOX_W + ROUND_GAP) + BOX_W
-    height = max_matches_in_round * (MATCH_H + MATCH_GAP) + MATCH_GAP + 20
-    
-    width = max(width, 400)
-    height = max(height, 200)
-    
-    image = Image.new('RGB', (width, height), (54, 57, 63)) # Discord dark bg
-    draw = ImageDraw.Draw(image)
-    
-    try:
-        font = ImageFont.truetype("arial.ttf", 14)
-    except:
-        font = ImageFont.load_default()
-        
+    width = max(num_rounds * (BRACKET_BOX_W + BRACKET_ROUND_GAP) + BRACKET_BOX_W, 400)
+    height = max(max_matches_in_round * (BRACKET_MATCH_H + BRACKET_MATCH_GAP) + BRACKET_MATCH_GAP + 20, 200)
+
     # Armazena o centro Y de cada partida: (round, match_num) -> y
     centers = {}
-    
-    # Desenha Rodada 1
+    boxes = {}  # (round, match_num) -> (x, y, match)
+    lines = []
     start_x = 20
     start_y = 20
-    
+
     for i, match in enumerate(rounds.get(1, [])):
-        m_num = match['match_number']
-        x = start_x
-        y = start_y + i * (MATCH_H + MATCH_GAP)
-        draw_match_box(draw, x, y, match, player_names, font, BOX_W, BOX_H)
-        centers[(1, m_num)] = y + MATCH_H / 2
-        
-    # Desenha rodadas subsequentes
+        y = start_y + i * (BRACKET_MATCH_H + BRACKET_MATCH_GAP)
+        boxes[(1, match['match_number'])] = (start_x, y, match)
+        centers[(1, match['match_number'])] = y + BRACKET_MATCH_H / 2
+
     for r in range(2, num_rounds + 1):
-        current_matches = rounds.get(r, [])
-        x = start_x + (r - 1) * (BOX_W + ROUND_GAP)
-        
-        for match in current_matches:
+        x = start_x + (r - 1) * (BRACKET_BOX_W + BRACKET_ROUND_GAP)
+        for match in rounds.get(r, []):
             m_num = match['match_number']
-            prev_1 = 2 * m_num - 1
-            prev_2 = 2 * m_num
-            
-            y1 = centers.get((r - 1, prev_1))
-            y2 = centers.get((r - 1, prev_2))
-            
-            if y1 is not None and y2 is not None:
-                y_center = (y1 + y2) / 2
-                y = y_center - MATCH_H / 2
-                
-                # Linhas de conexão
-                line_x_start = x - ROUND_GAP
-                line_x_mid = x - ROUND_GAP / 2
-                
-                # Linhas saindo das partidas anteriores
-                draw.line([(line_x_start, y1), (line_x_mid, y1)], fill=(200, 200, 200), width=2)
-                draw.line([(line_x_start, y2), (line_x_mid, y2)], fill=(200, 200, 200), width=2)
-                # Linha vertical conectando
-                draw.line([(line_x_mid, y1), (line_x_mid, y2)], fill=(200, 200, 200), width=2)
-                # Linha horizontal para a partida atual
-                draw.line([(line_x_mid, y_center), (x, y_center)], fill=(200, 200, 200), width=2)
-                
-                draw_match_box(draw, x, y, match, player_names, font, BOX_W, BOX_H)
-                centers[(r, m_num)] = y_center
-                
+            y1 = centers.get((r - 1, 2 * m_num - 1))
+            y2 = centers.get((r - 1, 2 * m_num))
+            if y1 is None or y2 is None:
+                continue
+
+            y_center = (y1 + y2) / 2
+            line_x_start = x - BRACKET_ROUND_GAP
+            line_x_mid = x - BRACKET_ROUND_GAP / 2
+            lines.extend([
+                [(line_x_start, y1), (line_x_mid, y1)],  # Linhas saindo das partidas anteriores
+                [(line_x_start, y2), (line_x_mid, y2)],
+                [(line_x_mid, y1), (line_x_mid, y2)],  # Linha vertical conectando
+                [(line_x_mid, y_center), (x, y_center)],  # Linha horizontal para a partida atual
+            ])
+            boxes[(r, m_num)] = (x, y_center - BRACKET_MATCH_H / 2, match)
+            centers[(r, m_num)] = y_center
+
+    return {
+        'key': (width, height, tuple(sorted(boxes))),
+        'width': width,
+        'height': height,
+        'boxes': boxes,
+        'lines': lines,
+    }
+
+
+def _paint_bracket_base(layout):
+    """Canvas com fundo e linhas de conexão, sem as caixas."""
+    image = Image.new('RGB', (layout['width'], layout['height']), BRACKET_BG)
+    draw = ImageDraw.Draw(image)
+    for line in layout['lines']:
+        draw.line(line, fill=BRACKET_LINE, width=2)
+    return image
+
+
+def create_bracket_image(matches, player_names):
+    """Gera uma imagem PNG do bracket (renderização completa, sem cache)."""
+    if not HAS_PIL:
+        logger.error("Biblioteca Pillow (PIL) não encontrada. Instale com 'pip install Pillow'.")
+        return None
+
+    layout = _compute_bracket_layout(matches)
+    if layout is None:
+        return None
+
+    image = _paint_bracket_base(layout)
+    draw = ImageDraw.Draw(image)
+    font = get_bracket_font()
+    for x, y, match in layout['boxes'].values():
+        draw_match_box(draw, x, y, match, player_names, font, BRACKET_BOX_W, BRACKET_BOX_H)
+
     buffer = io.BytesIO()
     image.save(buffer, format='PNG')
     buffer.seek(0)
     return buffer
 
+
+def render_bracket_png(tournament_id: int, matches, player_names):
+    """
+    Renderiza o bracket usando o cache por (tournament_id, versão).
+
+    Se a estrutura do bracket não mudou, reaproveita o canvas do torneio e repinta apenas as
+    caixas de partidas cujo conteúdo mudou. Retorna os bytes do PNG ou None.
+    """
+    if not HAS_PIL:
+        logger.error("Biblioteca Pillow (PIL) não encontrada. Instale com 'pip install Pillow'.")
+        return None
+
+    key = (tournament_id, bracket_version(matches, player_names))
+    with _bracket_cache_lock:
+        png = _bracket_png_cache.get(key)
+        if png is not None:
+            _bracket_png_cache.move_to_end(key)
+            return png
+        tournament_lock = _bracket_tournament_locks.setdefault(tournament_id, threading.Lock())
+
+    with tournament_lock:
+        layout = _compute_bracket_layout(matches)
+        if layout is None:
+            return None
+
+        with _bracket_cache_lock:
+            canvas = _bracket_canvas_cache.get(tournament_id)
+        if canvas is None or canvas['layout_key'] != layout['key']:
+            canvas = {'layout_key': layout['key'], 'image': _paint_bracket_base(layout), 'boxes': {}}
+
+        draw = ImageDraw.Draw(canvas['image'])
+        font = get_bracket_font()
+        repainted = 0
+        for position, (x, y, match) in layout['boxes'].items():
+            state = _match_box_state(match, player_names)
+            if canvas['boxes'].get(position) != state:
+                draw_match_box(draw, x, y, match, player_names, font, BRACKET_BOX_W, BRACKET_BOX_H)
+                canvas['boxes'][position] = state
+                repainted += 1
+
+        buffer = io.BytesIO()
+        canvas['image'].save(buffer, format='PNG')
+        png = buffer.getvalue()
+
+    with _bracket_cache_lock:
+        _bracket_canvas_cache[tournament_id] = canvas
+        _bracket_canvas_cache.move_to_end(tournament_id)
+        while len(_bracket_canvas_cache) > BRACKET_CACHE_SIZE:
+            _bracket_canvas_cache.popitem(last=False)
+        _bracket_png_cache[key] = png
+        while len(_bracket_png_cache) > BRACKET_CACHE_SIZE:
+            _bracket_png_cache.popitem(last=False)
+
+    logger.debug(f"Bracket do torneio {tournament_id} renderizado ({repainted} caixa(s) repintada(s))")
+    return png
+
+
+async def get_bracket_image(bot, tournament_id: int, matches, guild: Optional[discord.Guild] = None):
+    """Resolve os nomes dos participantes e renderiza o bracket fora do event loop. Retorna um BytesIO ou None."""
+    participants = await database.get_tournament_participants(tournament_id)
+    player_names = resolve_display_names(bot, participants, guild)
+
+    loop = asyncio.get_running_loop()
+    png = await loop.run_in_executor(_bracket_executor, render_bracket_png, tournament_id, matches, player_names)
+    return io.BytesIO(png) if png else None
+
 async def notify_bracket_players(bot, tournament_id: int, channel: discord.TextChannel):
     """Exibe desafios do bracket no chat."""
     try:
@@ -262,18 +374,8 @@ async def display_bracket_in_channel(bot, tournament_id: int, channel: discord.T
         if not matches:
             return
 
-        participants = await database.get_tournament_participants(tournament_id)
-        player_names = {}
-        
-        for p in participants:
-            try:
-                user = await bot.fetch_user(int(p['player_id']))
-                player_names[p['player_id']] = user.display_name if user else p.get('discord_username', f"Player {p['player_id'][:4]}")
-            except:
-                player_names[p['player_id']] = p.get('discord_username', f"Player {p['player_id'][:4]}")
-
-        # Gera a imagem do bracket
-        image_buffer = await asyncio.to_thread(create_bracket_image, matches, player_names)
+        # Gera a imagem do bracket (cacheada por versão)
+        image_buffer = await get_bracket_image(bot, tournament_id, matches, channel.guild)
         
         if image_buffer:
             file = discord.File(fp=image_buffer, filename="bracket.png")
@@ -290,20 +392,74 @@ async def display_bracket_in_channel(bot, tournament_id: int, channel: discord.T
         raise
 
 
-async def format_bracket_participants_list(bot, participants, mode: str, limit: int = 20) -> list:
+def _format_age(seconds) -> str:
+    """Idade de uma partida pendente em texto curto (ex: 2d 3h, 45min)."""
+    if seconds is None:
+        return "?"
+    minutes = max(int(seconds), 0) // 60
+    if minutes < 60:
+        return f"{minutes}min"
+    hours = minutes // 60
+    if hours < 24:
+        return f"{hours}h {minutes % 60}min"
+    return f"{hours // 24}d {hours % 24}h"
+
+
+def _pending_match_title(match: dict) -> str:
+    """Título do campo de uma linha da view pending_matches."""
+    if match['kind'] == 'bracket':
+        return f"Match {match['match_number']} (Rodada {match['round_number']}) - {match['tournament_name']}"
+    if match['kind'] == 'swiss':
+        return f"Suíço: {match['tournament_name']} (Rodada {match['round_number']})"
+    return f"Desafio avulso #{match['challenge_id']}"
+
+
+def _pending_match_details(match: dict) -> str:
+    """Jogadores, desafio, tempo, idade e link de uma partida pendente."""
+    p1_name = match.get('player1_name') or 'Desconhecido'
+    p2_name = match.get('player2_name') or 'Desconhecido'
+    details = (
+        f"👤 **{p1_name}** vs **{p2_name}**\n"
+        f"🆔 Desafio: `{match.get('challenge_id') or 'N/A'}` ({match.get('challenge_status') or 'sem desafio'}) | "
+        f"⏱️ {match.get('time_control') or '?'} | ⌛ há {_format_age(match.get('age_seconds'))}"
+    )
+    if match.get('game_url'):
+        details += f"\n🔗 {match['game_url']}"
+    return details
+
+
+async def build_standings_embed(tournament, limit: int = 20) -> discord.Embed:
+    """Classificação de um torneio todos-contra-todos ou arena."""
+    standings = await database.get_tournament_standings(tournament['id'])
+    tournament_format = tournament.get('format') or FORMAT_KNOCKOUT
+    embed = discord.Embed(
+        title=f"📊 Classificação - {tournament['name']}",
+        description=f"**Formato:** {FORMAT_LABELS.get(tournament_format, tournament_format)}",
+        color=discord.Color.gold()
+    )
+    lines = []
+    for position, player in enumerate(standings[:limit], 1):
+        streak = " 🔥" if tournament_format == FORMAT_ARENA and (player.get('streak') or 0) >= 2 else ""
+        lines.append(
+            f"**{position}.** {player['discord_username']} - {player['points']:g} pts "
+            f"({player.get('wins') or 0}V/{player.get('draws') or 0}E/{player.get('losses') or 0}D){streak}"
+        )
+    embed.add_field(name="Jogadores", value="\n".join(lines) or "Nenhum participante ainda.", inline=False)
+    if tournament_format == FORMAT_ARENA and tournament.get('ends_at'):
+        embed.set_footer(text=f"Termina em {tournament['ends_at']} UTC")
+    return embed
+
+
+async def format_bracket_participants_list(bot, participants, mode: str, limit: int = 20, guild: Optional[discord.Guild] = None) -> list:
     """Formata lista de participantes ordenada por rating (maior para menor) para torneios de bracket."""
     if not participants:
         return ["Nenhum participante ainda."]
 
+    names = resolve_display_names(bot, participants, guild)
     participant_data = []
     for p in participants:
-        try:
-            user = await bot.fetch_user(int(p['player_id']))
-            display_name = user.display_name
-        except:
-            display_name = p.get('discord_username', 'Usuário desconhecido')
-
-        rating = await get_player_rating(p['player_id'], mode)
+        display_name = names[str(p['player_id'])]
+        rating = participant_rating(p, mode)
         participant_data.append({
             'name': display_name,
             'rating': rating,
@@ -350,7 +506,7 @@ class JoinOfficialTournamentView(View):
             participants = await database.get_tournament_participants(self.tournament_id)
             count = len(participants) if participants is not None else 0
             
-            participants_list = await format_bracket_participants_list(self.bot, participants, self.mode)
+            participants_list = await format_bracket_participants_list(self.bot, participants, self.mode, guild=interaction.guild)
             participants_text = "\n".join(participants_list)
 
             new_embed = interaction.message.embeds[0]
@@ -430,13 +586,15 @@ class OfficialTournament(commands.Cog):
         descricao="Uma breve descrição do torneio",
         modo="Modo de jogo (bullet, blitz, rapid)",
         tempo_inicial="Tempo inicial em minutos para cada jogador",
-        incremento="Incremento em segundos por jogada"
+        incremento="Incremento em segundos por jogada",
+        formato="Formato do torneio (padrão: eliminatória)"
     )
-    async def criar_torneio(self, interaction: discord.Interaction, nome: str, descricao: str, modo: Literal["bullet", "blitz", "rapid"], tempo_inicial: int, incremento: int):
+    async def criar_torneio(self, interaction: discord.Interaction, nome: str, descricao: str, modo: Literal["bullet", "blitz", "rapid"], tempo_inicial: int, incremento: int, formato: Literal["eliminatoria", "todos_contra_todos", "arena"] = "eliminatoria"):
         await interaction.response.defer() 
         
         time_control = f"{tempo_inicial}+{incremento}"
         created_by = str(interaction.user.id)
+        tournament_format = FORMAT_CHOICES[formato]
 
         try:
             # Usando min_participants=2 e max_participants=64 como padrão para brackets
@@ -449,7 +607,8 @@ class OfficialTournament(commands.Cog):
                 min_participants=2,
                 created_by=created_by,
                 is_automatic=False, # Torneios oficiais são manuais
-                rated=True # Torneios oficiais valem rating
+                rated=True, # Torneios oficiais valem rating
+                format=tournament_format
             )
 
             public_embed = discord.Embed(
@@ -461,7 +620,7 @@ class OfficialTournament(commands.Cog):
                 f"**ID do Torneio:** {tournament_id}\n"
                 f"**Modo:** {modo.title()}\n"
                 f"**Time Control:** {time_control}\n"
-                f"**Formato:** Eliminação Simples (Bracket)\n"
+                f"**Formato:** {FORMAT_LABELS[tournament_format]}\n"
                 f"**Participantes:** 0 inscritos"
             )
             public_embed.add_field(name="📋 Informações do Torneio", value=info_text, inline=False)
@@ -477,8 +636,8 @@ class OfficialTournament(commands.Cog):
 
 
     @official_tournament_group.command(name="iniciar", description="Inicia um torneio oficial, gerando os brackets da primeira rodada.")
-    @app_commands.describe(tournament_id="O ID do torneio a ser iniciado.")
-    async def iniciar_torneio(self, interaction: discord.Interaction, tournament_id: int):
+    @app_commands.describe(tournament_id="O ID do torneio a ser iniciado.", duracao_minutos="Duração da arena em minutos (só para arenas)")
+    async def iniciar_torneio(self, interaction: discord.Interaction, tournament_id: int, duracao_minutos: app_commands.Range[int, 10, 720] = 60):
         await interaction.response.defer(ephemeral=True)
 
         try:
@@ -503,7 +662,13 @@ class OfficialTournament(commands.Cog):
 
             # Obtém o channel_id do canal onde o torneio está sendo iniciado
             channel_id = str(interaction.channel.id) if interaction.channel else None
-            success, message = await database.start_bracket_tournament(tournament_id, channel_id)
+            tournament_format = tournament.get('format') or FORMAT_KNOCKOUT
+            if tournament_format == FORMAT_ROUND_ROBIN:
+                success, message = await database.start_round_robin_tournament(tournament_id, channel_id)
+            elif tournament_format == FORMAT_ARENA:
+                success, message = await database.start_arena_tournament(tournament_id, duracao_minutos, channel_id)
+            else:
+                success, message = await database.start_bracket_tournament(tournament_id, channel_id)
 
             if success:
                 # Desativa os botões de entrar/sair na mensagem original
@@ -530,11 +695,14 @@ class OfficialTournament(commands.Cog):
                 except Exception as e:
                     logger.warning(f"Erro ao desabilitar botões do torneio {tournament_id}: {e}")
 
-                await interaction.followup.send(f"✅ O torneio **{tournament['name']}** foi iniciado! Os brackets foram gerados.", ephemeral=True)
+                await interaction.followup.send(f"✅ O torneio **{tournament['name']}** foi iniciado! {message}", ephemeral=True)
 
-                # Notifica jogadores sobre suas partidas e exibe o bracket
+                # Notifica jogadores sobre suas partidas e exibe o bracket (ou a classificação)
                 await notify_bracket_players(self.bot, tournament_id, interaction.channel)
-                await display_bracket_in_channel(self.bot, tournament_id, interaction.channel)
+                if tournament_format == FORMAT_KNOCKOUT:
+                    await display_bracket_in_channel(self.bot, tournament_id, interaction.channel)
+                else:
+                    await interaction.channel.send(embed=await build_standings_embed(tournament))
 
             else:
                 await interaction.followup.send(f"❌ Erro ao iniciar o torneio: {message}", ephemeral=True)
@@ -554,24 +722,18 @@ class OfficialTournament(commands.Cog):
                 await interaction.followup.send(f"❌ Torneio com ID {tournament_id} não encontrado.", ephemeral=True)
                 return
 
+            # Todos-contra-todos e arena não têm chave: mostra a classificação
+            if (tournament.get('format') or FORMAT_KNOCKOUT) != FORMAT_KNOCKOUT:
+                await interaction.followup.send(embed=await build_standings_embed(tournament))
+                return
+
             matches = await database.get_tournament_matches(tournament_id)
             if not matches:
                 await interaction.followup.send("Nenhuma partida encontrada para este torneio ainda.", ephemeral=True)
                 return
 
-            participants = await database.get_tournament_participants(tournament_id)
-            player_names = {}
-            
-            # Busca nomes dos jogadores
-            for p in participants:
-                try:
-                    user = await self.bot.fetch_user(int(p['player_id']))
-                    player_names[p['player_id']] = user.display_name if user else p.get('discord_username', f"Player {p['player_id'][:4]}")
-                except:
-                    player_names[p['player_id']] = p.get('discord_username', f"Player {p['player_id'][:4]}")
-            
-            # Gera a imagem do bracket
-            image_buffer = await asyncio.to_thread(create_bracket_image, matches, player_names)
+            # Gera a imagem do bracket (cacheada por versão)
+            image_buffer = await get_bracket_image(self.bot, tournament_id, matches, interaction.guild)
             
             if image_buffer:
                 file = discord.File(fp=image_buffer, filename="bracket.png")
@@ -617,38 +779,34 @@ class OfficialTournament(commands.Cog):
             await interaction.followup.send("❌ Torneio não encontrado.", ephemeral=True)
 
     @official_tournament_group.command(name="partidas_pendentes", description="Lista as partidas que ainda não foram jogadas no torneio.")
-    @app_commands.describe(tournament_id="ID do torneio")
-    async def partidas_pendentes(self, interaction: discord.Interaction, tournament_id: int):
+    @app_commands.describe(tournament_id="ID do torneio (vazio = todas as partidas pendentes do servidor)")
+    async def partidas_pendentes(self, interaction: discord.Interaction, tournament_id: Optional[int] = None):
         await interaction.response.defer()
         try:
-            matches = await database.get_tournament_matches(tournament_id)
-            if not matches:
-                await interaction.followup.send("Nenhuma partida encontrada.", ephemeral=True)
-                return
+            # Uma única consulta na view pending_matches (nomes, link e idade já vêm juntos)
+            if tournament_id is not None:
+                pending_matches = await database.get_pending_matches(kind='bracket', tournament_id=tournament_id)
+                title = f"⏳ Partidas Pendentes - Torneio #{tournament_id}"
+            else:
+                pending_matches = await database.get_pending_matches()
+                title = "⏳ Partidas Pendentes"
 
-            # Filtra apenas partidas pendentes (status 'pending')
-            pending_matches = [m for m in matches if m['status'] == 'pending']
-            
             if not pending_matches:
                 await interaction.followup.send("✅ Todas as partidas geradas já foram concluídas!", ephemeral=True)
                 return
 
-            embed = discord.Embed(
-                title=f"⏳ Partidas Pendentes - Torneio #{tournament_id}",
-                color=discord.Color.orange()
-            )
+            embed = discord.Embed(title=title, color=discord.Color.orange())
 
-            for match in pending_matches:
-                p1_name = match.get('player1_name', 'Desconhecido')
-                p2_name = match.get('player2_name', 'Desconhecido')
-                challenge_id = match.get('challenge_id', 'N/A')
-                
+            # Embeds aceitam no máximo 25 campos
+            for match in pending_matches[:25]:
                 embed.add_field(
-                    name=f"Match {match['match_number']} (Rodada {match['round_number']})",
-                    value=f"👤 **{p1_name}** vs **{p2_name}**\n🆔 Desafio: `{challenge_id}`",
+                    name=_pending_match_title(match),
+                    value=_pending_match_details(match),
                     inline=False
                 )
-            
+            if len(pending_matches) > 25:
+                embed.set_footer(text=f"... e mais {len(pending_matches) - 25} partidas pendentes")
+
             await interaction.followup.send(embed=embed)
         except Exception as e:
             logger.error(f"Erro ao listar partidas pendentes: {e}")
@@ -3,8 +3,11 @@ from discord import app_commands
 from discord.ext import commands
 from discord.ui import Button, View
 import database
+import io
 import logging
 from datetime import datetime, timedelta
+from typing import Literal
+import rating_chart
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +46,11 @@ ACHIEVEMENTS_CONFIG = {
     }
 }
 
+# Adversários exibidos no /rivais
+RIVALRIES_LIMIT = 15
+# Aberturas exibidas no /aberturas
+OPENINGS_LIMIT = 10
+
 def get_mode_emoji(mode: str) -> str:
     """Retorna emoji para cada modo de jogo."""
     emojis = {
@@ -53,13 +61,74 @@ def get_mode_emoji(mode: str) -> str:
     }
     return emojis.get(mode, '♟️')
 
+def format_rivalry_line(rivalry: dict) -> str:
+    """Linha de um confronto direto: adversário, V/E/D e partidas."""
+    name = rivalry.get('opponent_name') or f"<@{rivalry['opponent_id']}>"
+    return (f"**{name}** ➜ ✅ `{rivalry['wins']}` | 🤝 `{rivalry['draws']}` | ❌ `{rivalry['losses']}` "
+            f"({rivalry['games']} partidas)")
+
+def _win_rate(totals: dict) -> float:
+    return totals['wins'] / totals['games'] * 100 if totals['games'] else 0.0
+
+def player_agg_fields(agg: dict) -> list:
+    """Campos (nome, valor) do perfil a partir de database.get_player_stats_agg: cores, aberturas e duração."""
+    fields = []
+    by_color = agg.get('by_color') or {}
+    if by_color:
+        lines = []
+        for color, label in (('white', '⚪ Brancas'), ('black', '⚫ Pretas')):
+            totals = by_color.get(color)
+            if totals:
+                lines.append(f"**{label}:** ✅ `{totals['wins']}` | 🤝 `{totals['draws']}` | ❌ `{totals['losses']}` "
+                             f"(`{_win_rate(totals):.1f}%`)")
+        fields.append(("🎨 ➜ Por Cor", "\n".join(lines)))
+    if agg.get('openings'):
+        lines = [
+            f"`{o['eco']}` {o['name'] or 'Abertura'} ➜ `{o['games']}` partidas (`{_win_rate(o):.1f}%`)"
+            for o in agg['openings'][:3]
+        ]
+        fields.append(("📖 ➜ Aberturas Favoritas", "\n".join(lines)))
+    if agg.get('avg_plies'):
+        fields.append(("⏱️ ➜ Duração Média", f"`{agg['avg_plies'] / 2:.0f}` lances por partida"))
+    return fields
+
+# Partidas por página do histórico
+HISTORY_PAGE_SIZE = 5
+
+def format_history_game(game: dict) -> str:
+    """Campo de uma partida do histórico (já no ponto de vista do jogador, ver database.get_player_game_page)."""
+    result_symbol = {"win": "✅ Vitória", "draw": "🤝 Empate"}.get(game['outcome'], "❌ Derrota")
+
+    rating_change = ""
+    if game['rating_after'] and game['rating_before']:
+        change = game['rating_after'] - game['rating_before']
+        rating_change = f" ({game['rating_before']} → {game['rating_after']} {'📈' if change > 0 else '📉'})"
+
+    date_str = game['played_at'][:10] if game['played_at'] else "Data desconhecida"
+    mode = game['mode'] or ''
+    field_value = (f"{result_symbol} vs **{game['opponent_name'] or 'Desconhecido'}**\n"
+                   f"**Modo:** {get_mode_emoji(mode)} {mode.upper()}\n**Data:** {date_str}{rating_change}")
+    if game.get('game_url'):
+        field_value += f"\n**[Ver partida]({game['game_url']})**"
+    return field_value
+
+def empty_history_embed() -> discord.Embed:
+    return discord.Embed(
+        title="📋 Histórico de Partidas",
+        description="Nenhuma partida registrada ainda.",
+        color=discord.Color.greyple()
+    )
+
 class HistoryView(View):
-    def __init__(self, bot: commands.Bot, author_id: int, target_id: str, page: int = 0):
+    def __init__(self, bot: commands.Bot, author_id: int, target_id: str, display_name: str = None):
         super().__init__(timeout=300)
         self.bot = bot
         self.author_id = author_id
-        self.target_id = target_id
-        self.page = page
+        self.target_id = str(target_id)
+        self.display_name = display_name
+        # Cursor (played_at, id) que abre cada página já visitada; a página atual é o topo da pilha
+        self.cursors = [None]
+        self.next_cursor = None
         
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         if interaction.user.id != self.author_id:
@@ -69,12 +138,14 @@ class HistoryView(View):
 
     @discord.ui.button(label="⬅️ Anterior", custom_id="history_prev", style=discord.ButtonStyle.secondary)
     async def history_prev(self, interaction: discord.Interaction, button: Button):
-        self.page = max(0, self.page - 1)
+        if len(self.cursors) > 1:
+            self.cursors.pop()
         await self.show_history(interaction)
 
     @discord.ui.button(label="Próxima ➡️", custom_id="history_next", style=discord.ButtonStyle.secondary)
     async def history_next(self, interaction: discord.Interaction, button: Button):
-        self.page += 1
+        if self.next_cursor:
+            self.cursors.append(self.next_cursor)
         await self.show_history(interaction)
 
     @discord.ui.button(label="Fechar", custom_id="history_close", style=discord.ButtonStyle.danger)
@@ -83,65 +154,37 @@ class HistoryView(View):
         await interaction.delete_original_response()
         self.stop()
 
-    async def show_history(self, interaction: discord.Interaction, is_new_message: bool = False):
-        games = await database.get_player_game_history(self.target_id, limit=50)
-        
-        if not games:
-            embed = discord.Embed(
-                title="📋 Histórico de Partidas",
-                description="Nenhuma partida registrada ainda.",
-                color=discord.Color.greyple()
-            )
-            if is_new_message:
-                await interaction.response.send_message(embed=embed, view=self, ephemeral=True)
-            else:
-                await interaction.response.edit_message(embed=embed, view=self)
-            return
-        
-        try:
-            user = await self.bot.fetch_user(int(self.target_id))
-            display_name = user.display_name
-        except:
-            display_name = "Jogador"
-        
-        items_per_page = 5
-        start = self.page * items_per_page
-        end = start + items_per_page
-        page_games = games[start:end]
-        
+    async def build_embed(self):
+        """Busca só a página atual (keyset) e monta o embed. Retorna None se o jogador não tem partidas."""
+        games = await database.get_player_game_page(self.target_id, limit=HISTORY_PAGE_SIZE + 1, before=self.cursors[-1])
+        if not games and len(self.cursors) == 1:
+            return None
+
+        has_more = len(games) > HISTORY_PAGE_SIZE
+        games = games[:HISTORY_PAGE_SIZE]
+        self.next_cursor = (games[-1]['played_at'], games[-1]['id']) if has_more else None
+        self.history_prev.disabled = len(self.cursors) == 1
+        self.history_next.disabled = not has_more
+
+        if not self.display_name:
+            # Só o cache do bot: paginar não faz chamadas à API do Discord
+            user = self.bot.get_user(int(self.target_id))
+            self.display_name = user.display_name if user else "Jogador"
+
+        page = len(self.cursors)
+        start = (page - 1) * HISTORY_PAGE_SIZE
         embed = discord.Embed(
-            title=f"📋 Histórico de Partidas - {display_name}",
-            description=f"Mostrando {start + 1}-{min(end, len(games))} de {len(games)} partidas",
+            title=f"📋 Histórico de Partidas - {self.display_name}",
+            description=f"Mostrando {start + 1}-{start + len(games)}",
             color=discord.Color.blue()
         )
-        
-        for game in page_games:
-            opponent_id = game['player2_id'] if game['player1_id'] == self.target_id else game['player1_id']
-            opponent_name = game['player2_name'] if game['player1_id'] == self.target_id else game['player1_name']
-            
-            try:
-                opponent = await self.bot.fetch_user(int(opponent_id))
-                opponent_name = opponent.display_name
-            except:
-                pass
-            
-            is_winner = game['winner_id'] == self.target_id
-            result_symbol = "✅ Vitória" if is_winner else ("🤝 Empate" if game['result'] == 'draw' else "❌ Derrota")
-            
-            rating_change = ""
-            if game['player1_id'] == self.target_id:
-                if game['player1_rating_after']:
-                    change = game['player1_rating_after'] - game['player1_rating_before']
-                    rating_change = f" ({game['player1_rating_before']} → {game['player1_rating_after']} {'📈' if change > 0 else '📉'})"
-            date_str = game['played_at'][:10] if game['played_at'] else "Data desconhecida"
-            
-            field_value = f"{result_symbol} vs **{opponent_name}**\n**Modo:** {get_mode_emoji(game['mode'])} {game['mode'].upper()}\n**Data:** {date_str}{rating_change}"
-            if game.get('game_url'):
-                field_value += f"\n**[Ver partida]({game['game_url']})**"
-            
-            embed.add_field(name=f"", value=field_value, inline=False)
-        
-        embed.set_footer(text=f"Página {self.page + 1}")
+        for game in games:
+            embed.add_field(name="", value=format_history_game(game), inline=False)
+        embed.set_footer(text=f"Página {page}")
+        return embed
+
+    async def show_history(self, interaction: discord.Interaction, is_new_message: bool = False):
+        embed = await self.build_embed() or empty_history_embed()
         if is_new_message:
             await interaction.response.send_message(embed=embed, view=self, ephemeral=True)
         else:
@@ -158,60 +201,12 @@ class Statistics(commands.Cog):
         
         await interaction.response.defer()
         
-        games = await database.get_player_game_history(target_id, limit=50)
-        
-        if not games:
-            embed = discord.Embed(
-                title="📋 Histórico de Partidas",
-                description="Nenhuma partida registrada ainda.",
-                color=discord.Color.greyple()
-            )
-            await interaction.followup.send(embed=embed)
+        view = HistoryView(self.bot, interaction.user.id, target_id, (jogador or interaction.user).display_name)
+        embed = await view.build_embed()
+        if embed is None:
+            await interaction.followup.send(embed=empty_history_embed())
             return
-        
-        try:
-            user = await self.bot.fetch_user(int(target_id))
-            display_name = user.display_name
-        except:
-            display_name = "Jogador"
-        
-        view = HistoryView(self.bot, interaction.user.id, target_id, page=0)
-        
-        embed = discord.Embed(
-            title=f"📋 Histórico de Partidas - {display_name}",
-            description=f"Total de {len(games)} partidas",
-            color=discord.Color.blue()
-        )
-        
-        for game in games[:5]:
-            opponent_id = game['player2_id'] if game['player1_id'] == target_id else game['player1_id']
-            opponent_name = game['player2_name'] if game['player1_id'] == target_id else game['player1_name']
-            
-            try:
-                opponent = await self.bot.fetch_user(int(opponent_id))
-                opponent_name = opponent.display_name
-            except:
-                pass
-            
-            is_winner = game['winner_id'] == target_id
-            result_symbol = "✅ Vitória" if is_winner else ("🤝 Empate" if game['result'] == 'draw' else "❌ Derrota")
-            
-            rating_change = ""
-            if game['player1_id'] == target_id and game['player1_rating_after']:
-                change = game['player1_rating_after'] - game['player1_rating_before']
-                rating_change = f" ({game['player1_rating_before']} → {game['player1_rating_after']} {'📈' if change > 0 else '📉'})"
-            elif game['player2_id'] == target_id and game['player2_rating_after']:
-                change = game['player2_rating_after'] - game['player2_rating_before']
-                rating_change = f" ({game['player2_rating_before']} → {game['player2_rating_after']} {'📈' if change > 0 else '📉'})"
-            
-            date_str = game['played_at'][:10] if game['played_at'] else "Data desconhecida"
-            
-            field_value = f"{result_symbol} vs **{opponent_name}**\n**Modo:** {get_mode_emoji(game['mode'])} {game['mode'].upper()}\n**Data:** {date_str}{rating_change}"
-            if game.get('game_url'):
-                field_value += f"\n**[Ver partida]({game['game_url']})**"
-            
-            embed.add_field(name=f"", value=field_value, inline=False)
-        
+
         await interaction.followup.send(embed=embed, view=view)
 
     @app_commands.command(name="badges", description="Ver seus achievements desbloqueados")
@@ -252,5 +247,95 @@ class Statistics(commands.Cog):
         
         await interaction.followup.send(embed=embed)
 
+    @app_commands.command(name="rivais", description="Ver os confrontos diretos contra todos os adversários")
+    @app_commands.describe(jogador="Jogador (padrão: você)")
+    async def rivais(self, interaction: discord.Interaction, jogador: discord.User = None):
+        """Mostra a tabela de confrontos diretos de um jogador."""
+        target = jogador or interaction.user
+        target_id = str(target.id)
+
+        await interaction.response.defer()
+
+        rivalries = await database.get_rivalries(target_id, limit=RIVALRIES_LIMIT)
+        embed = discord.Embed(
+            title=f"⚔️ ➜ Rivais - {target.display_name}",
+            color=0xCD0000
+        )
+        if not rivalries:
+            embed.description = "Nenhum confronto registrado ainda. Desafie alguém!"
+        else:
+            lines = []
+            for rivalry in rivalries:
+                last_game = rivalry['last_game_at'][:10] if rivalry['last_game_at'] else "?"
+                lines.append(f"{format_rivalry_line(rivalry)}\n_Último jogo: {last_game}_")
+            embed.description = "\n".join(lines)
+            embed.set_footer(text=f"{len(rivalries)} adversários mais frequentes")
+
+        await interaction.followup.send(embed=embed)
+
+    @app_commands.command(name="aberturas", description="Ver as aberturas mais jogadas no servidor ou por um jogador")
+    @app_commands.describe(jogador="Jogador (padrão: servidor inteiro)")
+    async def aberturas(self, interaction: discord.Interaction, jogador: discord.User = None):
+        """Mostra a tabela de aberturas (indexada dos PGNs pelo opening_index)."""
+        await interaction.response.defer()
+
+        openings = await database.get_opening_stats(str(jogador.id) if jogador else None, limit=OPENINGS_LIMIT)
+        embed = discord.Embed(
+            title=f"📖 ➜ Aberturas - {jogador.display_name if jogador else 'Servidor'}",
+            color=0xCD0000
+        )
+        if not openings:
+            embed.description = "Nenhuma abertura indexada ainda."
+            await interaction.followup.send(embed=embed)
+            return
+
+        lines = []
+        for o in openings:
+            name = o['opening_name'] or "Abertura desconhecida"
+            if jogador:
+                score = (o['wins'] + 0.5 * o['draws']) / o['games'] * 100
+                results = (f"✅ `{o['wins']}` | 🤝 `{o['draws']}` | ❌ `{o['losses']}` (`{score:.0f}%`) "
+                           f"⚪ `{o['white_games']}` ⚫ `{o['black_games']}`")
+            else:
+                results = f"⚪ `{o['white_wins']}` | 🤝 `{o['draws']}` | ⚫ `{o['black_wins']}`"
+            lines.append(f"`{o['eco']}` **{name}** ➜ `{o['games']}` partidas\n{results} | ⏱️ `{o['avg_plies'] / 2:.0f}` lances")
+        embed.description = "\n".join(lines)
+        embed.set_footer(text="Pontuação: vitória = 1, empate = 0,5" if jogador else "Vitórias das brancas | empates | vitórias das pretas")
+        await interaction.followup.send(embed=embed)
+
+    @app_commands.command(name="grafico", description="Ver a evolução do rating em um modo")
+    @app_commands.describe(modo="Modo de jogo", jogador="Jogador (padrão: você)")
+    async def grafico(self, interaction: discord.Interaction, modo: Literal["bullet", "blitz", "rapid", "classic"] = "blitz", jogador: discord.User = None):
+        """Mostra o gráfico de evolução do rating de um jogador."""
+        target = jogador or interaction.user
+        target_id = str(target.id)
+
+        await interaction.response.defer()
+
+        png, last_point = await rating_chart.get_rating_chart(target_id, modo, f"{target.display_name} - {modo.title()}")
+        if not last_point:
+            embed = discord.Embed(
+                title="📈 Evolução do Rating",
+                description=f"Nenhuma partida valendo rating em {modo.upper()} ainda.",
+                color=discord.Color.greyple()
+            )
+            await interaction.followup.send(embed=embed)
+            return
+        if not png:
+            await interaction.followup.send("❌ Não foi possível gerar o gráfico agora.", ephemeral=True)
+            return
+
+        peak = await database.get_peak_rating(target_id, modo)
+        embed = discord.Embed(
+            title=f"📈 Evolução do Rating - {target.display_name}",
+            description=f"**Modo:** {get_mode_emoji(modo)} {modo.upper()}",
+            color=0xCD0000
+        )
+        embed.add_field(name="Atual", value=str(last_point['rating']), inline=True)
+        if peak:
+            embed.add_field(name="Pico", value=f"{peak['rating']} (<t:{peak['recorded_at']}:d>)", inline=True)
+        embed.set_image(url="attachment://rating.png")
+        await interaction.followup.send(embed=embed, file=discord.File(fp=io.BytesIO(png), filename="rating.png"))
+
 async def setup(bot: commands.Bot) -> None:
     await bot.add_cog(Statistics(bot))
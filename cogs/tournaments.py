@@ -4,8 +4,10 @@ from discord import app_commands
 from discord.ui import View, Button
 import logging
 import database
+from database import get_mode_from_time_control
 import asyncio
-from typing import Literal
+import heapq
+from typing import Literal, Optional
 from datetime import datetime, timedelta
 import time
 
@@ -45,50 +47,44 @@ MAX_INACTIVE_ROUNDS = 2      # Máximo de rodadas inativas antes de abandono aut
 ABANDON_PENALTY_DAYS = 7     # Dias de banimento por abandono voluntário
 
 
-def get_mode_from_time_control(time_control: str) -> str:
-    """Determina o modo (bullet/blitz/rapid) baseado no time control."""
-    try:
-        # time_control vem no formato "minutos+incremento" (ex: "5+0", "10+5")
-        total_time = int(time_control.split('+')[0])
+def resolve_display_names(bot, participants, guild: Optional[discord.Guild] = None) -> dict:
+    """
+    Resolve os nomes de exibição dos participantes sem chamadas REST.
 
-        if total_time <= 2:
-            return "bullet"  # 1+0, 1+1, 2+1
-        elif total_time <= 5:
-            return "blitz"   # 3+0, 3+2, 5+0
-        else:
-            return "rapid"   # 10+0, 15+10, 30+0
-    except:
-        return "blitz"  # default fallback
+    Usa o cache do gateway (membro do servidor, depois usuário) e cai para o discord_username
+    salvo no banco. Retorna {player_id: nome}.
+    """
+    names = {}
+    for p in participants:
+        player_id = str(p['player_id'])
+        user = None
+        try:
+            if guild is not None:
+                user = guild.get_member(int(player_id))
+            if user is None:
+                user = bot.get_user(int(player_id))
+        except (TypeError, ValueError):
+            user = None
+        names[player_id] = user.display_name if user else (p.get('discord_username') or f"Player {player_id[:4]}")
+    return names
 
 
-async def get_player_rating(discord_id: str, mode: str) -> int:
-    """Busca o rating de um jogador para um modo específico."""
-    try:
-        player_stats = await database.get_all_player_stats(discord_id)
-        if player_stats:
-            rating_key = f"rating_{mode}"
-            return player_stats.get(rating_key, 1200)  # default 1200 se não encontrar
-        return 1200  # default para jogadores não registrados
-    except Exception as e:
-        logger.warning(f"Erro ao buscar rating para {discord_id}: {e}")
-        return 1200
+def participant_rating(participant: dict, mode: str) -> int:
+    """Rating do participante no modo, vindo do JOIN com players (1200 se não registrado)."""
+    return participant.get(f"rating_{mode}") or 1200
 
 
-async def format_participants_list(bot, participants, mode: str, limit: int = 10) -> list:
+async def format_participants_list(bot, participants, mode: str, limit: int = 10, guild: Optional[discord.Guild] = None) -> list:
     """Formata lista de participantes ordenada por rating (maior para menor)."""
     if not participants:
         return ["Nenhum participante ainda"]
 
-    # Busca ratings e prepara dados
+    # Nomes do cache e ratings já vindos da consulta de participantes
+    names = resolve_display_names(bot, participants, guild)
     participant_data = []
     for p in participants:
-        try:
-            user = await bot.fetch_user(int(p['player_id']))
-            display_name = user.display_name
-        except:
-            display_name = p.get('discord_username', 'Usuário desconhecido')
-
-        rating = await get_player_rating(p['player_id'], mode)
+        display_name = names[str(p['player_id'])]
+        rating = participant_rating(p, mode)
         participant_data.append({
             'name': display_name,
             'rating': rating,
@@ -145,17 +141,74 @@ async def format_swiss_standings(bot, tournament_id: int, limit: int = 10) -> st
         return "Erro ao carregar classificação."
 
 
+SWISS_DM_CONCURRENCY = 5           # Máximo de DMs simultâneas ao notificar uma rodada
+SWISS_ANNOUNCE_PAGE_CHARS = 3900   # Limite de caracteres por página (embed) do anúncio no canal
+SWISS_ANNOUNCE_MAX_EMBEDS = 10     # Limite do Discord de embeds por mensagem
+
+
+async def resolve_users(bot, discord_ids) -> dict:
+    """Resolve usuários do Discord priorizando o cache; só busca na API os que faltarem."""
+    users = {}
+    missing = []
+    for discord_id in {str(d) for d in discord_ids if d}:
+        try:
+            user = bot.get_user(int(discord_id))
+        except (TypeError, ValueError):
+            continue
+        if user:
+            users[discord_id] = user
+        else:
+            missing.append(discord_id)
+
+    if missing:
+        semaphore = asyncio.Semaphore(SWISS_DM_CONCURRENCY)
+
+        async def _fetch(discord_id):
+            async with semaphore:
+                try:
+                    users[discord_id] = await bot.fetch_user(int(discord_id))
+                except Exception as e:
+                    logger.debug(f"Não foi possível buscar usuário {discord_id}: {e}")
+
+        await asyncio.gather(*(_fetch(d) for d in missing))
+
+    return users
+
+
+def paginate_lines(lines: list, max_chars: int = SWISS_ANNOUNCE_PAGE_CHARS) -> list:
+    """Agrupa linhas em páginas de texto que respeitam o limite de caracteres."""
+    pages = []
+    current = []
+    size = 0
+    for line in lines:
+        if current and size + len(line) + 1 > max_chars:
+            pages.append("\n".join(current))
+            current = []
+            size = 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        pages.append("\n".join(current))
+    return pages
+
+
 async def notify_swiss_pairings(bot, tournament_id: int, round_number: int):
-    """Envia DMs para jogadores notificando sobre seus pairings na rodada."""
+    """Notifica em lote os pairings ainda não notificados de uma rodada.
+
+    Busca os pairings pendentes numa única consulta, resolve os usuários pelo cache,
+    publica um único anúncio paginado no canal do torneio, envia as DMs com concorrência
+    limitada e marca todos os pairings como notificados com um único UPDATE.
+    """
     try:
         # Busca informações do torneio
         tournament = await database.get_swiss_tournament(tournament_id)
         if not tournament:
             return
 
-        # Busca pairings da rodada
-        pairings = await database.get_swiss_pairings_for_round(tournament_id, round_number)
+        # Busca apenas os pairings da rodada que ainda não foram notificados
+        pairings = await database.get_unnotified_swiss_pairings(tournament_id, round_number)
         if not pairings:
+            logger.info(f"Nenhum pairing pendente de notificação no torneio {tournament_id}, rodada {round_number}")
             return
 
         # Determinar modo baseado no time_control
@@ -178,203 +231,177 @@ async def notify_swiss_pairings(bot, tournament_id: int, round_number: int):
             total_rounds = 1
 
         last_marker = " (ULTIMA RODADA)" if round_number == total_rounds else ""
+        title = f"Torneio Suíço ({tournament['name']}) - Rodada {round_number}{last_marker}"
 
-        # Para cada pairing, notifica ambos os jogadores
+        # Resolve todos os jogadores da rodada de uma vez (cache primeiro)
+        player_ids = set()
         for pairing in pairings:
-            pairing_id = pairing.get('id')
-            
-            # Verifica se já foi processado este pairing nesta rodada (evita duplicatas)
-            try:
-                processed = await database.check_pairing_notified(pairing_id)
-                if processed:
-                    logger.info(f"Pairing {pairing_id} já foi notificado, pulando...")
-                    continue
-            except Exception as e:
-                logger.debug(f"Não foi possível verificar se pairing foi notificado: {e}")
-            
-            # Caso de bye: jogador 2 é None -> o jogador 1 recebe 1 ponto automaticamente
-            if pairing.get('player2_id') is None:
-                try:
-                    player1 = await bot.fetch_user(int(pairing['player1_id']))
-                    if player1:
-                        embed = discord.Embed(
-                            title=f"Torneio Suíço ({tournament['name']}) - Rodada {round_number}{last_marker}",
-                            description=(f"Você não foi pareado nesta rodada (bye).\n"
-                                         "Você receberá +1 ponto por não ter sido pareado e ficará aguardando a próxima rodada."),
-                            color=discord.Color.orange()
-                        )
-
-                        embed.add_field(
-                            name="Detalhes",
-                            value=f"**Rodada:** {round_number}\n**Recompensa:** +1 ponto (bye)",
-                            inline=False
-                        )
-
-                        embed.set_footer(text="Aguarde a próxima rodada. Boa sorte!")
-
-                        try:
-                            await player1.send(embed=embed)
-                            logger.info(f"DM de bye enviada para {player1.name} (pairing {pairing_id})")
-                        except discord.Forbidden:
-                            logger.warning(f"Não foi possível enviar DM de bye para jogador {pairing.get('player1_id')} (DMs desabilitadas)")
-                        except Exception as e:
-                            logger.error(f"Erro ao enviar DM de bye para jogador {pairing.get('player1_id')}: {e}")
+            player_ids.add(pairing.get('player1_id'))
+            player_ids.add(pairing.get('player2_id'))
+        users = await resolve_users(bot, player_ids)
 
-                        # Atualiza as estatísticas do perfil: contabiliza um 'win' para o jogador que recebeu bye
-                        try:
-                            mode_key = mode.lower() if isinstance(mode, str) else 'rapid'
-                            await database.update_player_stats(str(pairing.get('player1_id')), mode_key, 'win')
-                        except Exception as e:
-                            logger.warning(f"Erro ao atualizar estatísticas (bye) para jogador {pairing.get('player1_id')}: {e}")
+        def _display_name(player_id, fallback):
+            user = users.get(str(player_id)) if player_id else None
+            return user.display_name if user else (fallback or 'Desconhecido')
 
-                        # Também publica no canal do torneio se houver channel_id
-                        try:
-                            channel_id = tournament.get('channel_id')
-                            if channel_id:
-                                try:
-                                    channel = bot.get_channel(int(channel_id)) or await bot.fetch_channel(int(channel_id))
-                                except Exception:
-                                    channel = None
-
-                                if channel:
-                                    try:
-                                        public_embed = discord.Embed(
-                                            title=f"Torneio Suíço ({tournament['name']}) - Rodada {round_number}{last_marker}",
-                                            description=(f"<@{pairing.get('player1_id')}> não foi pareado nesta rodada e recebeu +1 ponto (bye)."),
-                                            color=discord.Color.orange()
-                                        )
-                                        public_embed.add_field(name="Rodada", value=str(round_number), inline=True)
-                                        await channel.send(embed=public_embed)
-                                    except Exception as e:
-                                        logger.warning(f"Não foi possível enviar anúncio de bye no canal do torneio: {e}")
-                        except Exception:
-                            pass
+        dm_jobs = []  # (player_id, embed, view, pairing_id)
+        announce_lines = []
+        notified_ids = []
+        accept_ids = []
+        bye_players = []
 
-                except Exception as e:
-                    logger.error(f"Erro ao processar bye para pairing {pairing_id}: {e}")
+        for pairing in pairings:
+            pairing_id = pairing.get('id')
+            player1_id = pairing.get('player1_id')
+            player2_id = pairing.get('player2_id')
 
-                # Marca pairing como notificado
-                try:
-                    await database.mark_pairing_notified(pairing_id)
-                except Exception as e:
-                    logger.debug(f"Não foi possível marcar pairing como notificado: {e}")
-                
-                # continue para o próximo pairing
+            if not player1_id:
+                logger.warning(f"Pairing {pairing_id} tem jogador(es) None, pulando...")
                 continue
 
-            # Pareamentos normais
-            if not pairing.get('player1_id') or not pairing.get('player2_id'):
-                logger.warning(f"Pairing {pairing_id} tem jogador(es) None, pulando...")
+            # Caso de bye: jogador 2 é None -> o jogador 1 recebe 1 ponto automaticamente
+            if player2_id is None:
+                embed = discord.Embed(
+                    title=title,
+                    description=(f"Você não foi pareado nesta rodada (bye).\n"
+                                 "Você receberá +1 ponto por não ter sido pareado e ficará aguardando a próxima rodada."),
+                    color=discord.Color.orange()
+                )
+                embed.add_field(
+                    name="Detalhes",
+                    value=f"**Rodada:** {round_number}\n**Recompensa:** +1 ponto (bye)",
+                    inline=False
+                )
+                embed.set_footer(text="Aguarde a próxima rodada. Boa sorte!")
+
+                dm_jobs.append((player1_id, embed, None, pairing_id))
+                announce_lines.append(f"🟠 <@{player1_id}> — bye (+1 ponto)")
+                bye_players.append(str(player1_id))
+                notified_ids.append(pairing_id)
                 continue
-            
-            # Busca os nomes dos jogadores uma única vez
-            try:
-                player1 = await bot.fetch_user(int(pairing['player1_id']))
-                player1_name = player1.display_name if player1 else pairing.get('player1_name', 'Desconhecido')
-            except:
-                player1 = None
-                player1_name = pairing.get('player1_name', 'Desconhecido')
 
-            try:
-                player2 = await bot.fetch_user(int(pairing['player2_id']))
-                player2_name = player2.display_name if player2 else pairing.get('player2_name', 'Desconhecido')
-            except:
-                player2 = None
-                player2_name = pairing.get('player2_name', 'Desconhecido')
+            player1_name = _display_name(player1_id, pairing.get('player1_name'))
+            player2_name = _display_name(player2_id, pairing.get('player2_name'))
 
-            # Criar view com botão de aceitar
+            # Criar view com botão de aceitar (compartilhada pelos dois jogadores)
             view = AcceptSwissGameView(
                 bot=bot,
                 tournament_id=tournament_id,
                 pairing_id=pairing_id,
-                player1_id=pairing['player1_id'],
-                player2_id=pairing['player2_id'],
+                player1_id=player1_id,
+                player2_id=player2_id,
                 round_number=round_number
             )
-            
-            # Notifica jogador 1
-            if player1:
-                try:
-                    embed = discord.Embed(
-                        title=f"Torneio Suíço ({tournament['name']}) - Rodada {round_number}{last_marker}",
-                        description=f"Você foi pareado contra {player2_name}!",
-                        color=discord.Color.blue()
-                    )
 
-                    embed.add_field(
-                        name="Detalhes da Partida",
-                        value=f"**Oponente:** {player2_name}\n**Rodada:** {round_number}\n**Modo:** {mode}",
-                        inline=False
-                    )
+            for player_id, opponent_name in ((player1_id, player2_name), (player2_id, player1_name)):
+                embed = discord.Embed(
+                    title=title,
+                    description=f"Você foi pareado contra {opponent_name}!",
+                    color=discord.Color.blue()
+                )
+                embed.add_field(
+                    name="Detalhes da Partida",
+                    value=f"**Oponente:** {opponent_name}\n**Rodada:** {round_number}\n**Modo:** {mode}",
+                    inline=False
+                )
+                embed.add_field(
+                    name="Ação Necessária",
+                    value="Clique no botão abaixo para aceitar a partida e iniciar!",
+                    inline=False
+                )
+                dm_jobs.append((player_id, embed, view, pairing_id))
 
-                    embed.add_field(
-                        name="Ação Necessária",
-                        value="Clique no botão abaixo para aceitar a partida e iniciar!",
-                        inline=False
-                    )
+            announce_lines.append(f"♟️ <@{player1_id}> vs <@{player2_id}>")
+            notified_ids.append(pairing_id)
+            accept_ids.append(pairing_id)
 
-                    await player1.send(embed=embed, view=view)
-                    logger.info(f"DM enviada para {player1_name} sobre pairing na rodada {round_number}")
+        # Marca todos os pairings como notificados antes de enviar, evitando duplicatas
+        # caso a rodada seja processada novamente enquanto as DMs estão saindo
+        try:
+            await database.mark_pairings_notified(notified_ids)
+        except Exception as e:
+            logger.debug(f"Não foi possível marcar pairings como notificados: {e}")
 
-                except discord.Forbidden:
-                    logger.warning(f"Não foi possível enviar DM para jogador {pairing['player1_id']} (DMs desabilitadas)")
-                except Exception as e:
-                    logger.error(f"Erro ao enviar DM para jogador {pairing['player1_id']}: {e}")
+        # Prazos de aceitação, persistidos e controlados pelo agendador único
+        try:
+            await get_deadline_scheduler(bot).schedule([
+                {
+                    'tournament_id': tournament_id,
+                    'pairing_id': pairing_id,
+                    'round_number': round_number,
+                    'kind': 'accept',
+                    'delay': TIMEOUT_ACCEPT_MINUTES * 60,
+                }
+                for pairing_id in accept_ids
+            ])
+        except Exception as e:
+            logger.error(f"Erro ao agendar prazos de aceitação da rodada {round_number}: {e}")
 
-            # Notifica jogador 2
-            if player2:
-                try:
-                    embed = discord.Embed(
-                        title=f"Torneio Suíço ({tournament['name']}) - Rodada {round_number}{last_marker}",
-                        description=f"Você foi pareado contra {player1_name}!",
-                        color=discord.Color.blue()
-                    )
+        # Bye: contabiliza um 'win' no perfil do jogador
+        mode_key = mode.lower() if isinstance(mode, str) else 'rapid'
+        for player_id in bye_players:
+            try:
+                await database.update_player_stats(player_id, mode_key, 'win')
+            except Exception as e:
+                logger.warning(f"Erro ao atualizar estatísticas (bye) para jogador {player_id}: {e}")
 
-                    embed.add_field(
-                        name="Detalhes da Partida",
-                        value=f"**Oponente:** {player1_name}\n**Rodada:** {round_number}\n**Modo:** {mode}",
-                        inline=False
+        # Anúncio único e paginado no canal do torneio
+        channel_id = tournament.get('channel_id')
+        if channel_id and announce_lines:
+            try:
+                channel = bot.get_channel(int(channel_id)) or await bot.fetch_channel(int(channel_id))
+            except Exception:
+                channel = None
+
+            if channel:
+                pages = paginate_lines(announce_lines)
+                embeds = []
+                for index, page in enumerate(pages, 1):
+                    page_embed = discord.Embed(
+                        title=title if index == 1 else f"{title} ({index}/{len(pages)})",
+                        description=page,
+                        color=discord.Color.blue()
                     )
+                    embeds.append(page_embed)
+                embeds[-1].set_footer(text=f"{len(notified_ids)} pairing(s) • Os jogadores foram notificados via DM")
 
-                    embed.add_field(
-                        name="Ação Necessária",
-                        value="Clique no botão abaixo para aceitar a partida e iniciar!",
-                        inline=False
-                    )
+                try:
+                    for start in range(0, len(embeds), SWISS_ANNOUNCE_MAX_EMBEDS):
+                        await channel.send(embeds=embeds[start:start + SWISS_ANNOUNCE_MAX_EMBEDS])
+                except Exception as e:
+                    logger.warning(f"Não foi possível enviar anúncio da rodada no canal do torneio: {e}")
 
-                    await player2.send(embed=embed, view=view)
-                    logger.info(f"DM enviada para {player2_name} sobre pairing na rodada {round_number}")
+        # Envia as DMs com concorrência limitada
+        semaphore = asyncio.Semaphore(SWISS_DM_CONCURRENCY)
 
+        async def _send_dm(player_id, embed, view, pairing_id):
+            user = users.get(str(player_id))
+            if not user:
+                logger.warning(f"Usuário {player_id} não encontrado para notificar pairing {pairing_id}")
+                return False
+            async with semaphore:
+                try:
+                    if view is not None:
+                        await user.send(embed=embed, view=view)
+                    else:
+                        await user.send(embed=embed)
+                    return True
                 except discord.Forbidden:
-                    logger.warning(f"Não foi possível enviar DM para jogador {pairing['player2_id']} (DMs desabilitadas)")
+                    logger.warning(f"Não foi possível enviar DM para jogador {player_id} (DMs desabilitadas)")
                 except Exception as e:
-                    logger.error(f"Erro ao enviar DM para jogador {pairing['player2_id']}: {e}")
+                    logger.error(f"Erro ao enviar DM para jogador {player_id}: {e}")
+                return False
 
-            # Marca pairing como notificado
-            try:
-                await database.mark_pairing_notified(pairing_id)
-            except Exception as e:
-                logger.debug(f"Não foi possível marcar pairing como notificado: {e}")
+        results = await asyncio.gather(*(_send_dm(*job) for job in dm_jobs))
+        logger.info(
+            f"Rodada {round_number} do torneio {tournament_id}: {len(notified_ids)} pairing(s) notificados, "
+            f"{sum(1 for r in results if r)}/{len(dm_jobs)} DM(s) enviadas"
+        )
 
     except Exception as e:
         logger.error(f"Erro ao notificar pairings suíços: {e}")
 
 
-async def mark_pairing_notified(pairing_id: int) -> bool:
-    """Marca um pairing como notificado."""
-    try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("UPDATE swiss_pairings SET notified = 1 WHERE id = ?", (pairing_id,))
-        conn.commit()
-        
-        return True
-    except Exception as e:
-        logger.error(f"Erro ao marcar pairing como notificado: {e}")
-        return False
-
-
 # Cache para rastrear rodadas em processamento (evita múltiplas chamadas a handle_swiss_round_completion)
 _swiss_round_processing = {}  # {tournament_id: {round_number: timestamp}}
 
@@ -955,9 +982,153 @@ async def redistribute_pairings(tournament_id: int, round_number: int):
         logger.error(f"Erro ao redistribuir pareamentos para torneio {tournament_id}: {e}")
 
 
+class SwissDeadlineScheduler:
+    """
+    Agendador único dos prazos dos pairings suíços (aceitação e finalização).
+
+    Os prazos ficam persistidos em swiss_deadlines e numa min-heap em memória; um único
+    loop dorme até o próximo vencimento e dispara handle_pairing_timeout /
+    handle_game_finish_timeout. Na inicialização os prazos pendentes são recarregados do
+    banco, então sobrevivem a reinícios do bot.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._heap = []  # (due_at, deadline_id, kind, tournament_id, pairing_id, round_number)
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def start(self):
+        """Recarrega os prazos pendentes do banco e inicia o loop (idempotente)."""
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            pending = await database.get_pending_swiss_deadlines()
+            for deadline in pending:
+                self._push(deadline)
+            logger.info(f"⏰ Agendador de prazos suíços iniciado com {len(pending)} prazo(s) pendente(s)")
+        except Exception as e:
+            logger.error(f"Erro ao recarregar prazos suíços: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _push(self, deadline: dict):
+        heapq.heappush(self._heap, (
+            int(deadline['due_at']), deadline['id'], deadline['kind'],
+            deadline['tournament_id'], deadline['pairing_id'], deadline['round_number']
+        ))
+        self._wakeup.set()
+
+    async def schedule(self, deadlines: list):
+        """Persiste e agenda vários prazos de uma vez.
+
+        Cada item: dict com tournament_id, pairing_id, round_number, kind e delay (segundos).
+        """
+        now = time.time()
+        rows = [dict({k: v for k, v in d.items() if k != 'delay'}, due_at=int(now + d['delay'])) for d in deadlines]
+        for deadline in await database.schedule_swiss_deadlines(rows):
+            self._push(deadline)
+
+    async def cancel(self, pairing_id: int, kind: str = None):
+        """Cancela os prazos de um pairing (a entrada na heap é descartada ao vencer)."""
+        await database.cancel_swiss_deadlines(pairing_id, kind)
+
+    async def _run(self):
+        while True:
+            try:
+                self._wakeup.clear()
+                if not self._heap:
+                    await self._wakeup.wait()
+                    continue
+
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                due_at, deadline_id, kind, tournament_id, pairing_id, round_number = heapq.heappop(self._heap)
+                # Só dispara se o prazo ainda estiver pendente com o mesmo vencimento
+                if not await database.claim_swiss_deadline(deadline_id, due_at):
+                    continue
+                asyncio.create_task(self._fire(kind, tournament_id, pairing_id, round_number))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Erro no agendador de prazos suíços: {e}", exc_info=True)
+                await asyncio.sleep(1)
+
+    async def _fire(self, kind: str, tournament_id: int, pairing_id: int, round_number: int):
+        pairing = await database.get_swiss_pairing_by_id(pairing_id)
+        if not pairing or pairing.get('status') == 'finished':
+            return
+
+        if kind == 'accept':
+            # Jogo criado significa que ambos aceitaram; o prazo de finalização assume
+            if not pairing.get('game_url'):
+                await handle_pairing_timeout(self.bot, tournament_id, pairing_id, round_number)
+        elif kind == 'finish':
+            await handle_game_finish_timeout(self.bot, tournament_id, pairing_id, round_number)
+
+
+_deadline_scheduler: Optional[SwissDeadlineScheduler] = None
+_persistent_views_registered = False
+
+
+def get_deadline_scheduler(bot) -> SwissDeadlineScheduler:
+    """Retorna o agendador de prazos suíços do bot (criado na primeira chamada)."""
+    global _deadline_scheduler
+    if _deadline_scheduler is None:
+        _deadline_scheduler = SwissDeadlineScheduler(bot)
+    return _deadline_scheduler
+
+
+async def register_persistent_views(bot) -> int:
+    """
+    Reanexa no startup as views de torneio (entrar/sair, aceitar e finalizar partidas suíças).
+
+    Todas usam custom_id fixo e timeout=None, então registrá-las sem message_id basta para os
+    botões das mensagens já enviadas voltarem a funcionar. Os dados vêm de uma única consulta.
+    """
+    global _persistent_views_registered
+    if _persistent_views_registered:
+        return 0
+
+    from cogs.official_tournament import JoinOfficialTournamentView
+
+    rows = await database.get_persistent_view_state()
+    for row in rows:
+        try:
+            if row['kind'] == 'official':
+                bot.add_view(JoinOfficialTournamentView(bot, row['id'], row['mode']))
+            elif row['kind'] == 'swiss':
+                bot.add_view(JoinSwissView(bot, row['id'], row['status']))
+            elif row['game_url']:
+                bot.add_view(FinishSwissGameView(bot, row['id'], row['player1_id'], row['player2_id']))
+            else:
+                accepted_by = set(filter(None, (row['accepted_by'] or '').split(',')))
+                bot.add_view(AcceptSwissGameView(
+                    bot, row['tournament_id'], row['id'], row['player1_id'], row['player2_id'],
+                    row['round_number'], accepted_by=accepted_by
+                ))
+        except Exception as e:
+            logger.error(f"Erro ao registrar view persistente ({row['kind']} {row['id']}): {e}")
+
+    _persistent_views_registered = True
+    logger.info(f"🔁 {len(rows)} view(s) de torneio reanexadas após o startup")
+    return len(rows)
+
+
 class AcceptSwissGameView(View):
-    def __init__(self, bot: commands.Bot, tournament_id: int, pairing_id: int, player1_id: str, player2_id: str, round_number: int):
-        super().__init__(timeout=TIMEOUT_ACCEPT_MINUTES * 60)  # Timeout em segundos
+    def __init__(self, bot: commands.Bot, tournament_id: int, pairing_id: int, player1_id: str, player2_id: str, round_number: int, accepted_by: set = None):
+        # Persistente: o prazo de aceitação fica no SwissDeadlineScheduler (no banco), não no timeout da view
+        super().__init__(timeout=None)
         self.bot = bot
         self.tournament_id = tournament_id
         self.pairing_id = pairing_id
@@ -965,14 +1136,11 @@ class AcceptSwissGameView(View):
         self.player2_id = player2_id
         self.round_number = round_number
         self.finish_button = None
-        self.accepted_by = set()  # Rastreia quem já aceitou
+        self.accepted_by = set(accepted_by or ())  # Rastreia quem já aceitou (espelhado em swiss_pairings.accepted_by)
         self.game_created = False
         self.game_creation_lock = asyncio.Lock()  # Lock para prevenir race conditions
         self.result_processing_lock = asyncio.Lock()  # Lock para prevenir processamento duplicado de resultados
 
-        # Agendar verificação de timeout
-        self.timeout_task = asyncio.create_task(self._schedule_timeout_check())
-
         # Botão Abandonar Torneio
         abandon_button = Button(label="🚪 Abandonar", style=discord.ButtonStyle.secondary, custom_id=f"abandon_swiss_tournament:{self.tournament_id}:{self.pairing_id}")
 
@@ -1064,8 +1232,12 @@ class AcceptSwissGameView(View):
                 await interaction.followup.send("❌ Você não faz parte desta partida!", ephemeral=True)
                 return
 
-            # Rastrear que este jogador aceitou
+            # Rastrear que este jogador aceitou (persistido para sobreviver a reinícios)
             self.accepted_by.add(user_id)
+            try:
+                self.accepted_by |= await database.mark_swiss_pairing_accepted(self.pairing_id, user_id)
+            except Exception as e:
+                logger.error(f"Erro ao salvar aceitação do pairing {self.pairing_id}: {e}")
             logger.info(f"✅ Jogador {user_id} aceitou o pairing {self.pairing_id}")
 
             try:
@@ -1127,8 +1299,19 @@ class AcceptSwissGameView(View):
                             # Marcar que o jogo foi criado
                             self.game_created = True
 
-                            # Agendar verificação de timeout para finalização
-                            asyncio.create_task(self._schedule_finish_timeout())
+                            # Troca o prazo de aceitação pelo prazo de finalização
+                            try:
+                                scheduler = get_deadline_scheduler(self.bot)
+                                await scheduler.cancel(self.pairing_id, 'accept')
+                                await scheduler.schedule([{
+                                    'tournament_id': self.tournament_id,
+                                    'pairing_id': self.pairing_id,
+                                    'round_number': self.round_number,
+                                    'kind': 'finish',
+                                    'delay': TIMEOUT_FINISH_HOURS * 3600,
+                                }])
+                            except Exception as e:
+                                logger.error(f"Erro ao agendar prazo de finalização do pairing {self.pairing_id}: {e}")
 
                 # Buscar nomes dos jogadores para o embed
                 player1_user = await self.bot.fetch_user(int(self.player1_id))
@@ -1193,99 +1376,6 @@ class AcceptSwissGameView(View):
         self.add_item(accept_button)
         logger.info(f"Botão de aceitar adicionado para torneio {self.tournament_id}, pairing {self.pairing_id}")
 
-    async def _schedule_timeout_check(self):
-        """Agenda verificação de timeout para aceitação do pairing"""
-        await asyncio.sleep(TIMEOUT_ACCEPT_MINUTES * 60)  # Converter para segundos
-        
-        # Verificar se ainda não foi aceito por ambos
-        if len(self.accepted_by) < 2:
-            await self.on_timeout()
-
-    async def _schedule_finish_timeout(self):
-        """Agenda verificação de timeout para finalização do jogo"""
-        await asyncio.sleep(TIMEOUT_FINISH_HOURS * 3600)  # Converter para segundos
-        
-        # Verificar se o jogo ainda não foi finalizado
-        pairing = await database.get_swiss_pairing_by_id(self.pairing_id)
-        if pairing and not pairing.get('finished', False):
-            await self.on_game_finish_timeout()
-
-    async def on_timeout(self):
-        """Chamado quando o timeout de aceitação é atingido"""
-        try:
-            logger.info(f"⏰ Timeout atingido para pairing {self.pairing_id}")
-            
-            # Buscar pairing
-            pairing = await database.get_swiss_pairing_by_id(self.pairing_id)
-            if not pairing:
-                return
-            
-            # Determinar quem não aceitou
-            player1_id = pairing.get('player1_id')
-            player2_id = pairing.get('player2_id')
-            
-            if not player1_id or not player2_id:
-                # É um bye, não fazer nada
-                return
-            
-            non_accepted = []
-            if player1_id not in self.accepted_by:
-                non_accepted.append(player1_id)
-            if player2_id not in self.accepted_by:
-                non_accepted.append(player2_id)
-            
-            if non_accepted:
-                # Aplicar penalidade aos jogadores que não aceitaram
-                for player_id in non_accepted:
-                    await handle_pairing_timeout(self.bot, self.tournament_id, self.pairing_id, self.round_number)
-                
-                # Redistribuir pareamentos se necessário
-                await redistribute_pairings(self.tournament_id, self.round_number)
-            
-        except Exception as e:
-            logger.error(f"Erro no timeout de aceitação: {e}")
-
-    async def on_game_finish_timeout(self):
-        """Chamado quando o timeout de finalização do jogo é atingido"""
-        try:
-            logger.info(f"⏰ Timeout de finalização atingido para pairing {self.pairing_id}")
-            
-            # Buscar pairing
-            pairing = await database.get_swiss_pairing_by_id(self.pairing_id)
-            if not pairing:
-                return
-            
-            game_url = pairing.get('game_url')
-            if not game_url:
-                return
-            
-            # Consultar resultado no Lichess
-            import lichess_api
-            outcome = await lichess_api.get_game_outcome(game_url)
-            
-            if outcome:
-                # Finalizar o jogo com o resultado determinado
-                await handle_game_finish_timeout(self.tournament_id, self.pairing_id, outcome)
-            else:
-                # Se não conseguir determinar, dar vitória ao jogador que aceitou primeiro
-                player1_id = pairing.get('player1_id')
-                player2_id = pairing.get('player2_id')
-                
-                winner_id = None
-                if player1_id in self.accepted_by and player2_id not in self.accepted_by:
-                    winner_id = player1_id
-                elif player2_id in self.accepted_by and player1_id not in self.accepted_by:
-                    winner_id = player2_id
-                
-                if winner_id:
-                    await handle_game_finish_timeout(self.tournament_id, self.pairing_id, {'winner': winner_id, 'status': 'timeout'})
-                else:
-                    # Empate por timeout mútuo
-                    await handle_game_finish_timeout(self.tournament_id, self.pairing_id, {'winner': None, 'status': 'timeout_draw'})
-            
-        except Exception as e:
-            logger.error(f"Erro no timeout de finalização: {e}")
-
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         """Verificar se a interação é válida"""
         user_id = str(interaction.user.id)
@@ -1300,565 +1390,51 @@ class AcceptSwissGameView(View):
             
         return False
 
-        # Botão Aceitar Partida
-        accept_button = Button(label="Aceitar Partida", style=discord.ButtonStyle.green, custom_id=f"accept_swiss_game:{pairing_id}")
 
-        async def _accept_callback(interaction: discord.Interaction):
+class FinishSwissGameView(View):
+    """View simples apenas com o botão 'Finalizar Partida' para o embed de desafio criado."""
+    def __init__(self, bot: commands.Bot, pairing_id: int, player1_id: str, player2_id: str):
+        super().__init__(timeout=None)  # Botão permanente
+        self.bot = bot
+        self.pairing_id = pairing_id
+        self.player1_id = player1_id
+        self.player2_id = player2_id
+
+        finish_button = Button(label="Finalizar Partida", style=discord.ButtonStyle.red, custom_id=f"finish_swiss_game_simple:{self.pairing_id}")
+
+        async def _finish_callback(interaction: discord.Interaction):
+            # Defer IMEDIATAMENTE para evitar expiração da interação
+            try:
+                await interaction.response.defer()
+            except Exception as e:
+                logger.warning(f"Erro ao fazer defer na interação: {e}")
+                return
+            
             if not self.player1_id or not self.player2_id:
-                await interaction.response.defer(ephemeral=True)
                 await interaction.followup.send("❌ Este pairing tem um jogador inválido (bye)!", ephemeral=True)
                 return
             
-            await interaction.response.defer(ephemeral=True)
             user_id = str(interaction.user.id)
 
             # Verificar rate limiting
-            if not check_rate_limit(user_id, f"accept_pairing_{self.pairing_id}"):
+            if not check_rate_limit(user_id, f"finish_game_{self.pairing_id}"):
                 await interaction.followup.send("❌ Aguarde um momento antes de tentar novamente.", ephemeral=True)
                 return
 
-            # Verificar se o torneio ainda está ativo
-            tournament = await database.get_swiss_tournament(self.tournament_id)
-            if not tournament or tournament.get('status') != 'in_progress':
-                await interaction.followup.send("❌ Este torneio não está mais ativo!", ephemeral=True)
-                return
-
             # Verificar se o usuário é um dos jogadores do pairing
             if user_id not in [self.player1_id, self.player2_id]:
                 await interaction.followup.send("❌ Você não faz parte desta partida!", ephemeral=True)
                 return
 
-            # Rastrear que este jogador aceitou
-            self.accepted_by.add(user_id)
-            logger.info(f"✅ Jogador {user_id} aceitou o pairing {self.pairing_id}")
-
             try:
-                # Buscar pairing atual para verificar se já existe game_url
                 pairing = await database.get_swiss_pairing_by_id(self.pairing_id)
                 if not pairing:
                     await interaction.followup.send("❌ Pairing não encontrado!", ephemeral=True)
                     return
 
-                # Se já tem URL de jogo, reusar a mesma
-                if pairing.get('game_url'):
-                    game_url = pairing['game_url']
-                    logger.info(f"🎮 Reusando URL existente para pairing {self.pairing_id}: {game_url}")
-                else:
-                    # Verificar se ambos aceitaram antes de criar o jogo
-                    if len(self.accepted_by) < 2:
-                        await interaction.followup.send("✅ Partida aceita! Aguardando o outro jogador aceitar também.", ephemeral=True)
-                        return
-
-                    # Usar lock para prevenir race conditions na criação do jogo
-                    async with self.game_creation_lock:
-                        # Verificar novamente dentro do lock (double-check)
-                        if self.game_created:
-                            # Outro jogador já criou o jogo, apenas continuar
-                            pass
-                        else:
-                            # Ambos aceitaram - criar o jogo
-                            # Buscar informações do torneio
-                            tournament = await database.get_swiss_tournament(self.tournament_id)
-                            if not tournament:
-                                await interaction.followup.send("❌ Torneio não encontrado!", ephemeral=True)
-                                return
-
-                            # Determinar modo baseado no time_control
-                            time_control_str = tournament.get('time_control', '10+0')
-                            try:
-                                total_time = int(time_control_str.split('+')[0])
-                                if total_time <= 2:
-                                    mode = "bullet"
-                                elif total_time <= 5:
-                                    mode = "blitz"
-                                else:
-                                    mode = "rapid"
-                            except:
-                                mode = "rapid"
-
-                            # Criar desafio aberto via Lichess API (sempre não-rated para torneios suíços)
-                            import lichess_api
-                            game_url = await lichess_api.create_swiss_game(time_control_str, rated=False)
-
-                            if not game_url:
-                                await interaction.followup.send("❌ Erro ao criar a partida. Tente novamente.", ephemeral=True)
-                                return
-
-                            # Atualizar o pairing com a URL do jogo
-                            logger.info(f"🎮 Jogo criado para pairing {self.pairing_id}: {game_url}")
-                            await database.update_swiss_pairing_game_url(self.pairing_id, game_url)
-
-                            # Marcar que o jogo foi criado
-                            self.game_created = True
-
-                            # Agendar verificação de timeout para finalização
-                            asyncio.create_task(self._schedule_finish_timeout())
-
-                # Buscar nomes dos jogadores para o embed
-                player1_user = await self.bot.fetch_user(int(self.player1_id))
-                player2_user = await self.bot.fetch_user(int(self.player2_id))
-
-                player1_name = player1_user.display_name if player1_user else "Jogador 1"
-                player2_name = player2_user.display_name if player2_user else "Jogador 2"
-
-                # Buscar time_control do pairing/torneio
-                time_control_str = pairing.get('time_control', '10+0')
-
-                # Criar embed de desafio criado
-                embed = discord.Embed(
-                    title="🎯 Desafio Criado!",
-                    description="Um desafio do torneio foi criado! Ambos os jogadores devem acessar o link para jogar.",
-                    color=discord.Color.green()
-                )
-                embed.add_field(
-                    name="🎲 Jogadores",
-                    value=f"{player1_name} vs {player2_name}",
-                    inline=False
-                )
-                embed.add_field(
-                    name="⏱️ Tempo",
-                    value=time_control_str,
-                    inline=True
-                )
-                embed.add_field(
-                    name="🎮 Acessar Desafio",
-                    value=f"[Clique aqui para aceitar e jogar]({game_url})",
-                    inline=False
-                )
-                embed.set_footer(text="Quando a partida terminar, clique no botão 'Finalizar' para processar o resultado.")
-
-                await interaction.followup.send(embed=embed, ephemeral=True)
-
-            except Exception as e:
-                logger.error(f"Erro ao aceitar partida suíça: {e}")
-                await interaction.followup.send(f"❌ Erro interno: {e}", ephemeral=True)
-
-        accept_button.callback = _accept_callback
-        self.add_item(accept_button)
-        logger.info(f"Botão de aceitar adicionado para torneio {self.tournament_id}, pairing {self.pairing_id}")
-
-        # Botão Abandonar Torneio
-        abandon_button = Button(label="🚪 Abandonar", style=discord.ButtonStyle.secondary, custom_id=f"abandon_swiss_tournament:{self.tournament_id}:{self.pairing_id}")
-
-        async def _abandon_callback(interaction: discord.Interaction):
-            logger.info(f"Botão de abandono clicado por {interaction.user.id} no torneio {self.tournament_id}")
-            user_id = str(interaction.user.id)
-
-            # Verificar rate limiting
-            if not check_rate_limit(user_id, f"abandon_tournament_{self.tournament_id}"):
-                await interaction.response.defer(ephemeral=True)
-                await interaction.followup.send("❌ Aguarde um momento antes de tentar novamente.", ephemeral=True)
-                return
-
-            # Verificar se o torneio ainda está ativo
-            tournament = await database.get_swiss_tournament(self.tournament_id)
-            if not tournament or tournament.get('status') != 'in_progress':
-                await interaction.response.defer(ephemeral=True)
-                await interaction.followup.send("❌ Este torneio não está mais ativo!", ephemeral=True)
-                return
-
-            # Verificar se o usuário é um dos jogadores do torneio
-            if user_id not in [self.player1_id, self.player2_id]:
-                await interaction.response.defer(ephemeral=True)
-                await interaction.followup.send("❌ Você não faz parte deste torneio!", ephemeral=True)
-                return
-
-            await interaction.response.defer(ephemeral=True)
-
-            try:
-                # Buscar informações do torneio
-                tournament = await database.get_swiss_tournament(self.tournament_id)
-                if not tournament:
-                    await interaction.followup.send("❌ Torneio não encontrado!", ephemeral=True)
-                    return
-
-                # Criar embed de confirmação
-                embed_confirm = discord.Embed(
-                    title="🚪 Confirmar Abandono de Torneio",
-                    description=f"Tem certeza que deseja abandonar o torneio **{tournament.get('name', 'Suíço')}**?",
-                    color=discord.Color.red()
-                )
-                embed_confirm.add_field(
-                    name="⚠️ Consequências",
-                    value="• Todas as suas partidas restantes serão consideradas derrotas\n• Você não poderá participar de torneios por 7 dias\n• Esta ação não pode ser desfeita",
-                    inline=False
-                )
-                embed_confirm.set_footer(text="Clique em 'Confirmar' para prosseguir ou cancele esta mensagem.")
-
-                # Criar view de confirmação
-                confirm_view = AbandonConfirmView(self.bot, self.tournament_id, user_id)
-                await interaction.followup.send(embed=embed_confirm, view=confirm_view, ephemeral=True)
-
-            except Exception as e:
-                logger.error(f"Erro ao processar abandono via botão: {e}")
-                await interaction.followup.send(f"❌ Erro interno: {e}", ephemeral=True)
-
-        abandon_button.callback = _abandon_callback
-        try:
-            self.add_item(abandon_button)
-            logger.info(f"Botão de abandono adicionado para torneio {self.tournament_id}, pairing {self.pairing_id}")
-        except Exception as e:
-            logger.error(f"Erro ao adicionar botão de abandono: {e}")
-
-        self.finish_button = Button(label="Finalizar Partida", style=discord.ButtonStyle.red, custom_id=f"finish_swiss_game:{self.pairing_id}")
-
-        async def _finish_callback(interaction: discord.Interaction):
-            if not self.player1_id or not self.player2_id:
-                try:
-                    await interaction.response.defer(ephemeral=True)
-                    await interaction.followup.send("❌ Este pairing tem um jogador inválido (bye)!", ephemeral=True)
-                except:
-                    pass
-                return
-            
-            user_id = str(interaction.user.id)
-            
-            try:
-                await interaction.response.defer(ephemeral=True)
-            except discord.errors.NotFound:
-                logger.warning(f"Interação expirada para pairing {self.pairing_id}")
-                return
-
-            # Verificar rate limiting
-            if not check_rate_limit(user_id, f"finish_game_{self.pairing_id}"):
-                try:
-                    await interaction.followup.send("❌ Aguarde um momento antes de tentar novamente.", ephemeral=True)
-                except:
-                    pass
-                return
-
-            # Verificar se o torneio ainda está ativo
-            tournament = await database.get_swiss_tournament(self.tournament_id)
-            if not tournament or tournament.get('status') != 'in_progress':
-                try:
-                    await interaction.followup.send("❌ Este torneio não está mais ativo!", ephemeral=True)
-                except:
-                    pass
-                return
-
-            if user_id not in [self.player1_id, self.player2_id]:
-                try:
-                    await interaction.followup.send("❌ Você não faz parte desta partida!", ephemeral=True)
-                except:
-                    pass
-                return
-
-            try:
-                pairing = await database.get_swiss_pairing_by_id(self.pairing_id)
-                if not pairing:
-                    try:
-                        await interaction.followup.send("❌ Pairing não encontrado!", ephemeral=True)
-                    except:
-                        pass
-                    return
-
-                if pairing.get('status') == 'finished' or pairing.get('winner_id'):
-                    try:
-                        await interaction.followup.send("⚠️ Esta partida já foi finalizada!", ephemeral=True)
-                    except:
-                        pass
-                    return
-
-                # Usar lock para prevenir processamento duplicado
-                async with self.result_processing_lock:
-                    # Verificar novamente dentro do lock
-                    pairing = await database.get_swiss_pairing_by_id(self.pairing_id)
-                    if pairing.get('status') == 'finished' or pairing.get('winner_id'):
-                        try:
-                            await interaction.followup.send("⚠️ Esta partida já foi finalizada!", ephemeral=True)
-                        except:
-                            pass
-                        return
-
-                game_url = pairing.get('game_url')
-                if not game_url:
-                    try:
-                        await interaction.followup.send("❌ URL do jogo não encontrada!", ephemeral=True)
-                    except:
-                        pass
-                    return
-
-                import lichess_api
-                outcome = await lichess_api.get_game_outcome(game_url)
-
-                if not outcome:
-                    try:
-                        await interaction.followup.send("❌ Não foi possível obter o resultado da partida.", ephemeral=True)
-                    except:
-                        pass
-                    return
-
-                if not outcome.get('finished'):
-                    try:
-                        await interaction.followup.send("⏳ A partida ainda não terminou. Tente novamente mais tarde.", ephemeral=True)
-                    except:
-                        pass
-                    return
-
-                white_user = outcome['players']['white']['username']
-                black_user = outcome['players']['black']['username']
-                is_draw = outcome.get('is_draw', False)
-                winner_color = outcome.get('winner_color')
-                winner_username = outcome.get('winner_username')
-                reason = outcome.get('reason', 'unknown')
-
-                def _get_players():
-                    conn = database.get_conn()
-                    cur = conn.cursor()
-                    p_white = cur.execute("SELECT * FROM players WHERE lichess_username = ?", (white_user,)).fetchone() if white_user else None
-                    p_black = cur.execute("SELECT * FROM players WHERE lichess_username = ?", (black_user,)).fetchone() if black_user else None
-                    conn.close()
-                    return p_white, p_black
-
-                p_white, p_black = await asyncio.to_thread(_get_players)
-                p_white = dict(p_white) if p_white else None
-                p_black = dict(p_black) if p_black else None
-
-                # Validação rigorosa: verificar se os usernames encontrados correspondem aos jogadores do pairing
-                expected_player1_lichess = None
-                expected_player2_lichess = None
-                
-                # Buscar usernames esperados dos jogadores do pairing
-                if challenger_id:
-                    p1_data = await database.get_player_by_discord_id(challenger_id)
-                    expected_player1_lichess = p1_data.get('lichess_username') if p1_data else None
-                if challenged_id:
-                    p2_data = await database.get_player_by_discord_id(challenged_id)
-                    expected_player2_lichess = p2_data.get('lichess_username') if p2_data else None
-
-                # Validar mapeamento
-                if p_white and expected_player1_lichess and p_white.get('lichess_username') != expected_player1_lichess and expected_player2_lichess and p_white.get('lichess_username') != expected_player2_lichess:
-                    logger.warning(f"Username Lichess inválido para white: {white_user} não corresponde aos jogadores do pairing")
-                    p_white = None
-                if p_black and expected_player1_lichess and p_black.get('lichess_username') != expected_player1_lichess and expected_player2_lichess and p_black.get('lichess_username') != expected_player2_lichess:
-                    logger.warning(f"Username Lichess inválido para black: {black_user} não corresponde aos jogadores do pairing")
-                    p_black = None
-
-                challenger_id = pairing.get('player1_id')
-                challenged_id = pairing.get('player2_id')
-
-                winner_id = None
-                loser_id = None
-                result = None
-
-                player1_id = challenger_id
-                player2_id = challenged_id
-
-                if is_draw:
-                    result = 'draw'
-                    winner_id = None
-                    loser_id = None
-                    reason_text = "Empate"
-                else:
-                    if winner_username:
-                        if p_white and p_white.get('lichess_username') == winner_username:
-                            winner_id = p_white['discord_id']
-                            loser_id = p_black['discord_id'] if p_black else (player2_id if winner_id == player1_id else player1_id)
-                        elif p_black and p_black.get('lichess_username') == winner_username:
-                            winner_id = p_black['discord_id']
-                            loser_id = p_white['discord_id'] if p_white else (player1_id if winner_id == player2_id else player2_id)
-
-                    if not winner_id and winner_color:
-                        if winner_color == 'white' and p_white:
-                            winner_id = p_white['discord_id']
-                            loser_id = p_black['discord_id'] if p_black else (player2_id if winner_id == player1_id else player1_id)
-                        elif winner_color == 'black' and p_black:
-                            winner_id = p_black['discord_id']
-                            loser_id = p_white['discord_id'] if p_white else (player1_id if winner_id == player2_id else player2_id)
-
-                    if not winner_id:
-                        winner_id = player1_id
-                        loser_id = player2_id
-
-                    result = 'win'
-                    reason_text = f"Vitória por {reason}"
-
-                await database.update_swiss_pairing_result(self.pairing_id, winner_id, loser_id, result)
-
-                try:
-                    if is_draw:
-                        await database.update_swiss_standings(self.tournament_id, player1_id, player2_id, result, reason)
-                    else:
-                        await database.update_swiss_standings(self.tournament_id, winner_id, loser_id, result, reason)
-                except Exception as e:
-                    logger.warning(f"Erro ao atualizar standings: {e}")
-
-                try:
-                    player1_user = await self.bot.fetch_user(int(self.player1_id))
-                    player2_user = await self.bot.fetch_user(int(self.player2_id))
-                    player1_name = player1_user.display_name if player1_user else "Jogador 1"
-                    player2_name = player2_user.display_name if player2_user else "Jogador 2"
-                except:
-                    player1_name = "Jogador 1"
-                    player2_name = "Jogador 2"
-
-                tournament_info = await database.get_swiss_tournament(self.tournament_id)
-                tournament_title = tournament_info.get('name', 'Torneio') if tournament_info else 'Torneio'
-
-                if is_draw:
-                    embed = discord.Embed(
-                        title=tournament_title,
-                        description=f"{player1_name} vs {player2_name}",
-                        color=discord.Color.gold()
-                    )
-                else:
-                    winner_name = player1_name if str(winner_id) == self.player1_id else player2_name
-                    loser_name = player2_name if winner_name == player1_name else player1_name
-                    embed = discord.Embed(
-                        title=tournament_title,
-                        description=f"{winner_name} venceu {loser_name}",
-                        color=discord.Color.green()
-                    )
-                    embed.add_field(
-                        name="🎯 Motivo",
-                        value=reason_text,
-                        inline=False
-                    )
-
-                embed.add_field(
-                    name="🎮 Jogadores",
-                    value=f"Brancas: {player1_name}\nPretas: {player2_name}",
-                    inline=False
-                )
-
-                standings = await database.get_swiss_standings(self.tournament_id)
-                standings_lines = []
-                for i, player in enumerate(standings[:5], 1):
-                    try:
-                        user = await self.bot.fetch_user(int(player['player_id']))
-                        display_name = user.display_name if user else player.get('discord_username', 'Desconhecido')
-                    except:
-                        display_name = player.get('discord_username', 'Desconhecido')
-
-                    points = player.get('points', 0)
-                    wins = player.get('wins', 0)
-                    draws = player.get('draws', 0)
-                    losses = player.get('losses', 0)
-
-                    line = f"{i}. {display_name} - {points}pts ({wins}V/{draws}E/{losses}D)"
-                    standings_lines.append(line)
-
-                embed.add_field(
-                    name="📊 Classificação Atualizada",
-                    value="\n".join(standings_lines) or "Sem dados",
-                    inline=False
-                )
-
-                try:
-                    if tournament_info and tournament_info.get('rated', False):
-                        time_control_str = tournament_info.get('time_control', '10+0')
-                        total_time = int(time_control_str.split('+')[0])
-                        if total_time <= 2:
-                            mode = "bullet"
-                        elif total_time <= 5:
-                            mode = "blitz"
-                        else:
-                            mode = "rapid"
-
-                        if is_draw:
-                            rating_changes = await database.apply_draw_ratings(player1_id, player2_id, mode)
-                        else:
-                            rating_changes = await database.apply_match_ratings(winner_id, loser_id, mode)
-
-                        if rating_changes:
-                            logger.info(f"Ratings atualizados para partida suíça {self.pairing_id}")
-                        # Atualiza estatísticas do perfil (wins/losses/draws) tal como ocorre no /desafiar
-                        try:
-                            if is_draw:
-                                await database.update_player_stats(player1_id, mode, 'draw')
-                                await database.update_player_stats(player2_id, mode, 'draw')
-                            else:
-                                # winner_id e loser_id já foram determinados acima
-                                if winner_id:
-                                    await database.update_player_stats(winner_id, mode, 'win')
-                                if loser_id:
-                                    await database.update_player_stats(loser_id, mode, 'loss')
-                        except Exception as e:
-                            logger.warning(f"Erro ao atualizar estatísticas do perfil após partida suíça: {e}")
-                except Exception as e:
-                    logger.warning(f"Erro ao atualizar ratings para partida suíça: {e}")
-
-                try:
-                    await interaction.followup.send(embed=embed, ephemeral=False)
-                except:
-                    pass
-
-                try:
-                    other_player_id = self.player2_id if user_id == self.player1_id else self.player1_id
-                    other_user = await self.bot.fetch_user(int(other_player_id))
-                    if other_user:
-                        await other_user.send(embed=embed)
-                        logger.info(f"Resultado da partida enviado para o outro jogador {other_player_id}")
-                except Exception as e:
-                    logger.warning(f"Não foi possível enviar resultado para o outro jogador: {e}")
-
-                if interaction.message:
-                    try:
-                        self.finish_button.disabled = True
-                        self.finish_button.style = discord.ButtonStyle.danger
-                        await interaction.message.edit(view=self)
-                    except Exception:
-                        pass
-
-                try:
-                    all_finished = await database.check_swiss_round_completion(self.tournament_id, self.round_number)
-                    if all_finished:
-                        asyncio.create_task(handle_swiss_round_completion(self.bot, self.tournament_id, self.round_number))
-                except Exception as e:
-                    logger.warning(f"Erro ao verificar conclusão de rodada: {e}")
-
-            except Exception as e:
-                logger.error(f"Erro ao finalizar partida suíça: {e}")
-                await interaction.followup.send(f"❌ Erro ao processar resultado: {e}", ephemeral=True)
-
-        self.finish_button.callback = _finish_callback
-        self.add_item(self.finish_button)
-
-
-class FinishSwissGameView(View):
-    """View simples apenas com o botão 'Finalizar Partida' para o embed de desafio criado."""
-    def __init__(self, bot: commands.Bot, pairing_id: int, player1_id: str, player2_id: str):
-        super().__init__(timeout=None)  # Botão permanente
-        self.bot = bot
-        self.pairing_id = pairing_id
-        self.player1_id = player1_id
-        self.player2_id = player2_id
-
-        finish_button = Button(label="Finalizar Partida", style=discord.ButtonStyle.red, custom_id=f"finish_swiss_game_simple:{self.pairing_id}")
-
-        async def _finish_callback(interaction: discord.Interaction):
-            # Defer IMEDIATAMENTE para evitar expiração da interação
-            try:
-                await interaction.response.defer()
-            except Exception as e:
-                logger.warning(f"Erro ao fazer defer na interação: {e}")
-                return
-            
-            if not self.player1_id or not self.player2_id:
-                await interaction.followup.send("❌ Este pairing tem um jogador inválido (bye)!", ephemeral=True)
-                return
-            
-            user_id = str(interaction.user.id)
-
-            # Verificar rate limiting
-            if not check_rate_limit(user_id, f"finish_game_{self.pairing_id}"):
-                await interaction.followup.send("❌ Aguarde um momento antes de tentar novamente.", ephemeral=True)
-                return
-
-            # Verificar se o usuário é um dos jogadores do pairing
-            if user_id not in [self.player1_id, self.player2_id]:
-                await interaction.followup.send("❌ Você não faz parte desta partida!", ephemeral=True)
-                return
-
-            try:
-                pairing = await database.get_swiss_pairing_by_id(self.pairing_id)
-                if not pairing:
-                    await interaction.followup.send("❌ Pairing não encontrado!", ephemeral=True)
-                    return
-
-                if pairing.get('status') == 'finished' or pairing.get('winner_id'):
-                    await interaction.followup.send("⚠️ Esta partida já foi finalizada!", ephemeral=True)
-                    return
+                if pairing.get('status') == 'finished' or pairing.get('winner_id'):
+                    await interaction.followup.send("⚠️ Esta partida já foi finalizada!", ephemeral=True)
+                    return
 
                 game_url = pairing.get('game_url')
                 if not game_url:
@@ -1980,68 +1556,16 @@ class FinishSwissGameView(View):
                 embed.add_field(name="Link da Partida", value=f"[Clique aqui para ver a partida]({game_url})", inline=False)
                 embed.set_footer(text="Obrigado por participar do torneio suíço!")
 
-                # Atualizar ratings
-                try:
-                    # Determinar modo baseado no time_control do torneio
-                    tournament_id = pairing.get('tournament_id')
-                    tournament = await database.get_swiss_tournament(tournament_id) if tournament_id else None
-                    time_control_str = tournament.get('time_control', '10+0') if tournament else '10+0'
-                    try:
-                        total_time = int(time_control_str.split('+')[0])
-                        if total_time <= 2:
-                            mode = "bullet"
-                        elif total_time <= 5:
-                            mode = "blitz"
-                        else:
-                            mode = "rapid"
-                    except:
-                        mode = "rapid"
+                # Determinar modo baseado no time_control do torneio
+                tournament_id = pairing.get('tournament_id')
+                tournament = await database.get_swiss_tournament(tournament_id) if tournament_id else None
+                time_control_str = tournament.get('time_control', '10+0') if tournament else '10+0'
+                mode = get_mode_from_time_control(time_control_str)
 
-                    if is_draw:
-                        # Empate: ambos recebem 0.5 pontos
-                        rating_changes = await database.apply_draw_ratings(player1_id, player2_id, mode)
-                    elif winner_id and loser_id:
-                        # Vitória: apenas se temos winner_id e loser_id válidos
-                        rating_changes = await database.apply_match_ratings(winner_id, loser_id, mode)
-                    else:
-                        logger.warning(f"Não foi possível atualizar ratings: winner_id={winner_id}, loser_id={loser_id}, is_draw={is_draw}")
-                        rating_changes = None
-
-                    if rating_changes:
-                        logger.info(f"Ratings atualizados para partida suíça {self.pairing_id}")
-                    
-                    # Atualizar estatísticas do perfil
-                    try:
-                        if is_draw:
-                            await database.update_player_stats(player1_id, mode, 'draw')
-                            await database.update_player_stats(player2_id, mode, 'draw')
-                        else:
-                            if winner_id:
-                                await database.update_player_stats(winner_id, mode, 'win')
-                            if loser_id:
-                                await database.update_player_stats(loser_id, mode, 'loss')
-                    except Exception as e:
-                        logger.warning(f"Erro ao atualizar estatísticas do perfil após partida suíça: {e}")
-                except Exception as e:
-                    logger.warning(f"Erro ao atualizar ratings para partida suíça: {e}")
-
-                # Salvar resultado no histórico de partidas
+                # Salvar resultado no histórico de partidas. Os ratings antes/depois são gravados quando a
+                # rodada fecha o período de rating (_apply_pending_swiss_ratings), por isso o registro
+                # precisa existir antes de o pairing entrar na fila
                 try:
-                    # Determinar modo baseado no time_control do torneio
-                    tournament_id = pairing.get('tournament_id')
-                    tournament = await database.get_swiss_tournament(tournament_id) if tournament_id else None
-                    time_control_str = tournament.get('time_control', '10+0') if tournament else '10+0'
-                    try:
-                        total_time = int(time_control_str.split('+')[0])
-                        if total_time <= 2:
-                            mode = "bullet"
-                        elif total_time <= 5:
-                            mode = "blitz"
-                        else:
-                            mode = "rapid"
-                    except:
-                        mode = "rapid"
-
                     # Buscar nomes dos jogadores
                     player1_stats = await database.get_all_player_stats(player1_id)
                     player2_stats = await database.get_all_player_stats(player2_id)
@@ -2049,34 +1573,6 @@ class FinishSwissGameView(View):
                     p1_name = player1_stats.get('discord_username') if player1_stats else f"Player_{player1_id}"
                     p2_name = player2_stats.get('discord_username') if player2_stats else f"Player_{player2_id}"
 
-                    # Preparar dados de rating antes e depois
-                    p1_rating_before = None
-                    p2_rating_before = None
-                    p1_rating_after = None
-                    p2_rating_after = None
-
-                    if rating_changes:
-                        if result == 'draw':
-                            p1_data = rating_changes.get('player1', {})
-                            p2_data = rating_changes.get('player2', {})
-                            p1_rating_before = p1_data.get('old')
-                            p1_rating_after = p1_data.get('new')
-                            p2_rating_before = p2_data.get('old')
-                            p2_rating_after = p2_data.get('new')
-                        elif result == 'win':
-                            winner_data = rating_changes.get('winner', {})
-                            loser_data = rating_changes.get('loser', {})
-                            if winner_id == player1_id:
-                                p1_rating_before = winner_data.get('old_rating')
-                                p1_rating_after = winner_data.get('new_rating')
-                                p2_rating_before = loser_data.get('old_rating')
-                                p2_rating_after = loser_data.get('new_rating')
-                            else:
-                                p1_rating_before = loser_data.get('old_rating')
-                                p1_rating_after = loser_data.get('new_rating')
-                                p2_rating_before = winner_data.get('old_rating')
-                                p2_rating_after = winner_data.get('new_rating')
-
                     # Salvar no histórico
                     await database.save_game_history(
                         player1_id=player1_id,
@@ -2088,15 +1584,36 @@ class FinishSwissGameView(View):
                         mode=mode,
                         time_control=time_control_str,
                         game_url=game_url,
-                        p1_rating_before=p1_rating_before,
-                        p2_rating_before=p2_rating_before,
-                        p1_rating_after=p1_rating_after,
-                        p2_rating_after=p2_rating_after,
+                        rated=True,
                     )
                     logger.info(f"✅ Partida suíça {self.pairing_id} salva no histórico")
                 except Exception as e:
                     logger.error(f"❌ Erro ao salvar partida suíça no histórico: {e}", exc_info=True)
 
+                # Atualizar ratings
+                try:
+                    # Rating aplicado no fechamento da rodada, com todas as partidas num único período
+                    if is_draw or (winner_id and loser_id):
+                        await database.queue_swiss_pairing_rating(self.pairing_id)
+                        logger.info(f"Partida suíça {self.pairing_id} aguardando o período de rating da rodada")
+                    else:
+                        logger.warning(f"Não foi possível atualizar ratings: winner_id={winner_id}, loser_id={loser_id}, is_draw={is_draw}")
+                    
+                    # Atualizar estatísticas do perfil
+                    try:
+                        if is_draw:
+                            await database.update_player_stats(player1_id, mode, 'draw')
+                            await database.update_player_stats(player2_id, mode, 'draw')
+                        else:
+                            if winner_id:
+                                await database.update_player_stats(winner_id, mode, 'win')
+                            if loser_id:
+                                await database.update_player_stats(loser_id, mode, 'loss')
+                    except Exception as e:
+                        logger.warning(f"Erro ao atualizar estatísticas do perfil após partida suíça: {e}")
+                except Exception as e:
+                    logger.warning(f"Erro ao atualizar ratings para partida suíça: {e}")
+
                 await interaction.followup.send(embed=embed, ephemeral=False)
 
                 try:
@@ -2175,7 +1692,7 @@ class JoinSwissView(View):
                         # Busca informações dos participantes
                         # Tenta usar o modo do torneio, se não conseguir calcula baseado no tempo
                         mode = get_mode_from_time_control(tournament.get('time_control', '5+0'))
-                        participants_list = await format_participants_list(self.bot, participants, mode)
+                        participants_list = await format_participants_list(self.bot, participants, mode, guild=interaction.guild)
                         participants_text = "\n".join(participants_list)
 
                         # Reconstrói o embed com contador e lista atualizados
@@ -2238,7 +1755,7 @@ class JoinSwissView(View):
                         # Busca informações dos participantes
                         # Tenta usar o modo do torneio, se não conseguir calcula baseado no tempo
                         mode = get_mode_from_time_control(tournament.get('time_control', '5+0'))
-                        participants_list = await format_participants_list(self.bot, participants, mode)
+                        participants_list = await format_participants_list(self.bot, participants, mode, guild=interaction.guild)
                         participants_text = "\n".join(participants_list)
 
                         # Reconstrói o embed com contador e lista atualizados
@@ -2379,6 +1896,9 @@ class Tournaments(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_unload(self):
+        get_deadline_scheduler(self.bot).stop()
+
     async def check_and_advance_round(self, tournament_id: int, channel: discord.TextChannel):
         """Verifica se a rodada atual foi completada e avança automaticamente."""
         try:
@@ -2485,7 +2005,7 @@ class Tournaments(commands.Cog):
 
             # Busca participantes (deve estar vazio na criação)
             participants = await database.get_swiss_tournament_participants(tournament_id)
-            participants_list = await format_participants_list(self.bot, participants, modo)
+            participants_list = await format_participants_list(self.bot, participants, modo, guild=interaction.guild)
             participants_text = "\n".join(participants_list)
 
             # Envia embed público com botões para inscrição
@@ -2525,7 +2045,7 @@ class Tournaments(commands.Cog):
         # Busca informações dos participantes
         # Tenta usar o modo do torneio, se não conseguir calcula baseado no tempo
         mode = get_mode_from_time_control(tournament.get('time_control', '5+0'))
-        participants_list = await format_participants_list(self.bot, participants, mode)
+        participants_list = await format_participants_list(self.bot, participants, mode, guild=interaction.guild)
         participants_text = "\n".join(participants_list)
 
         embed = discord.Embed(
@@ -2,12 +2,20 @@
 import sqlite3
 import os
 import asyncio
+import contextlib
 import json
 import logging
 import threading
 import queue
 import datetime
-import math
+
+from swiss_tiebreaks import STANDINGS_ORDER_SQL
+from bracket_seeding import RATING_MODES, build_first_round
+from achievement_rules import ACHIEVEMENTS, ACHIEVEMENT_BITS, evaluate as evaluate_achievements, mask_case_sql, mask_of, next_win_streak
+from rating_engine import DEFAULT_RATING, GLICKO2_DEFAULT_VOL, RATING_MODE_CODES, initial_rd, rate_period
+from tournament_formats import (
+    FORMAT_ARENA, FORMAT_KNOCKOUT, FORMAT_ROUND_ROBIN, arena_points, berger_schedule, pair_arena, round_robin_points,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +58,65 @@ async def enqueue_write(func, *args, **kwargs):
     _write_queue.put((func, args, kwargs, fut))
     return await fut
 
+# Locks por chave de ordenação (ex: um por torneio suíço). Escritas com a mesma chave
+# são executadas estritamente na ordem de chegada; chaves diferentes não esperam umas
+# pelas outras além da própria fila do writer.
+_ordered_write_locks = {}
+
+
+def ordered_write_lock(key) -> asyncio.Lock:
+    """Retorna o lock que serializa as operações de uma chave de ordenação."""
+    lock = _ordered_write_locks.get(key)
+    if lock is None:
+        lock = _ordered_write_locks[key] = asyncio.Lock()
+    return lock
+
+
+def swiss_write_key(tournament_id) -> tuple:
+    """Chave de ordenação das escritas de um torneio suíço."""
+    return ('swiss', int(tournament_id))
+
+
+async def enqueue_ordered_write(key, func, *args, **kwargs):
+    """Enfileira uma escrita no writer central mantendo a ordem estrita entre escritas da mesma chave."""
+    async with ordered_write_lock(key):
+        return await enqueue_write(func, *args, **kwargs)
+
+async def enqueue_swiss_write(tournament_ids, func, *args, **kwargs):
+    """Escrita sob os locks de vários torneios suíços, adquiridos em ordem (sem risco de deadlock)."""
+    async with contextlib.AsyncExitStack() as stack:
+        for tournament_id in sorted({int(tid) for tid in tournament_ids}):
+            await stack.enter_async_context(ordered_write_lock(swiss_write_key(tournament_id)))
+        return await enqueue_write(func, *args, **kwargs)
+
+async def enqueue_swiss_pairing_write(pairing_ids, func, *args, **kwargs):
+    """Escrita em pairings suíços sob o lock do(s) torneio(s) deles."""
+    pairing_ids = [int(pid) for pid in pairing_ids]
+
+    def _tournaments():
+        conn = get_conn()
+        try:
+            placeholders = ",".join("?" for _ in pairing_ids)
+            return [row[0] for row in conn.execute(
+                f"SELECT DISTINCT tournament_id FROM swiss_pairings WHERE id IN ({placeholders})", pairing_ids
+            )]
+        finally:
+            conn.close()
+
+    tournament_ids = await asyncio.to_thread(_tournaments) if pairing_ids else []
+    return await enqueue_swiss_write(tournament_ids, func, *args, **kwargs)
+
+def _player_outcome(player_id: str, winner_id: str, result: str):
+    """Resultado de uma partida do histórico para o jogador: 'win', 'loss', 'draw' ou None."""
+    if winner_id:
+        return 'win' if winner_id == player_id else 'loss'
+    return 'draw' if result == 'draw' else None
+
+def _outcome_sql(player_column: str) -> str:
+    """Mesmo que _player_outcome, em SQL sobre o game_history."""
+    return (f"CASE WHEN winner_id = {player_column} THEN 'win' WHEN winner_id IS NOT NULL THEN 'loss' "
+            f"WHEN result = 'draw' THEN 'draw' END")
+
 def get_conn():
     """Cria uma conexão com o banco de dados e define row_factory."""
     # Usa timeout para esperar por locks e permite uso em threads diferentes.
@@ -141,6 +208,14 @@ async def init_database():
         # Não bloquear a inicialização se a migração falhar aqui; logamos e seguimos.
         logger.warning("Migração: não foi possível verificar/adicionar colunas agregadas em players")
 
+    # Glicko-2: desvio (RD) e volatilidade por modo; NULL = ainda não calculado (ver rating_engine.initial_rd)
+    for mode in RATING_MODES:
+        for column in (f"rd_{mode}", f"vol_{mode}"):
+            try:
+                cursor.execute(f"ALTER TABLE players ADD COLUMN {column} REAL")
+            except sqlite3.OperationalError:
+                pass  # Coluna já existe
+
     # Tabela de desafios
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS challenges (
@@ -221,6 +296,8 @@ async def init_database():
         winner_id TEXT,
         is_automatic INTEGER DEFAULT 0,
         rated INTEGER DEFAULT 1,
+        format TEXT DEFAULT 'knockout', -- knockout, round_robin, arena
+        ends_at TIMESTAMP, -- fim da arena
         FOREIGN KEY (created_by) REFERENCES players(discord_id),
         FOREIGN KEY (winner_id) REFERENCES players(discord_id)
     )
@@ -249,18 +326,22 @@ async def init_database():
         tournament_id INTEGER NOT NULL,
         round_number INTEGER NOT NULL,
         match_number INTEGER NOT NULL,
-        player1_id TEXT NOT NULL,
+        player1_id TEXT,
         player2_id TEXT,
         winner_id TEXT,
         challenge_id INTEGER,
-        status TEXT DEFAULT 'pending', -- pending, in_progress, finished, bye
+        status TEXT DEFAULT 'pending', -- waiting, pending, in_progress, finished, bye
         scheduled_at TIMESTAMP,
         finished_at TIMESTAMP,
+        next_match_id INTEGER, -- partida para onde o vencedor avança (NULL na final)
+        next_slot INTEGER, -- 1 = player1_id, 2 = player2_id da próxima partida
+        version INTEGER DEFAULT 0, -- valor de api_versions na última alteração (feed since=)
         FOREIGN KEY (tournament_id) REFERENCES tournaments(id),
         FOREIGN KEY (player1_id) REFERENCES players(discord_id),
         FOREIGN KEY (player2_id) REFERENCES players(discord_id),
         FOREIGN KEY (winner_id) REFERENCES players(discord_id),
-        FOREIGN KEY (challenge_id) REFERENCES challenges(id)
+        FOREIGN KEY (challenge_id) REFERENCES challenges(id),
+        FOREIGN KEY (next_match_id) REFERENCES tournament_matches(id)
     )
     ''')
     
@@ -281,6 +362,141 @@ async def init_database():
     except sqlite3.OperationalError:
         pass  # Coluna já existe
 
+    # Migração especial: tournament_matches antiga (player1_id NOT NULL, sem árvore do bracket), recriar
+    try:
+        columns = {row[1]: row for row in cursor.execute("PRAGMA table_info(tournament_matches)").fetchall()}
+        if 'next_match_id' not in columns or columns['player1_id'][3]:
+            print("Detectado esquema antigo da tabela tournament_matches. Recriando...")
+            # Cópia integral dos dados antigos, mesmo com referências órfãs
+            conn.commit()
+            cursor.execute("PRAGMA foreign_keys=OFF")
+            cursor.execute('''
+            CREATE TABLE tournament_matches_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tournament_id INTEGER NOT NULL,
+                round_number INTEGER NOT NULL,
+                match_number INTEGER NOT NULL,
+                player1_id TEXT,
+                player2_id TEXT,
+                winner_id TEXT,
+                challenge_id INTEGER,
+                status TEXT DEFAULT 'pending', -- waiting, pending, in_progress, finished, bye
+                scheduled_at TIMESTAMP,
+                finished_at TIMESTAMP,
+                next_match_id INTEGER, -- partida para onde o vencedor avança (NULL na final)
+                next_slot INTEGER, -- 1 = player1_id, 2 = player2_id da próxima partida
+                version INTEGER DEFAULT 0, -- valor de api_versions na última alteração (feed since=)
+                FOREIGN KEY (tournament_id) REFERENCES tournaments(id),
+                FOREIGN KEY (player1_id) REFERENCES players(discord_id),
+                FOREIGN KEY (player2_id) REFERENCES players(discord_id),
+                FOREIGN KEY (winner_id) REFERENCES players(discord_id),
+                FOREIGN KEY (challenge_id) REFERENCES challenges(id),
+                FOREIGN KEY (next_match_id) REFERENCES tournament_matches(id)
+            )
+            ''')
+            cursor.execute('''
+            INSERT INTO tournament_matches_new (id, tournament_id, round_number, match_number, player1_id, player2_id,
+                                                winner_id, challenge_id, status, scheduled_at, finished_at)
+            SELECT id, tournament_id, round_number, match_number, player1_id, player2_id,
+                   winner_id, challenge_id, status, scheduled_at, finished_at
+            FROM tournament_matches
+            ''')
+            cursor.execute("DROP TABLE tournament_matches")
+            cursor.execute("ALTER TABLE tournament_matches_new RENAME TO tournament_matches")
+            conn.commit()
+            print("Tabela tournament_matches recriada com esquema correto.")
+    except Exception as e:
+        conn.rollback()
+        print(f"Aviso: erro na migração de tournament_matches: {e}")
+    finally:
+        cursor.execute("PRAGMA foreign_keys=ON")
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tournament_matches_challenge ON tournament_matches(challenge_id)")
+
+    # Formatos todos-contra-todos e arena: formato/fim do torneio e classificação incremental
+    for column, definition in (
+        ('format', "TEXT DEFAULT 'knockout'"),
+        ('ends_at', 'TIMESTAMP'),
+    ):
+        try:
+            cursor.execute(f"ALTER TABLE tournaments ADD COLUMN {column} {definition}")
+        except sqlite3.OperationalError:
+            pass  # Coluna já existe
+
+    for column, definition in (
+        ('wins', 'INTEGER DEFAULT 0'),
+        ('draws', 'INTEGER DEFAULT 0'),
+        ('losses', 'INTEGER DEFAULT 0'),
+        ('games_played', 'INTEGER DEFAULT 0'),
+        ('streak', 'INTEGER DEFAULT 0'),
+        ('last_opponent_id', 'TEXT'),
+    ):
+        try:
+            cursor.execute(f"ALTER TABLE tournament_participants ADD COLUMN {column} {definition}")
+        except sqlite3.OperationalError:
+            pass  # Coluna já existe
+
+    # Partidas abertas por jogador (fila da arena / próxima partida do todos-contra-todos)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tournament_matches_status ON tournament_matches(tournament_id, status)")
+
+    # Versionamento do bracket para a API (ETag / If-None-Match e feed incremental since=)
+    try:
+        cursor.execute("ALTER TABLE tournaments ADD COLUMN bracket_version INTEGER DEFAULT 0")
+    except sqlite3.OperationalError:
+        pass  # Coluna já existe
+
+    try:
+        cursor.execute("ALTER TABLE tournament_matches ADD COLUMN version INTEGER DEFAULT 0")
+    except sqlite3.OperationalError:
+        pass  # Coluna já existe
+
+    # Contador monotônico global: cada alteração em torneios/partidas/desafios de torneio incrementa
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS api_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO api_versions (name, version) VALUES ('tournaments', 0)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tournament_matches_version ON tournament_matches(tournament_id, version)")
+
+    _bump = "UPDATE api_versions SET version = version + 1 WHERE name = 'tournaments';"
+    _current = "(SELECT version FROM api_versions WHERE name = 'tournaments')"
+    bracket_triggers = {
+        'trg_tournaments_insert_version': f"""
+            AFTER INSERT ON tournaments BEGIN
+                {_bump}
+                UPDATE tournaments SET bracket_version = {_current} WHERE id = NEW.id;
+            END""",
+        'trg_tournaments_update_version': f"""
+            AFTER UPDATE OF name, description, status, started_at, finished_at, winner_id ON tournaments BEGIN
+                {_bump}
+                UPDATE tournaments SET bracket_version = {_current} WHERE id = NEW.id;
+            END""",
+        'trg_tournament_matches_insert_version': f"""
+            AFTER INSERT ON tournament_matches BEGIN
+                {_bump}
+                UPDATE tournament_matches SET version = {_current} WHERE id = NEW.id;
+                UPDATE tournaments SET bracket_version = {_current} WHERE id = NEW.tournament_id;
+            END""",
+        'trg_tournament_matches_update_version': f"""
+            AFTER UPDATE OF player1_id, player2_id, winner_id, challenge_id, status, finished_at ON tournament_matches BEGIN
+                {_bump}
+                UPDATE tournament_matches SET version = {_current} WHERE id = NEW.id;
+                UPDATE tournaments SET bracket_version = {_current} WHERE id = NEW.tournament_id;
+            END""",
+        # game_url/status do desafio aparecem no JSON do bracket
+        'trg_challenges_bracket_version': f"""
+            AFTER UPDATE OF game_url, status ON challenges
+            WHEN NEW.tournament_id IS NOT NULL BEGIN
+                {_bump}
+                UPDATE tournament_matches SET version = {_current} WHERE challenge_id = NEW.id;
+                UPDATE tournaments SET bracket_version = {_current} WHERE id = NEW.tournament_id;
+            END""",
+    }
+    for trigger_name, body in bracket_triggers.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {trigger_name} {body}")
+
     # Tabela para mapear canais de ranking por modo (ex: bullet, blitz, rapid, classic)
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS ranking_channels (
@@ -315,6 +531,13 @@ async def init_database():
     except sqlite3.OperationalError:
         pass
 
+    # Colunas de desempate pré-calculadas (ver swiss_tiebreaks.py)
+    for column in ('buchholz_cut1', 'median_buchholz', 'direct_encounter', 'progressive_score'):
+        try:
+            cursor.execute(f"ALTER TABLE swiss_participants ADD COLUMN {column} REAL DEFAULT 0.0")
+        except sqlite3.OperationalError:
+            pass
+
     # Tabela para histórico de partidas
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS game_history (
@@ -339,18 +562,149 @@ async def init_database():
     )
     ''')
 
+    # Migração: se a partida valeu rating (NULL em registros antigos = tratado como rated no replay)
+    try:
+        cursor.execute("ALTER TABLE game_history ADD COLUMN rated INTEGER")
+    except sqlite3.OperationalError:
+        pass  # Coluna já existe
+    # Ordem cronológica usada pelo replay de ratings (replay_ratings.py)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_history_played_at ON game_history(played_at, id)")
+    # Histórico por jogador paginado por (played_at, id): uma entrada de índice por lado da partida
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_history_player1 ON game_history(player1_id, played_at, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_game_history_player2 ON game_history(player2_id, played_at, id)")
+    # Dados da partida no Lichess: cor do player1, abertura (ECO) e duração em meios-lances
+    for column, column_type in (("player1_color", "TEXT"), ("opening_eco", "TEXT"), ("opening_name", "TEXT"), ("plies", "INTEGER")):
+        try:
+            cursor.execute(f"ALTER TABLE game_history ADD COLUMN {column} {column_type}")
+        except sqlite3.OperationalError:
+            pass  # Coluna já existe
+
+    # Estatísticas agregadas por jogador, atualizadas a cada partida salva (save_game_history)
+    # Granularidade modo x cor x abertura; '' = cor/abertura desconhecida
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS player_stats_agg (
+        player_id TEXT NOT NULL,
+        mode TEXT NOT NULL,
+        color TEXT NOT NULL DEFAULT '',
+        eco TEXT NOT NULL DEFAULT '',
+        opening_name TEXT,
+        games INTEGER NOT NULL DEFAULT 0,
+        wins INTEGER NOT NULL DEFAULT 0,
+        draws INTEGER NOT NULL DEFAULT 0,
+        losses INTEGER NOT NULL DEFAULT 0,
+        total_plies INTEGER NOT NULL DEFAULT 0,
+        plies_games INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (player_id, mode, color, eco)
+    ) WITHOUT ROWID
+    ''')
+    try:
+        if cursor.execute("SELECT 1 FROM player_stats_agg LIMIT 1").fetchone() is None:
+            cursor.execute(f'''
+                INSERT INTO player_stats_agg (player_id, mode, color, eco, opening_name, games, wins, draws, losses,
+                                              total_plies, plies_games)
+                SELECT player_id, mode, color, eco, MAX(opening_name), COUNT(*),
+                       SUM(outcome = 'win'), SUM(outcome = 'draw'), SUM(outcome = 'loss'),
+                       COALESCE(SUM(plies), 0), COUNT(plies)
+                FROM (
+                    SELECT player1_id AS player_id, mode, COALESCE(player1_color, '') AS color,
+                           COALESCE(opening_eco, '') AS eco, opening_name, plies, {_outcome_sql('player1_id')} AS outcome
+                    FROM game_history WHERE player1_id <> player2_id
+                    UNION ALL
+                    SELECT player2_id, mode, CASE player1_color WHEN 'white' THEN 'black' WHEN 'black' THEN 'white' ELSE '' END,
+                           COALESCE(opening_eco, ''), opening_name, plies, {_outcome_sql('player2_id')}
+                    FROM game_history WHERE player1_id <> player2_id
+                )
+                WHERE outcome IS NOT NULL AND player_id IN (SELECT discord_id FROM players)
+                GROUP BY player_id, mode, color, eco
+            ''')
+            if cursor.rowcount > 0:
+                print(f"player_stats_agg montado a partir do histórico ({cursor.rowcount} linhas).")
+    except Exception as e:
+        logger.error(f"Erro ao montar player_stats_agg: {e}")
+
+    # Estatísticas de aberturas extraídas dos PGNs salvos (opening_index.py)
+    # player_id '' e color '' = servidor inteiro; nas linhas de jogador, color é a cor dele
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS opening_stats (
+        player_id TEXT NOT NULL DEFAULT '',
+        color TEXT NOT NULL DEFAULT '',
+        eco TEXT NOT NULL,
+        opening_name TEXT,
+        games INTEGER NOT NULL DEFAULT 0,
+        white_wins INTEGER NOT NULL DEFAULT 0,
+        draws INTEGER NOT NULL DEFAULT 0,
+        black_wins INTEGER NOT NULL DEFAULT 0,
+        total_plies INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (player_id, color, eco)
+    ) WITHOUT ROWID
+    ''')
+    # Último id processado por origem, para o indexador continuar de onde parou
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS opening_index_state (
+        source TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+
+    # Cache de avaliações de posições (eval_cache.py): hash Zobrist com sinal -> avaliação mais profunda
+    # conhecida, do ponto de vista das brancas; depth é comparada na consulta (só serve se for >= à pedida)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS position_evals (
+        zobrist INTEGER PRIMARY KEY,
+        depth INTEGER NOT NULL,
+        cp INTEGER,
+        mate INTEGER,
+        best_move TEXT,
+        source TEXT,
+        updated_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER))
+    ) WITHOUT ROWID
+    ''')
+
     # Tabela para histórico de ratings (para gráficos de evolução)
+    # Compacta: modo como código inteiro (rating_engine.RATING_MODE_CODES) e data em epoch (segundos)
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS rating_history (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         player_id TEXT NOT NULL,
-        mode TEXT NOT NULL,
+        mode INTEGER NOT NULL,
         rating INTEGER NOT NULL,
-        recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        recorded_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
         FOREIGN KEY (player_id) REFERENCES players(discord_id)
     )
     ''')
 
+    # Migração especial: rating_history antigo (modo TEXT, recorded_at TIMESTAMP), converter
+    try:
+        columns = {row[1]: row for row in cursor.execute("PRAGMA table_info(rating_history)").fetchall()}
+        if columns['mode'][2].upper() != 'INTEGER':
+            print("Detectado esquema antigo da tabela rating_history. Convertendo...")
+            mode_case = " ".join(f"WHEN '{mode}' THEN {code}" for mode, code in RATING_MODE_CODES.items())
+            cursor.execute('''
+            CREATE TABLE rating_history_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                player_id TEXT NOT NULL,
+                mode INTEGER NOT NULL,
+                rating INTEGER NOT NULL,
+                recorded_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+                FOREIGN KEY (player_id) REFERENCES players(discord_id)
+            )
+            ''')
+            cursor.execute(f'''
+            INSERT INTO rating_history_new (id, player_id, mode, rating, recorded_at)
+            SELECT id, player_id, CASE lower(mode) {mode_case} END, rating,
+                   COALESCE(CAST(strftime('%s', recorded_at) AS INTEGER), CAST(strftime('%s', 'now') AS INTEGER))
+            FROM rating_history
+            WHERE lower(mode) IN ({",".join(f"'{mode}'" for mode in RATING_MODE_CODES)})
+            ''')
+            cursor.execute("DROP TABLE rating_history")
+            cursor.execute("ALTER TABLE rating_history_new RENAME TO rating_history")
+            conn.commit()
+            print("Tabela rating_history convertida para o formato compacto.")
+    except Exception as e:
+        logger.error(f"Erro ao converter rating_history: {e}")
+    # Gráficos e pico de rating viram varreduras de faixa neste índice (cobre também o rating)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_rating_history_player ON rating_history(player_id, mode, recorded_at, rating)")
+
     # Tabela para badges/achievements
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS achievements (
@@ -366,6 +720,24 @@ async def init_database():
     )
     ''')
 
+    # Motor de achievements: conjunto desbloqueado em bitmask e sequência de vitórias mantida a cada partida
+    try:
+        cursor.execute("ALTER TABLE players ADD COLUMN achievements_mask INTEGER DEFAULT 0")
+        # Coluna nova: monta a máscara a partir dos achievements já gravados
+        cursor.execute(f'''
+            UPDATE players SET achievements_mask = (
+                SELECT COALESCE(SUM({mask_case_sql()}), 0)
+                FROM achievements WHERE achievements.player_id = players.discord_id
+            )
+        ''')
+    except sqlite3.OperationalError:
+        pass  # Coluna já existe
+    for column in ("win_streak", "best_win_streak"):
+        try:
+            cursor.execute(f"ALTER TABLE players ADD COLUMN {column} INTEGER DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass  # Coluna já existe
+
     # Tabela para record head-to-head entre jogadores
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS head_to_head (
@@ -381,6 +753,31 @@ async def init_database():
         UNIQUE(player1_id, player2_id)
     )
     ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_head_to_head_player2 ON head_to_head(player2_id)")
+    # Confronto direto vazio com histórico existente: monta tudo uma vez a partir do game_history
+    try:
+        if cursor.execute("SELECT 1 FROM head_to_head LIMIT 1").fetchone() is None:
+            cursor.execute('''
+                INSERT INTO head_to_head (player1_id, player2_id, player1_wins, player2_wins, draws, last_game_at)
+                SELECT low, high,
+                       SUM(CASE WHEN winner_id = low THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN winner_id = high THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN winner_id IS NULL AND result = 'draw' THEN 1 ELSE 0 END),
+                       MAX(played_at)
+                FROM (
+                    SELECT MIN(player1_id, player2_id) AS low, MAX(player1_id, player2_id) AS high,
+                           winner_id, result, played_at
+                    FROM game_history
+                    WHERE player1_id <> player2_id
+                      AND player1_id IN (SELECT discord_id FROM players)
+                      AND player2_id IN (SELECT discord_id FROM players)
+                )
+                GROUP BY low, high
+            ''')
+            if cursor.rowcount > 0:
+                print(f"head_to_head reconstruído a partir do histórico ({cursor.rowcount} confrontos).")
+    except Exception as e:
+        logger.error(f"Erro ao reconstruir head_to_head: {e}")
 
     # Tabelas para torneios Swiss
     cursor.execute('''
@@ -411,6 +808,10 @@ async def init_database():
         tiebreak_score REAL DEFAULT 0.0,
         sonneborn_berger REAL DEFAULT 0.0,
         h2h_record TEXT DEFAULT '',
+        buchholz_cut1 REAL DEFAULT 0.0,
+        median_buchholz REAL DEFAULT 0.0,
+        direct_encounter REAL DEFAULT 0.0,
+        progressive_score REAL DEFAULT 0.0,
         wins INTEGER DEFAULT 0,
         draws INTEGER DEFAULT 0,
         losses INTEGER DEFAULT 0,
@@ -441,6 +842,65 @@ async def init_database():
     )
     ''')
 
+    # Prazos persistentes dos pairings suíços (aceitação e finalização), usados pelo agendador único
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS swiss_deadlines (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tournament_id INTEGER NOT NULL,
+        pairing_id INTEGER NOT NULL,
+        round_number INTEGER NOT NULL,
+        kind TEXT NOT NULL, -- accept, finish
+        due_at INTEGER NOT NULL, -- epoch em segundos
+        status TEXT DEFAULT 'pending', -- pending, fired, cancelled
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (tournament_id) REFERENCES swiss_tournaments(id),
+        FOREIGN KEY (pairing_id) REFERENCES swiss_pairings(id),
+        UNIQUE(pairing_id, kind)
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_swiss_deadlines_pending ON swiss_deadlines(status, due_at)")
+
+    # Partidas pendentes de todos os tipos (bracket, suíço e desafios avulsos) numa única view,
+    # servida pelos índices abaixo: painel de admin e backend leem tudo com uma consulta só
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_swiss_pairings_status ON swiss_pairings(tournament_id, round_number, status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_swiss_pairings_challenge ON swiss_pairings(challenge_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_challenges_status ON challenges(status, created_at)")
+    cursor.execute("DROP VIEW IF EXISTS pending_matches")
+    cursor.execute(f"""
+    CREATE VIEW pending_matches AS
+        SELECT 'bracket' AS kind, tm.tournament_id, t.name AS tournament_name, tm.round_number, tm.match_number,
+               tm.id AS match_id, tm.challenge_id, c.status AS challenge_status, c.game_url,
+               tm.player1_id, p1.discord_username AS player1_name, tm.player2_id, p2.discord_username AS player2_name,
+               t.time_control, COALESCE(c.created_at, t.started_at) AS created_at
+        FROM tournament_matches tm
+        JOIN tournaments t ON t.id = tm.tournament_id
+        LEFT JOIN challenges c ON c.id = tm.challenge_id
+        LEFT JOIN players p1 ON p1.discord_id = tm.player1_id
+        LEFT JOIN players p2 ON p2.discord_id = tm.player2_id
+        WHERE tm.status IN ('pending', 'in_progress') AND tm.player2_id IS NOT NULL
+        UNION ALL
+        SELECT 'swiss', sp.tournament_id, st.name, sp.round_number, NULL,
+               sp.id, sp.challenge_id, c.status, COALESCE(sp.game_url, c.game_url),
+               sp.player1_id, p1.discord_username, sp.player2_id, p2.discord_username,
+               st.time_control, COALESCE(c.created_at, sp.created_at)
+        FROM swiss_pairings sp
+        JOIN swiss_tournaments st ON st.id = sp.tournament_id
+        LEFT JOIN challenges c ON c.id = sp.challenge_id
+        LEFT JOIN players p1 ON p1.discord_id = sp.player1_id
+        LEFT JOIN players p2 ON p2.discord_id = sp.player2_id
+        WHERE sp.status NOT IN ('finished', 'cancelled') AND sp.player2_id IS NOT NULL
+        UNION ALL
+        SELECT 'casual', NULL, NULL, NULL, NULL,
+               NULL, c.id, c.status, c.game_url,
+               c.challenger_id, p1.discord_username, c.challenged_id, p2.discord_username,
+               c.time_control, c.created_at
+        FROM challenges c
+        LEFT JOIN players p1 ON p1.discord_id = c.challenger_id
+        LEFT JOIN players p2 ON p2.discord_id = c.challenged_id
+        WHERE c.status IN ('pending', 'accepted') AND c.tournament_id IS NULL
+          AND NOT EXISTS (SELECT 1 FROM swiss_pairings sp WHERE sp.challenge_id = c.id)
+    """)
+
     # Migrações para swiss_tournaments
     try:
         cursor.execute("ALTER TABLE swiss_tournaments ADD COLUMN description TEXT")
@@ -464,6 +924,18 @@ async def init_database():
     except:
         pass  # Coluna já existe
 
+    # Migração: partidas suíças jogadas aguardando o período de rating da rodada
+    try:
+        cursor.execute("ALTER TABLE swiss_pairings ADD COLUMN rating_pending INTEGER DEFAULT 0")
+    except:
+        pass  # Coluna já existe
+
+    # Migração: quem já aceitou o pairing (ids separados por vírgula), para sobreviver a reinícios
+    try:
+        cursor.execute("ALTER TABLE swiss_pairings ADD COLUMN accepted_by TEXT")
+    except:
+        pass  # Coluna já existe
+
     # Migração especial: se swiss_tournaments tem esquema antigo, recriar
     try:
         columns = [row[1] for row in cursor.execute("PRAGMA table_info(swiss_tournaments)").fetchall()]
@@ -522,6 +994,10 @@ async def init_database():
                 tiebreak_score REAL DEFAULT 0.0,
                 sonneborn_berger REAL DEFAULT 0.0,
                 h2h_record TEXT DEFAULT '',
+                buchholz_cut1 REAL DEFAULT 0.0,
+                median_buchholz REAL DEFAULT 0.0,
+                direct_encounter REAL DEFAULT 0.0,
+                progressive_score REAL DEFAULT 0.0,
                 wins INTEGER DEFAULT 0,
                 draws INTEGER DEFAULT 0,
                 losses INTEGER DEFAULT 0,
@@ -582,9 +1058,9 @@ async def register_player(discord_id: str, discord_username: str, lichess_userna
         cursor = conn.cursor()
         # Inserir ou atualizar o jogador
         cursor.execute('''
-            INSERT OR REPLACE INTO players (discord_id, discord_username, lichess_username)
-            VALUES (?, ?, ?)
-        ''', (discord_id, discord_username, lichess_username))
+            INSERT OR REPLACE INTO players (discord_id, discord_username, lichess_username, achievements_mask)
+            VALUES (?, ?, ?, ?)
+        ''', (discord_id, discord_username, lichess_username, ACHIEVEMENT_BITS['default']))
         
         # Desbloquear o achievement padrão
         cursor.execute('''
@@ -690,6 +1166,21 @@ def get_time_control_mode(time_str: str) -> str:
     else:
         return 'classic'
 
+def get_mode_from_time_control(time_control: str) -> str:
+    """Determina o modo (bullet/blitz/rapid) baseado no time control."""
+    try:
+        # time_control vem no formato "minutos+incremento" (ex: "5+0", "10+5")
+        total_time = int(time_control.split('+')[0])
+
+        if total_time <= 2:
+            return "bullet"  # 1+0, 1+1, 2+1
+        elif total_time <= 5:
+            return "blitz"   # 3+0, 3+2, 5+0
+        else:
+            return "rapid"   # 10+0, 15+10, 30+0
+    except:
+        return "blitz"  # default fallback
+
 async def create_challenge(challenger_id: str, challenged_id: str, channel_id: str, time_control: str, scheduled_at: str = None, tournament_id: int = None):
     mode = get_time_control_mode(time_control)
     status = 'scheduled' if scheduled_at else 'pending'
@@ -909,55 +1400,69 @@ async def update_player_rating(discord_id: str, mode: str, result: str):
         conn.close()
     await asyncio.to_thread(_update)
 
-async def apply_match_ratings(winner_id: str, loser_id: str, mode: str):
-    """Aplica mudanças de rating ELO entre dois jogadores após uma partida."""
-    def _apply():
-        conn = get_conn()
-        cursor = conn.cursor()
-        try:
-            cursor.execute(f"SELECT rating_{mode} FROM players WHERE discord_id = ?", (winner_id,))
-            winner_rating_row = cursor.fetchone()
-            cursor.execute(f"SELECT rating_{mode} FROM players WHERE discord_id = ?", (loser_id,))
-            loser_rating_row = cursor.fetchone()
-
-            if not winner_rating_row or not loser_rating_row:
-                logger.warning(f"Não foi possível encontrar ratings para {winner_id} ou {loser_id}")
-                return None
-
-            winner_rating = winner_rating_row[0] or 1200
-            loser_rating = loser_rating_row[0] or 1200
-
-            winner_expected = 1 / (1 + 10 ** ((loser_rating - winner_rating) / 400))
-            loser_expected = 1 / (1 + 10 ** ((winner_rating - loser_rating) / 400))
+def _apply_rating_period(cursor, games: list, mode: str):
+    """
+    Aplica um lote de resultados como um período de rating (rating_engine) dentro da transação do chamador.
 
-            k_factor = 32
+    `games`: [(player1_id, player2_id, pontuação do player1)]. Lê todos os jogadores numa consulta,
+    calcula tudo de uma vez e grava com um executemany. Retorna {player_id: {'old', 'new', 'change'}}
+    ou None se algum jogador não existir.
+    """
+    if mode not in RATING_MODES:
+        logger.warning(f"Modo de rating inválido: {mode}")
+        return None
+    games = [(str(p1), str(p2), float(score)) for p1, p2, score in games if p1 and p2 and str(p1) != str(p2)]
+    if not games:
+        return {}
+
+    player_ids = sorted({pid for p1, p2, _ in games for pid in (p1, p2)})
+    placeholders = ",".join("?" for _ in player_ids)
+    rows = cursor.execute(f"""
+        SELECT discord_id, rating_{mode} AS rating, rd_{mode} AS rd, vol_{mode} AS vol,
+               COALESCE(wins_{mode}, 0) + COALESCE(losses_{mode}, 0) + COALESCE(draws_{mode}, 0) AS games_played
+        FROM players WHERE discord_id IN ({placeholders})
+    """, player_ids).fetchall()
+    if len(rows) != len(player_ids):
+        found = {row['discord_id'] for row in rows}
+        logger.warning(f"Não foi possível encontrar ratings para {[pid for pid in player_ids if pid not in found]}")
+        return None
 
-            winner_change = round(k_factor * (1 - winner_expected))
-            loser_change = round(k_factor * (0 - loser_expected))
+    states = {
+        row['discord_id']: {
+            'rating': row['rating'] or DEFAULT_RATING,
+            'rd': row['rd'] if row['rd'] is not None else initial_rd(row['games_played']),
+            'vol': row['vol'] if row['vol'] is not None else GLICKO2_DEFAULT_VOL,
+        }
+        for row in rows
+    }
+    new_states = rate_period(states, games)
 
-            new_winner_rating = winner_rating + winner_change
-            new_loser_rating = loser_rating + loser_change
+    cursor.executemany(
+        f"UPDATE players SET rating_{mode} = ?, rd_{mode} = ?, vol_{mode} = ? WHERE discord_id = ?",
+        [(state['rating'], state['rd'], state['vol'], pid) for pid, state in new_states.items()]
+    )
+    # Toda mudança de rating vira um ponto no rating_history, na mesma transação
+    cursor.executemany(
+        "INSERT INTO rating_history (player_id, mode, rating) VALUES (?, ?, ?)",
+        [(pid, RATING_MODE_CODES[mode], state['rating']) for pid, state in new_states.items()]
+    )
+    return {
+        pid: {'old': states[pid]['rating'], 'new': state['rating'], 'change': state['rating'] - states[pid]['rating']}
+        for pid, state in new_states.items()
+    }
 
-            cursor.execute(f"UPDATE players SET rating_{mode} = ? WHERE discord_id = ?", (new_winner_rating, winner_id))
-            cursor.execute(f"UPDATE players SET rating_{mode} = ? WHERE discord_id = ?", (new_loser_rating, loser_id))
 
+async def apply_rating_period(games: list, mode: str):
+    """Aplica vários resultados (ex: uma rodada inteira) como um único período de rating."""
+    def _apply():
+        conn = get_conn()
+        cursor = conn.cursor()
+        try:
+            changes = _apply_rating_period(cursor, games, mode)
             conn.commit()
-
-            return {
-                'winner': {
-                    'old_rating': winner_rating,
-                    'new_rating': new_winner_rating,
-                    'change': winner_change
-                },
-                'loser': {
-                    'old_rating': loser_rating,
-                    'new_rating': new_loser_rating,
-                    'change': loser_change
-                }
-            }
-
+            return changes
         except Exception as e:
-            logger.error(f"Erro ao aplicar mudanças de rating: {e}")
+            logger.error(f"Erro ao aplicar período de rating: {e}")
             conn.rollback()
             return None
         finally:
@@ -965,6 +1470,26 @@ async def apply_match_ratings(winner_id: str, loser_id: str, mode: str):
 
     return await enqueue_write(_apply)
 
+
+async def apply_match_ratings(winner_id: str, loser_id: str, mode: str):
+    """Aplica mudanças de rating entre dois jogadores após uma partida (período de uma partida só)."""
+    changes = await apply_rating_period([(winner_id, loser_id, 1.0)], mode)
+    if not changes:
+        return None
+    winner, loser = changes[str(winner_id)], changes[str(loser_id)]
+    return {
+        'winner': {
+            'old_rating': winner['old'],
+            'new_rating': winner['new'],
+            'change': winner['change']
+        },
+        'loser': {
+            'old_rating': loser['old'],
+            'new_rating': loser['new'],
+            'change': loser['change']
+        }
+    }
+
 async def get_expired_challenges():
     """Busca desafios pendentes que expiraram (mais de 1 minuto)."""
     def _fetch():
@@ -1166,15 +1691,15 @@ async def remove_ranking_channel(mode: str):
 # --- FUNÇÕES PARA TORNEIOS ---
 # ==============================================================================
 
-async def create_tournament(name: str, description: str, mode: str, time_control: str, max_participants: int, min_participants: int, created_by: str, is_automatic: bool = False, rated: bool = True):
-    """Cria um novo torneio."""
+async def create_tournament(name: str, description: str, mode: str, time_control: str, max_participants: int, min_participants: int, created_by: str, is_automatic: bool = False, rated: bool = True, format: str = FORMAT_KNOCKOUT):
+    """Cria um novo torneio (format: knockout, round_robin ou arena)."""
     def _create():
         conn = get_conn()
         cursor = conn.cursor()
         cursor.execute('''
-            INSERT INTO tournaments (name, description, mode, time_control, max_participants, min_participants, created_by, is_automatic, rated)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (name, description, mode, time_control, max_participants, min_participants, created_by, is_automatic, rated))
+            INSERT INTO tournaments (name, description, mode, time_control, max_participants, min_participants, created_by, is_automatic, rated, format)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (name, description, mode, time_control, max_participants, min_participants, created_by, is_automatic, rated, format))
         tournament_id = cursor.lastrowid
         conn.commit()
         conn.close()
@@ -1217,6 +1742,10 @@ async def create_swiss_tournament(name: str, description: str, time_control: str
                 tiebreak_score REAL DEFAULT 0.0,
                 sonneborn_berger REAL DEFAULT 0.0,
                 h2h_record TEXT DEFAULT '',
+                buchholz_cut1 REAL DEFAULT 0.0,
+                median_buchholz REAL DEFAULT 0.0,
+                direct_encounter REAL DEFAULT 0.0,
+                progressive_score REAL DEFAULT 0.0,
                 wins INTEGER DEFAULT 0,
                 draws INTEGER DEFAULT 0,
                 losses INTEGER DEFAULT 0,
@@ -1292,12 +1821,13 @@ async def get_swiss_tournament_participants(tournament_id: int):
     def _get():
         conn = get_conn()
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT sp.*, p.discord_username, p.lichess_username
+        cursor.execute(f"""
+            SELECT sp.*, p.discord_username, p.lichess_username,
+                   p.rating_bullet, p.rating_blitz, p.rating_rapid, p.rating_classic
             FROM swiss_participants sp
             LEFT JOIN players p ON sp.player_id = p.discord_id
             WHERE sp.tournament_id = ?
-            ORDER BY sp.points DESC, sp.tiebreak_score DESC
+            ORDER BY {STANDINGS_ORDER_SQL}
         """, (tournament_id,))
         results = cursor.fetchall()
         conn.close()
@@ -1334,7 +1864,7 @@ async def abandon_swiss_tournament(tournament_id: int, player_id: str):
         finally:
             conn.close()
     
-    return await asyncio.to_thread(_abandon)
+    return await enqueue_ordered_write(swiss_write_key(tournament_id), _abandon)
 
 async def process_abandoned_games(tournament_id: int, player_id: str):
     """Marca todas as partidas restantes do jogador como perdidas."""
@@ -1395,7 +1925,7 @@ async def process_abandoned_games(tournament_id: int, player_id: str):
         finally:
             conn.close()
     
-    await asyncio.to_thread(_process)
+    await enqueue_ordered_write(swiss_write_key(tournament_id), _process)
 
 async def join_swiss_tournament(tournament_id: int, player_id: str):
     """Inscreve um jogador em um torneio Swiss."""
@@ -1449,7 +1979,7 @@ async def join_swiss_tournament(tournament_id: int, player_id: str):
             return False, f"Erro ao se inscrever: {str(e)}"
         finally:
             conn.close()
-    return await enqueue_write(_join)
+    return await enqueue_ordered_write(swiss_write_key(tournament_id), _join)
 
 async def leave_swiss_tournament(tournament_id: int, player_id: str):
     """Remove a inscrição de um jogador em um torneio Swiss."""
@@ -1471,7 +2001,7 @@ async def leave_swiss_tournament(tournament_id: int, player_id: str):
         finally:
             conn.close()
 
-    return await enqueue_write(_leave)
+    return await enqueue_ordered_write(swiss_write_key(tournament_id), _leave)
 
 async def get_tournament(tournament_id: int):
     """Busca um torneio específico."""
@@ -1569,12 +2099,13 @@ async def leave_tournament(tournament_id: int, player_id: str):
 
 
 async def get_tournament_participants(tournament_id: int):
-    """Busca participantes de um torneio."""
+    """Busca participantes de um torneio (com os ratings de cada modo, para listar sem consultas extras)."""
     def _get():
         conn = get_conn()
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT tp.*, p.discord_username, p.lichess_username
+            SELECT tp.*, p.discord_username, p.lichess_username,
+                   p.rating_bullet, p.rating_blitz, p.rating_rapid, p.rating_classic
             FROM tournament_participants tp
             JOIN players p ON tp.player_id = p.discord_id
             WHERE tp.tournament_id = ?
@@ -1585,52 +2116,178 @@ async def get_tournament_participants(tournament_id: int):
         return [dict(p) for p in participants]
     return await asyncio.to_thread(_get)
 
+def _get_seeded_participants(cursor, tournament_id: int):
+    """Participantes do torneio ordenados por seed: rating do modo do torneio, depois ordem de inscrição."""
+    tournament = cursor.execute("SELECT mode FROM tournaments WHERE id = ?", (tournament_id,)).fetchone()
+    mode = tournament['mode'] if tournament and tournament['mode'] in RATING_MODES else 'rapid'
+    rows = cursor.execute(f"""
+        SELECT tp.player_id FROM tournament_participants tp
+        LEFT JOIN players p ON p.discord_id = tp.player_id
+        WHERE tp.tournament_id = ?
+        ORDER BY COALESCE(p.rating_{mode}, 1200) DESC, tp.joined_at, tp.id
+    """, (tournament_id,)).fetchall()
+    return [row['player_id'] for row in rows]
+
+
+_BRACKET_CHALLENGE_SQL = '''
+    INSERT INTO challenges (challenger_id, challenged_id, channel_id, tournament_id, time_control, time_control_mode, status, is_rated)
+    SELECT ?, ?, ?, ?, t.time_control, t.mode, 'pending', t.rated
+    FROM tournaments t WHERE t.id = ?
+'''
+
+
+def _get_bracket_channel_id(cursor, tournament_id: int) -> str:
+    """Canal usado pelos desafios já criados do torneio (para os desafios das próximas partidas)."""
+    row = cursor.execute("""
+        SELECT channel_id FROM challenges
+        WHERE tournament_id = ? AND channel_id IS NOT NULL AND channel_id != ''
+        LIMIT 1
+    """, (tournament_id,)).fetchone()
+    return row['channel_id'] if row else ''
+
+
+def _open_ready_bracket_matches(cursor, tournament_id: int, channel_id: str, match_ids=None) -> int:
+    """
+    Libera as partidas em espera que já têm os dois jogadores: status 'pending' e desafio criado.
+
+    Com `match_ids`, considera só essas partidas (avanço de um resultado). Retorna quantas foram liberadas.
+    """
+    query = """
+        SELECT id, player1_id, player2_id FROM tournament_matches
+        WHERE tournament_id = ? AND status = 'waiting'
+          AND player1_id IS NOT NULL AND player2_id IS NOT NULL
+    """
+    params = [tournament_id]
+    if match_ids:
+        query += f" AND id IN ({','.join('?' for _ in match_ids)})"
+        params.extend(match_ids)
+    ready = cursor.execute(query, params).fetchall()
+    if not ready:
+        return 0
+
+    last_challenge_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM challenges").fetchone()[0]
+    cursor.executemany(_BRACKET_CHALLENGE_SQL, [
+        (m['player1_id'], m['player2_id'], channel_id or '', tournament_id, tournament_id) for m in ready
+    ])
+
+    # Associa cada partida ao desafio recém-criado (um jogador só tem uma partida em espera por vez)
+    cursor.executemany('''
+        UPDATE tournament_matches SET status = 'pending', challenge_id = (
+            SELECT MIN(c.id) FROM challenges c
+            WHERE c.id > ? AND c.challenger_id = tournament_matches.player1_id
+              AND c.challenged_id = tournament_matches.player2_id
+        )
+        WHERE id = ?
+    ''', [(last_challenge_id, m['id']) for m in ready])
+    return len(ready)
+
+
+def _create_bracket_tree(cursor, tournament_id: int, first_round, channel_id: str = None):
+    """
+    Cria o bracket inteiro de uma vez (dentro da transação do chamador).
+
+    A rodada 1 vem de build_first_round; as rodadas seguintes entram em espera ('waiting') sem jogadores.
+    Cada partida aponta para a próxima via next_match_id/next_slot, então um resultado preenche a vaga
+    da partida seguinte diretamente. Byes já entram finalizados e ocupam suas vagas na rodada 2.
+    """
+    cursor.executemany('''
+        INSERT INTO tournament_matches (tournament_id, round_number, match_number, player1_id, player2_id, winner_id, status)
+        VALUES (?, 1, ?, ?, ?, ?, ?)
+    ''', [
+        (tournament_id, match_num, player1, player2, None if player2 else player1, 'waiting' if player2 else 'finished')
+        for match_num, player1, player2 in first_round
+    ])
+
+    placeholders = []
+    matches_in_round = len(first_round) // 2
+    round_num = 2
+    while matches_in_round >= 1:
+        placeholders.extend((tournament_id, round_num, match_num) for match_num in range(1, matches_in_round + 1))
+        matches_in_round //= 2
+        round_num += 1
+    cursor.executemany('''
+        INSERT INTO tournament_matches (tournament_id, round_number, match_number, status)
+        VALUES (?, ?, ?, 'waiting')
+    ''', placeholders)
+
+    # Partida m da rodada r alimenta a vaga (2 - m % 2) da partida ceil(m/2) da rodada r + 1
+    cursor.execute('''
+        UPDATE tournament_matches SET
+            next_match_id = (
+                SELECT parent.id FROM tournament_matches parent
+                WHERE parent.tournament_id = tournament_matches.tournament_id
+                  AND parent.round_number = tournament_matches.round_number + 1
+                  AND parent.match_number = (tournament_matches.match_number + 1) / 2
+            ),
+            next_slot = 2 - (match_number % 2)
+        WHERE tournament_id = ?
+    ''', (tournament_id,))
+    cursor.execute("UPDATE tournament_matches SET next_slot = NULL WHERE tournament_id = ? AND next_match_id IS NULL", (tournament_id,))
+
+    # Vencedores por bye ocupam suas vagas na rodada 2
+    cursor.execute('''
+        UPDATE tournament_matches SET
+            player1_id = (SELECT child.winner_id FROM tournament_matches child
+                          WHERE child.next_match_id = tournament_matches.id AND child.next_slot = 1 AND child.status = 'finished'),
+            player2_id = (SELECT child.winner_id FROM tournament_matches child
+                          WHERE child.next_match_id = tournament_matches.id AND child.next_slot = 2 AND child.status = 'finished')
+        WHERE tournament_id = ? AND round_number = 2
+    ''', (tournament_id,))
+
+    _open_ready_bracket_matches(cursor, tournament_id, channel_id)
+
+
+def _advance_bracket_winner(cursor, match_id: int):
+    """
+    Leva o vencedor de uma partida finalizada para a vaga da próxima partida (O(1) por resultado).
+
+    Se a próxima partida ficar completa, ela é liberada com seu desafio. Se a partida for a final,
+    o torneio é finalizado. Retorna {'next_match_id', 'opened', 'tournament_finished'}.
+    """
+    match = cursor.execute('''
+        SELECT id, tournament_id, round_number, winner_id, next_match_id, next_slot
+        FROM tournament_matches WHERE id = ?
+    ''', (match_id,)).fetchone()
+    result = {'next_match_id': None, 'opened': False, 'tournament_finished': False}
+    if not match or not match['winner_id']:
+        return result
+
+    tournament_id = match['tournament_id']
+    if match['next_match_id'] is None:
+        # Final: única partida da sua rodada (também cobre brackets antigos, sem árvore)
+        same_round = cursor.execute('''
+            SELECT COUNT(*) FROM tournament_matches WHERE tournament_id = ? AND round_number = ?
+        ''', (tournament_id, match['round_number'])).fetchone()[0]
+        if same_round == 1:
+            cursor.execute('''
+                UPDATE tournaments SET status = 'finished', finished_at = CURRENT_TIMESTAMP, winner_id = ?
+                WHERE id = ? AND status != 'finished'
+            ''', (match['winner_id'], tournament_id))
+            result['tournament_finished'] = True
+        return result
+
+    slot_column = 'player1_id' if match['next_slot'] == 1 else 'player2_id'
+    cursor.execute(f"UPDATE tournament_matches SET {slot_column} = ? WHERE id = ? AND status = 'waiting'",
+                   (match['winner_id'], match['next_match_id']))
+    result['next_match_id'] = match['next_match_id']
+    result['opened'] = _open_ready_bracket_matches(
+        cursor, tournament_id, _get_bracket_channel_id(cursor, tournament_id), [match['next_match_id']]
+    ) > 0
+    return result
+
+
 async def start_tournament(tournament_id: int):
-    """Inicia um torneio, criando as partidas da primeira rodada."""
+    """Inicia um torneio, criando o bracket completo com seeds por rating."""
     def _start():
         conn = get_conn()
         cursor = conn.cursor()
         try:
             with conn:
-                # Busca participantes
-                participants = cursor.execute("""
-                    SELECT player_id FROM tournament_participants
-                    WHERE tournament_id = ? ORDER BY joined_at
-                """, (tournament_id,)).fetchall()
-
-                if len(participants) < 2:
+                player_ids = _get_seeded_participants(cursor, tournament_id)
+                if len(player_ids) < 2:
                     return False, "São necessários pelo menos 2 participantes para iniciar o torneio."
 
-                # Embaralha participantes para bracket aleatório
-                import random
-                player_ids = [p['player_id'] for p in participants]
-                random.shuffle(player_ids)
-
-                # Cria partidas da primeira rodada
-                round_num = 1
-                match_num = 1
-                for i in range(0, len(player_ids) - 1, 2):
-                    player1 = player_ids[i]
-                    player2 = player_ids[i + 1] if i + 1 < len(player_ids) else None
-
-                    cursor.execute('''
-                        INSERT INTO tournament_matches (tournament_id, round_number, match_number, player1_id, player2_id, status)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (tournament_id, round_num, match_num, player1, player2, 'pending' if player2 else 'bye'))
-
-                    if player2:
-                        # Cria desafio automático
-                        challenge_id = cursor.execute('''
-                            INSERT INTO challenges (challenger_id, challenged_id, channel_id, time_control, time_control_mode, status, is_rated)
-                            SELECT ?, ?, '', t.time_control, t.mode, 'pending', 1
-                            FROM tournaments t WHERE t.id = ?
-                        ''', (player1, player2, tournament_id)).lastrowid
-
-                        cursor.execute('''
-                            UPDATE tournament_matches SET challenge_id = ? WHERE tournament_id = ? AND round_number = ? AND match_number = ?
-                        ''', (challenge_id, tournament_id, round_num, match_num))
-
-                    match_num += 1
+                _create_bracket_tree(cursor, tournament_id, build_first_round(player_ids))
 
                 # Atualiza status do torneio
                 cursor.execute("UPDATE tournaments SET status = 'in_progress', started_at = CURRENT_TIMESTAMP WHERE id = ?", (tournament_id,))
@@ -1638,73 +2295,23 @@ async def start_tournament(tournament_id: int):
             return True, "Torneio iniciado com sucesso!"
         except Exception as e:
             return False, f"Erro ao iniciar torneio: {str(e)}"
-    return await asyncio.to_thread(_start)
+        finally:
+            conn.close()
+    return await enqueue_write(_start)
 
 async def start_bracket_tournament(tournament_id: int, channel_id: str = None):
-    """Inicia um torneio de bracket, lidando com byes para potências de 2."""
+    """Inicia um torneio de bracket com seeds por rating e byes para as melhores seeds."""
     def _start_bracket():
         conn = get_conn()
         cursor = conn.cursor()
         try:
             with conn:
-                # Busca participantes
-                participants = cursor.execute("""
-                    SELECT player_id FROM tournament_participants
-                    WHERE tournament_id = ? ORDER BY joined_at
-                """, (tournament_id,)).fetchall()
-
-                num_participants = len(participants)
-                if num_participants < 2:
+                player_ids = _get_seeded_participants(cursor, tournament_id)
+                if len(player_ids) < 2:
                     return False, "São necessários pelo menos 2 participantes para iniciar o torneio."
 
-                # Embaralha participantes
-                import random
-                player_ids = [p['player_id'] for p in participants]
-                # Seed aleatório
-                random.shuffle(player_ids)
-
-                # Calcula a próxima potência de 2
-                next_power_of_two = 2**math.ceil(math.log2(num_participants))
-                num_byes = next_power_of_two - num_participants
-
-                # Separa quem ganha Bye e quem joga
-                # Em um bracket aleatório, os primeiros 'num_byes' jogadores avançam direto
-                players_getting_bye = player_ids[:num_byes]
-                players_playing = player_ids[num_byes:]
-                
-                match_num = 1
-
-                # 1. Cria partidas de Bye (Rodada 1) - Jogador vs NULL
-                for player_id in players_getting_bye:
-                    cursor.execute('''
-                        INSERT INTO tournament_matches (tournament_id, round_number, match_number, player1_id, winner_id, status)
-                        VALUES (?, 1, ?, ?, ?, 'finished')
-                    ''', (tournament_id, match_num, player_id, player_id))
-                    match_num += 1
-
-                # 2. Cria partidas normais (Rodada 1) - Jogador vs Jogador
-                for i in range(0, len(players_playing), 2):
-                    player1 = players_playing[i]
-                    player2 = players_playing[i+1]
-
-                    cursor.execute('''
-                        INSERT INTO tournament_matches (tournament_id, round_number, match_number, player1_id, player2_id, status)
-                        VALUES (?, 1, ?, ?, ?, 'pending')
-                    ''', (tournament_id, match_num, player1, player2))
-                    
-                    # Associa desafio com channel_id
-                    challenge_id = cursor.execute('''
-                        INSERT INTO challenges (challenger_id, challenged_id, channel_id, tournament_id, time_control, time_control_mode, status, is_rated)
-                        SELECT ?, ?, ?, ?, t.time_control, t.mode, 'pending', t.rated
-                        FROM tournaments t WHERE t.id = ?
-                    ''', (player1, player2, channel_id or '', tournament_id, tournament_id)).lastrowid
-
-                    cursor.execute('''
-                        UPDATE tournament_matches SET challenge_id = ?
-                        WHERE tournament_id = ? AND round_number = 1 AND match_number = ?
-                    ''', (challenge_id, tournament_id, match_num))
-                    
-                    match_num += 1
+                # Seed 1 x última seed, completando até a próxima potência de 2 com byes
+                _create_bracket_tree(cursor, tournament_id, build_first_round(player_ids), channel_id)
 
                 # Atualiza status do torneio
                 cursor.execute("UPDATE tournaments SET status = 'in_progress', started_at = CURRENT_TIMESTAMP WHERE id = ?", (tournament_id,))
@@ -1713,6 +2320,8 @@ async def start_bracket_tournament(tournament_id: int, channel_id: str = None):
         except Exception as e:
             logger.error(f"Erro ao iniciar torneio de bracket: {e}", exc_info=True)
             return False, f"Erro ao iniciar torneio de bracket: {e}"
+        finally:
+            conn.close()
 
     return await enqueue_write(_start_bracket)
 
@@ -1743,42 +2352,416 @@ async def get_tournament_matches(tournament_id: int, round_num: int = None):
         return [dict(m) for m in matches]
     return await asyncio.to_thread(_get)
 
-async def update_tournament_match_winner(tournament_id: int, round_num: int, match_num: int, winner_id: str):
-    """Atualiza o vencedor de uma partida do torneio."""
-    def _update():
-        conn = get_conn()
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE tournament_matches SET winner_id = ?, status = 'finished', finished_at = CURRENT_TIMESTAMP
-            WHERE tournament_id = ? AND round_number = ? AND match_number = ?
-        ''', (winner_id, tournament_id, round_num, match_num))
-        conn.commit()
-        conn.close()
-    await asyncio.to_thread(_update)
+def _finish_tournament_match(cursor, match_id: int, winner_id: str = None):
+    """
+    Registra o resultado de uma partida do torneio e segue o fluxo do formato.
 
-async def advance_tournament_round(tournament_id: int):
-    """Avança para a próxima rodada do torneio, mantendo estrutura de bracket."""
-    def _advance():
-        conn = get_conn()
-        cursor = conn.cursor()
-        try:
-            with conn:
-                # Busca rodada atual
-                cursor.execute("SELECT MAX(round_number) as current_round FROM tournament_matches WHERE tournament_id = ?", (tournament_id,))
-                current_round = cursor.fetchone()['current_round'] or 0
+    Eliminatória: soma o ponto e avança o vencedor (empate não encerra a partida).
+    Todos-contra-todos/arena: aceita empate (winner_id None) e atualiza a classificação incrementalmente.
+    """
+    match = cursor.execute('''
+        SELECT tm.tournament_id, tm.player1_id, tm.player2_id, COALESCE(t.format, 'knockout') as format
+        FROM tournament_matches tm JOIN tournaments t ON t.id = tm.tournament_id
+        WHERE tm.id = ? AND tm.status != 'finished'
+    ''', (match_id,)).fetchone()
+    if not match or (match['format'] == FORMAT_KNOCKOUT and not winner_id):
+        return None
 
-                # Verifica se todas as partidas da rodada foram finalizadas
-                cursor.execute("""
-                    SELECT COUNT(*) as total, COUNT(CASE WHEN status = 'finished' THEN 1 END) as finished
-                    FROM tournament_matches WHERE tournament_id = ? AND round_number = ?
-                """, (tournament_id, current_round))
-                progress = cursor.fetchone()
-                if progress['total'] != progress['finished']:
-                    return False, "Nem todas as partidas da rodada atual foram finalizadas."
+    cursor.execute('''
+        UPDATE tournament_matches SET winner_id = ?, status = 'finished', finished_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', (winner_id, match_id))
 
-                # Busca vencedores da rodada atual ordenados por match_number para manter estrutura de bracket
-                winners = cursor.execute("""
-                    SELECT winner_id, match_number FROM tournament_matches
+    if match['format'] == FORMAT_KNOCKOUT:
+        cursor.execute('''
+            UPDATE tournament_participants SET points = points + 1.0
+            WHERE tournament_id = ? AND player_id = ?
+        ''', (match['tournament_id'], winner_id))
+        return _advance_bracket_winner(cursor, match_id)
+
+    _apply_incremental_standings(cursor, match, winner_id)
+    if match['format'] == FORMAT_ROUND_ROBIN:
+        opened = _open_next_round_robin_matches(cursor, match['tournament_id'], [match['player1_id'], match['player2_id']])
+    else:
+        opened = _pair_arena_waiting(cursor, match['tournament_id'])
+    finished = _finish_if_no_open_matches(cursor, match['tournament_id'], match['format'])
+    return {'next_match_id': None, 'opened': opened > 0, 'tournament_finished': finished}
+
+
+def _apply_incremental_standings(cursor, match, winner_id: str = None):
+    """Atualiza pontos, V/E/D, sequência e último adversário dos dois jogadores de uma partida."""
+    tournament_id = match['tournament_id']
+    players = [match['player1_id'], match['player2_id']]
+    rows = cursor.execute('''
+        SELECT player_id, COALESCE(streak, 0) as streak FROM tournament_participants
+        WHERE tournament_id = ? AND player_id IN (?, ?)
+    ''', (tournament_id, *players)).fetchall()
+    streaks = {row['player_id']: row['streak'] for row in rows}
+
+    updates = []
+    for player_id, opponent_id in (players, players[::-1]):
+        if winner_id is None:
+            result = 'draw'
+        else:
+            result = 'win' if player_id == winner_id else 'loss'
+        if match['format'] == FORMAT_ARENA:
+            points, streak = arena_points(result, streaks.get(player_id, 0))
+        else:
+            points, streak = round_robin_points(result), 0
+        updates.append((
+            points, int(result == 'win'), int(result == 'draw'), int(result == 'loss'),
+            streak, opponent_id, tournament_id, player_id,
+        ))
+
+    cursor.executemany('''
+        UPDATE tournament_participants SET
+            points = points + ?, wins = COALESCE(wins, 0) + ?, draws = COALESCE(draws, 0) + ?,
+            losses = COALESCE(losses, 0) + ?, games_played = COALESCE(games_played, 0) + 1,
+            streak = ?, last_opponent_id = ?
+        WHERE tournament_id = ? AND player_id = ?
+    ''', updates)
+
+
+def _rebuild_incremental_standings(cursor, tournament_id: int):
+    """Refaz a classificação de todos-contra-todos/arena a partir das partidas finalizadas, na ordem em que terminaram."""
+    cursor.execute('''
+        UPDATE tournament_participants SET
+            points = 0, wins = 0, draws = 0, losses = 0, games_played = 0, streak = 0, last_opponent_id = NULL
+        WHERE tournament_id = ?
+    ''', (tournament_id,))
+    matches = cursor.execute('''
+        SELECT tm.tournament_id, tm.player1_id, tm.player2_id, tm.winner_id, COALESCE(t.format, 'knockout') as format
+        FROM tournament_matches tm JOIN tournaments t ON t.id = tm.tournament_id
+        WHERE tm.tournament_id = ? AND tm.status = 'finished' AND tm.player2_id IS NOT NULL
+        ORDER BY tm.finished_at, tm.id
+    ''', (tournament_id,)).fetchall()
+    # A arena depende da sequência de vitórias, então a ordem das partidas importa
+    for match in matches:
+        _apply_incremental_standings(cursor, match, match['winner_id'])
+
+
+def _correct_tournament_match(cursor, match_id: int, winner_id: str):
+    """
+    Troca o vencedor de uma partida já finalizada, conforme o formato do torneio.
+
+    Eliminatória: recontar os pontos dos dois jogadores e levar o novo vencedor à próxima vaga (ou ao
+    título, se for a final). Só é possível enquanto a próxima partida ainda espera os jogadores.
+    Todos-contra-todos/arena: refaz a classificação, desfazendo os pontos dados ao resultado antigo.
+
+    Retorna uma mensagem de erro se a correção não puder ser feita, ou None.
+    """
+    match = cursor.execute('''
+        SELECT tm.tournament_id, tm.winner_id, tm.next_match_id, COALESCE(t.format, 'knockout') as format,
+               next.status as next_status
+        FROM tournament_matches tm JOIN tournaments t ON t.id = tm.tournament_id
+        LEFT JOIN tournament_matches next ON next.id = tm.next_match_id
+        WHERE tm.id = ?
+    ''', (match_id,)).fetchone()
+    old_winner = match['winner_id']
+    if old_winner == winner_id:
+        return None
+    tournament_id = match['tournament_id']
+
+    if match['format'] != FORMAT_KNOCKOUT:
+        # Mantém finished_at para a partida continuar na mesma posição da sequência
+        cursor.execute("UPDATE tournament_matches SET winner_id = ? WHERE id = ?", (winner_id, match_id))
+        _rebuild_incremental_standings(cursor, tournament_id)
+        # Torneio já encerrado: o campeão é o líder da classificação corrigida
+        cursor.execute('''
+            UPDATE tournaments SET winner_id = (
+                SELECT player_id FROM tournament_participants WHERE tournament_id = ?
+                ORDER BY points DESC, wins DESC, joined_at LIMIT 1
+            ) WHERE id = ? AND status = 'finished'
+        ''', (tournament_id, tournament_id))
+        return None
+
+    if match['next_match_id'] is not None and match['next_status'] != 'waiting':
+        # A próxima partida já foi liberada (ou jogada) com o vencedor antigo
+        return "A próxima partida do chaveamento já começou; não é possível corrigir este resultado."
+
+    cursor.execute('''
+        UPDATE tournament_matches SET winner_id = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?
+    ''', (winner_id, match_id))
+    # Mesma contagem da recontagem completa (update_tournament_standings), incluindo byes
+    _recount_knockout_points(cursor, tournament_id, [p for p in (old_winner, winner_id) if p])
+    if match['next_match_id'] is None:
+        # Final já decidida: o título passa para o novo vencedor
+        cursor.execute('''
+            UPDATE tournaments SET winner_id = ? WHERE id = ? AND status = 'finished' AND winner_id IS ?
+        ''', (winner_id, tournament_id, old_winner))
+    _advance_bracket_winner(cursor, match_id)
+    return None
+
+
+def _recount_knockout_points(cursor, tournament_id: int, player_ids=None):
+    """Pontos da eliminatória = partidas finalizadas vencidas (byes contam). Sem `player_ids`, recalcula todos."""
+    players_filter = f"AND player_id IN ({','.join('?' for _ in player_ids)})" if player_ids else ""
+    cursor.execute(f"""
+        UPDATE tournament_participants
+        SET points = (
+            SELECT COUNT(*)
+            FROM tournament_matches tm
+            WHERE tm.tournament_id = tournament_participants.tournament_id
+            AND tm.winner_id = tournament_participants.player_id
+            AND tm.status = 'finished'
+        )
+        WHERE tournament_id = ? {players_filter}
+    """, (tournament_id, *(player_ids or ())))
+
+
+def _open_next_round_robin_matches(cursor, tournament_id: int, player_ids) -> int:
+    """
+    Libera a próxima partida de cada jogador no todos-contra-todos, sem esperar a rodada inteira.
+
+    A próxima partida (menor rodada em espera) só abre se nenhum dos dois tiver partida pendente.
+    """
+    match_ids = []
+    reserved = set()
+    for player_id in player_ids:
+        candidates = cursor.execute('''
+            SELECT tm.id, tm.player1_id, tm.player2_id FROM tournament_matches tm
+            WHERE tm.tournament_id = ? AND tm.status = 'waiting' AND (tm.player1_id = ? OR tm.player2_id = ?)
+              AND NOT EXISTS (
+                  SELECT 1 FROM tournament_matches busy
+                  WHERE busy.tournament_id = tm.tournament_id AND busy.status = 'pending'
+                    AND (busy.player1_id IN (tm.player1_id, tm.player2_id) OR busy.player2_id IN (tm.player1_id, tm.player2_id))
+              )
+            ORDER BY tm.round_number, tm.match_number
+        ''', (tournament_id, player_id, player_id)).fetchall()
+        # Não abre duas partidas para o mesmo jogador nesta leva
+        for match in candidates:
+            if match['player1_id'] not in reserved and match['player2_id'] not in reserved:
+                match_ids.append(match['id'])
+                reserved.update((match['player1_id'], match['player2_id']))
+                break
+    if not match_ids:
+        return 0
+    return _open_ready_bracket_matches(cursor, tournament_id, _get_bracket_channel_id(cursor, tournament_id), match_ids)
+
+
+def _pair_arena_waiting(cursor, tournament_id: int, channel_id: str = None) -> int:
+    """
+    Emparelha quem está na fila da arena (sem partida aberta) por faixa de pontuação.
+
+    Não cria partidas depois de ends_at. Retorna quantas partidas foram liberadas.
+    """
+    tournament = cursor.execute('''
+        SELECT mode, status, ends_at, ends_at <= CURRENT_TIMESTAMP as expired FROM tournaments WHERE id = ?
+    ''', (tournament_id,)).fetchone()
+    if not tournament or tournament['status'] != 'in_progress' or tournament['expired']:
+        return 0
+
+    mode = tournament['mode'] if tournament['mode'] in RATING_MODES else 'rapid'
+    waiting = [dict(row) for row in cursor.execute(f"""
+        SELECT tp.player_id, tp.points, tp.last_opponent_id, COALESCE(p.rating_{mode}, 1200) as rating
+        FROM tournament_participants tp
+        LEFT JOIN players p ON p.discord_id = tp.player_id
+        WHERE tp.tournament_id = ? AND COALESCE(tp.eliminated, 0) = 0
+          AND NOT EXISTS (
+              SELECT 1 FROM tournament_matches tm
+              WHERE tm.tournament_id = tp.tournament_id AND tm.status IN ('waiting', 'pending')
+                AND (tm.player1_id = tp.player_id OR tm.player2_id = tp.player_id)
+          )
+    """, (tournament_id,)).fetchall()]
+    pairs = pair_arena(waiting, {w['player_id']: w['last_opponent_id'] for w in waiting if w['last_opponent_id']})
+    if not pairs:
+        return 0
+
+    # Cada leva de emparelhamentos vira uma "rodada" da arena
+    last = cursor.execute('''
+        SELECT COALESCE(MAX(round_number), 0) as round_number, COALESCE(MAX(match_number), 0) as match_number
+        FROM tournament_matches WHERE tournament_id = ?
+    ''', (tournament_id,)).fetchone()
+    wave = last['round_number'] + 1
+    cursor.executemany('''
+        INSERT INTO tournament_matches (tournament_id, round_number, match_number, player1_id, player2_id, status)
+        VALUES (?, ?, ?, ?, ?, 'waiting')
+    ''', [(tournament_id, wave, last['match_number'] + i, p1, p2) for i, (p1, p2) in enumerate(pairs, 1)])
+    match_ids = [row['id'] for row in cursor.execute(
+        "SELECT id FROM tournament_matches WHERE tournament_id = ? AND round_number = ?", (tournament_id, wave)
+    ).fetchall()]
+    return _open_ready_bracket_matches(
+        cursor, tournament_id, channel_id or _get_bracket_channel_id(cursor, tournament_id), match_ids
+    )
+
+
+def _finish_if_no_open_matches(cursor, tournament_id: int, tournament_format: str) -> bool:
+    """Finaliza o todos-contra-todos/arena quando não há mais partidas abertas (arena: só após ends_at)."""
+    open_matches = cursor.execute('''
+        SELECT COUNT(*) FROM tournament_matches WHERE tournament_id = ? AND status IN ('waiting', 'pending')
+    ''', (tournament_id,)).fetchone()[0]
+    if open_matches:
+        return False
+    if tournament_format == FORMAT_ARENA:
+        expired = cursor.execute(
+            "SELECT ends_at <= CURRENT_TIMESTAMP FROM tournaments WHERE id = ?", (tournament_id,)
+        ).fetchone()[0]
+        if not expired:
+            return False
+
+    leader = cursor.execute('''
+        SELECT player_id FROM tournament_participants WHERE tournament_id = ?
+        ORDER BY points DESC, wins DESC, joined_at LIMIT 1
+    ''', (tournament_id,)).fetchone()
+    cursor.execute('''
+        UPDATE tournaments SET status = 'finished', finished_at = CURRENT_TIMESTAMP, winner_id = ?
+        WHERE id = ? AND status = 'in_progress'
+    ''', (leader['player_id'] if leader else None, tournament_id))
+    return True
+
+
+async def start_round_robin_tournament(tournament_id: int, channel_id: str = None):
+    """Inicia um todos-contra-todos: gera todas as rodadas (Berger) de uma vez e libera a primeira."""
+    def _start():
+        conn = get_conn()
+        cursor = conn.cursor()
+        try:
+            with conn:
+                player_ids = _get_seeded_participants(cursor, tournament_id)
+                if len(player_ids) < 2:
+                    return False, "São necessários pelo menos 2 participantes para iniciar o torneio."
+
+                schedule = berger_schedule(player_ids)
+                cursor.executemany('''
+                    INSERT INTO tournament_matches (tournament_id, round_number, match_number, player1_id, player2_id, status)
+                    VALUES (?, ?, ?, ?, ?, 'waiting')
+                ''', [
+                    (tournament_id, round_num, match_num, white, black)
+                    for round_num, pairs in enumerate(schedule, 1)
+                    for match_num, (white, black) in enumerate((p for p in pairs if p[1] is not None), 1)
+                ])
+                first_round = [row['id'] for row in cursor.execute(
+                    "SELECT id FROM tournament_matches WHERE tournament_id = ? AND round_number = 1", (tournament_id,)
+                ).fetchall()]
+                _open_ready_bracket_matches(cursor, tournament_id, channel_id, first_round)
+
+                cursor.execute("UPDATE tournaments SET status = 'in_progress', started_at = CURRENT_TIMESTAMP WHERE id = ?", (tournament_id,))
+            return True, f"Torneio iniciado com sucesso! {len(schedule)} rodadas geradas."
+        except Exception as e:
+            logger.error(f"Erro ao iniciar todos-contra-todos: {e}", exc_info=True)
+            return False, f"Erro ao iniciar torneio: {e}"
+        finally:
+            conn.close()
+    return await enqueue_write(_start)
+
+
+async def start_arena_tournament(tournament_id: int, duration_minutes: int, channel_id: str = None):
+    """Inicia uma arena: define o horário de término e emparelha a fila inicial."""
+    def _start():
+        conn = get_conn()
+        cursor = conn.cursor()
+        try:
+            with conn:
+                count = cursor.execute(
+                    "SELECT COUNT(*) FROM tournament_participants WHERE tournament_id = ?", (tournament_id,)
+                ).fetchone()[0]
+                if count < 2:
+                    return False, "São necessários pelo menos 2 participantes para iniciar o torneio."
+
+                cursor.execute('''
+                    UPDATE tournaments SET status = 'in_progress', started_at = CURRENT_TIMESTAMP,
+                           ends_at = datetime('now', ?)
+                    WHERE id = ?
+                ''', (f"+{int(duration_minutes)} minutes", tournament_id))
+                opened = _pair_arena_waiting(cursor, tournament_id, channel_id)
+            return True, f"Arena iniciada com sucesso! {opened} partidas liberadas."
+        except Exception as e:
+            logger.error(f"Erro ao iniciar arena: {e}", exc_info=True)
+            return False, f"Erro ao iniciar arena: {e}"
+        finally:
+            conn.close()
+    return await enqueue_write(_start)
+
+
+async def finish_due_arena_tournaments():
+    """Finaliza as arenas que já passaram do horário e não têm partidas abertas. Retorna os IDs finalizados."""
+    def _finish():
+        conn = get_conn()
+        cursor = conn.cursor()
+        try:
+            with conn:
+                due = cursor.execute('''
+                    SELECT id FROM tournaments
+                    WHERE format = ? AND status = 'in_progress' AND ends_at <= CURRENT_TIMESTAMP
+                ''', (FORMAT_ARENA,)).fetchall()
+                return [row['id'] for row in due if _finish_if_no_open_matches(cursor, row['id'], FORMAT_ARENA)]
+        finally:
+            conn.close()
+    return await enqueue_write(_finish)
+
+
+async def record_tournament_match_result(match_id: int, winner_id: str = None):
+    """
+    Registra o resultado de uma partida do torneio (winner_id None = empate) e libera as próximas partidas.
+
+    Retorna {'next_match_id', 'opened', 'tournament_finished'}, ou None se a partida não existe,
+    já estava finalizada ou é um empate numa eliminatória.
+    """
+    def _record():
+        conn = get_conn()
+        cursor = conn.cursor()
+        try:
+            with conn:
+                return _finish_tournament_match(cursor, match_id, str(winner_id) if winner_id else None)
+        finally:
+            conn.close()
+    return await enqueue_write(_record)
+
+
+async def update_tournament_match_winner(tournament_id: int, round_num: int, match_num: int, winner_id: str):
+    """Atualiza o vencedor de uma partida do torneio, atribui o ponto e avança o vencedor no bracket."""
+    def _update():
+        conn = get_conn()
+        cursor = conn.cursor()
+        try:
+            with conn:
+                match = cursor.execute('''
+                    SELECT id FROM tournament_matches
+                    WHERE tournament_id = ? AND round_number = ? AND match_number = ?
+                ''', (tournament_id, round_num, match_num)).fetchone()
+                if match:
+                    return _finish_tournament_match(cursor, match['id'], str(winner_id))
+                return None
+        finally:
+            conn.close()
+    return await enqueue_write(_update)
+
+async def advance_tournament_round(tournament_id: int):
+    """Avança para a próxima rodada do torneio, mantendo estrutura de bracket."""
+    def _advance():
+        conn = get_conn()
+        cursor = conn.cursor()
+        try:
+            with conn:
+                # Brackets com árvore (next_match_id), todos-contra-todos e arena já avançam a cada resultado
+                has_tree = cursor.execute(
+                    "SELECT 1 FROM tournament_matches WHERE tournament_id = ? AND next_match_id IS NOT NULL LIMIT 1",
+                    (tournament_id,)
+                ).fetchone()
+                tournament = cursor.execute(
+                    "SELECT status, COALESCE(format, 'knockout') as format FROM tournaments WHERE id = ?", (tournament_id,)
+                ).fetchone()
+                if has_tree or (tournament and tournament['format'] != FORMAT_KNOCKOUT):
+                    if tournament and tournament['status'] == 'finished':
+                        return True, "Torneio finalizado!"
+                    return False, "As próximas partidas são liberadas automaticamente a cada resultado."
+
+                # Busca rodada atual
+                cursor.execute("SELECT MAX(round_number) as current_round FROM tournament_matches WHERE tournament_id = ?", (tournament_id,))
+                current_round = cursor.fetchone()['current_round'] or 0
+
+                # Verifica se todas as partidas da rodada foram finalizadas
+                cursor.execute("""
+                    SELECT COUNT(*) as total, COUNT(CASE WHEN status = 'finished' THEN 1 END) as finished
+                    FROM tournament_matches WHERE tournament_id = ? AND round_number = ?
+                """, (tournament_id, current_round))
+                progress = cursor.fetchone()
+                if progress['total'] != progress['finished']:
+                    return False, "Nem todas as partidas da rodada atual foram finalizadas."
+
+                # Busca vencedores da rodada atual ordenados por match_number para manter estrutura de bracket
+                winners = cursor.execute("""
+                    SELECT winner_id, match_number FROM tournament_matches
                     WHERE tournament_id = ? AND round_number = ? AND winner_id IS NOT NULL
                     ORDER BY match_number
                 """, (tournament_id, current_round)).fetchall()
@@ -1838,43 +2821,46 @@ async def advance_tournament_round(tournament_id: int):
             return True, f"Rodada {next_round} iniciada!"
         except Exception as e:
             return False, f"Erro ao avançar rodada: {str(e)}"
-    return await asyncio.to_thread(_advance)
+    return await enqueue_write(_advance)
+
+def _get_bracket_payload(cursor, tournament_id: int, since: int = None):
+    """Monta o JSON do bracket; com `since`, só as partidas alteradas depois dessa versão."""
+    # Info do torneio
+    cursor.execute("SELECT * FROM tournaments WHERE id = ?", (tournament_id,))
+    tournament = cursor.fetchone()
+    if not tournament:
+        return None
+
+    # Partidas com detalhes dos jogadores
+    cursor.execute("""
+        SELECT tm.*, 
+               p1.discord_username as p1_name, p1.avatar_hash as p1_avatar, p1.rating_rapid as p1_rating,
+               p2.discord_username as p2_name, p2.avatar_hash as p2_avatar, p2.rating_rapid as p2_rating,
+               c.game_url
+        FROM tournament_matches tm
+        LEFT JOIN players p1 ON tm.player1_id = p1.discord_id
+        LEFT JOIN players p2 ON tm.player2_id = p2.discord_id
+        LEFT JOIN challenges c ON tm.challenge_id = c.id
+        WHERE tm.tournament_id = ? AND COALESCE(tm.version, 0) > ?
+        ORDER BY tm.round_number, tm.match_number
+    """, (tournament_id, since if since is not None else -1))
+    matches = [dict(m) for m in cursor.fetchall()]
+
+    # Estrutura hierárquica para o frontend (versão estável em vez de timestamp, para permitir cache)
+    return {
+        "tournament": dict(tournament),
+        "matches": matches,
+        "version": tournament['bracket_version'] or 0
+    }
 
 async def get_tournament_bracket_data(tournament_id: int):
     """Retorna dados completos do bracket em formato JSON para integração com site/frontend."""
     def _get():
         conn = get_conn()
         cursor = conn.cursor()
-        
-        # Info do torneio
-        cursor.execute("SELECT * FROM tournaments WHERE id = ?", (tournament_id,))
-        tournament = cursor.fetchone()
-        if not tournament:
-            conn.close()
-            return None
-            
-        # Partidas com detalhes dos jogadores
-        cursor.execute("""
-            SELECT tm.*, 
-                   p1.discord_username as p1_name, p1.avatar_hash as p1_avatar, p1.rating_rapid as p1_rating,
-                   p2.discord_username as p2_name, p2.avatar_hash as p2_avatar, p2.rating_rapid as p2_rating,
-                   c.game_url
-            FROM tournament_matches tm
-            LEFT JOIN players p1 ON tm.player1_id = p1.discord_id
-            LEFT JOIN players p2 ON tm.player2_id = p2.discord_id
-            LEFT JOIN challenges c ON tm.challenge_id = c.id
-            WHERE tm.tournament_id = ?
-            ORDER BY tm.round_number, tm.match_number
-        """, (tournament_id,))
-        matches = [dict(m) for m in cursor.fetchall()]
+        data = _get_bracket_payload(cursor, tournament_id)
         conn.close()
-        
-        # Estrutura hierárquica para o frontend
-        return {
-            "tournament": dict(tournament),
-            "matches": matches,
-            "generated_at": datetime.datetime.utcnow().isoformat()
-        }
+        return data
     return await asyncio.to_thread(_get)
 
 async def force_tournament_match_winner(tournament_id: int, round_num: int, match_num: int, winner_id: str):
@@ -1885,7 +2871,7 @@ async def force_tournament_match_winner(tournament_id: int, round_num: int, matc
         try:
             # Verifica se a partida existe
             cursor.execute("""
-                SELECT id, player1_id, player2_id FROM tournament_matches 
+                SELECT id, player1_id, player2_id, status FROM tournament_matches 
                 WHERE tournament_id = ? AND round_number = ? AND match_number = ?
             """, (tournament_id, round_num, match_num))
             match = cursor.fetchone()
@@ -1896,19 +2882,22 @@ async def force_tournament_match_winner(tournament_id: int, round_num: int, matc
             if str(winner_id) not in [str(p1), str(p2)]:
                 return False, "O vencedor informado não faz parte desta partida."
 
-            # Atualiza a partida
-            cursor.execute("""
-                UPDATE tournament_matches 
-                SET winner_id = ?, status = 'finished', finished_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (winner_id, match['id']))
-            
             # Se houver desafio associado, finaliza também para evitar conflitos
             cursor.execute("""
                 UPDATE challenges 
                 SET status = 'finished', winner_id = ? 
                 WHERE tournament_id = ? AND (challenger_id = ? OR challenged_id = ?) AND status != 'finished'
             """, (winner_id, tournament_id, p1, p2))
+
+            # Registra o resultado e libera as próximas partidas (depois de encerrar os desafios antigos)
+            if match['status'] != 'finished':
+                _finish_tournament_match(cursor, match['id'], str(winner_id))
+            else:
+                # Correção de um resultado já registrado
+                error = _correct_tournament_match(cursor, match['id'], str(winner_id))
+                if error:
+                    conn.rollback()
+                    return False, error
             
             conn.commit()
             return True, "Vencedor definido com sucesso."
@@ -1916,51 +2905,7 @@ async def force_tournament_match_winner(tournament_id: int, round_num: int, matc
             return False, str(e)
         finally:
             conn.close()
-    return await asyncio.to_thread(_force)
-
-async def update_tournament_match_winner(tournament_id: int, round_num: int, match_num: int, winner_id: str):
-
-    """Atualiza o vencedor de uma partida do torneio e atribui pontos."""
-
-    def _update():
-
-        conn = get_conn()
-
-        cursor = conn.cursor()
-
-        try:
-
-            with conn:
-
-                # Atualiza o vencedor da partida
-
-                cursor.execute('''
-
-                    UPDATE tournament_matches SET winner_id = ?, status = 'finished', finished_at = CURRENT_TIMESTAMP
-
-                    WHERE tournament_id = ? AND round_number = ? AND match_number = ?
-
-                ''', (winner_id, tournament_id, round_num, match_num))
-
-
-
-                # Atribui 1 ponto ao vencedor
-
-                cursor.execute('''
-
-                    UPDATE tournament_participants SET points = points + 1.0
-
-                    WHERE tournament_id = ? AND player_id = ?
-
-                ''', (tournament_id, winner_id))
-
-        except Exception as e:
-
-            print(f"Erro ao atualizar vencedor: {e}")
-
-    await asyncio.to_thread(_update)
-
-
+    return await enqueue_write(_force)
 
 async def get_tournament_standings(tournament_id: int):
 
@@ -1982,7 +2927,7 @@ async def get_tournament_standings(tournament_id: int):
 
             WHERE tp.tournament_id = ?
 
-            ORDER BY tp.points DESC, tp.joined_at
+            ORDER BY tp.points DESC, tp.wins DESC, tp.joined_at
 
         """, (tournament_id,))
 
@@ -2021,18 +2966,15 @@ async def update_tournament_standings(tournament_id: int):
         cursor = conn.cursor()
         try:
             with conn:
+                # Todos-contra-todos/arena mantêm a classificação incrementalmente a cada resultado
+                tournament = cursor.execute(
+                    "SELECT COALESCE(format, 'knockout') as format FROM tournaments WHERE id = ?", (tournament_id,)
+                ).fetchone()
+                if tournament and tournament['format'] != FORMAT_KNOCKOUT:
+                    return
+
                 # Recalcula pontos baseado nas vitórias
-                cursor.execute("""
-                    UPDATE tournament_participants
-                    SET points = (
-                        SELECT COUNT(*)
-                        FROM tournament_matches tm
-                        WHERE tm.tournament_id = tournament_participants.tournament_id
-                        AND tm.winner_id = tournament_participants.player_id
-                        AND tm.status = 'finished'
-                    )
-                    WHERE tournament_id = ?
-                """, (tournament_id,))
+                _recount_knockout_points(cursor, tournament_id)
         finally:
             conn.close()
     await asyncio.to_thread(_update)
@@ -2061,6 +3003,38 @@ async def get_tournament_match_by_challenge(challenge_id: int):
 
 
 
+async def get_pending_matches(kind: str = None, tournament_id: int = None, limit: int = None):
+    """
+    Partidas ainda não jogadas (view pending_matches), das mais antigas para as mais novas.
+
+    `kind` filtra por 'bracket', 'swiss' ou 'casual'. Cada linha já traz nomes dos jogadores,
+    game_url, controle de tempo e idade em segundos (age_seconds).
+    """
+    def _get():
+        conn = get_conn()
+        cursor = conn.cursor()
+        clauses, params = [], []
+        if kind:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if tournament_id is not None:
+            clauses.append("tournament_id = ?")
+            params.append(tournament_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = f"""
+            SELECT *, CAST(strftime('%s', 'now') - strftime('%s', created_at) AS INTEGER) AS age_seconds
+            FROM pending_matches {where}
+            ORDER BY created_at IS NULL, created_at, round_number, match_number
+        """
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        rows = cursor.execute(query, params).fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+    return await asyncio.to_thread(_get)
+
+
 async def check_round_completion(tournament_id: int, round_num: int):
 
     """Verifica se todas as partidas de uma rodada foram finalizadas."""
@@ -2155,20 +3129,24 @@ async def finish_swiss_pairing(tournament_id: int, pairing_id: int, winner_id=No
                 SET status = 'finished', winner_id = ?, challenge_id = ?, finished_at = CURRENT_TIMESTAMP
                 WHERE id = ? AND tournament_id = ?
             ''', (winner_id, challenge_id, pairing_id, tournament_id))
+            # Pairing resolvido: os prazos pendentes deixam de valer
+            cursor.execute('''
+                UPDATE swiss_deadlines SET status = 'cancelled'
+                WHERE pairing_id = ? AND status = 'pending'
+            ''', (pairing_id,))
 
             conn.commit()
+            conn.close()
 
             swiss = SwissTournament(tournament_id)
             swiss.update_standings()
             swiss.close()
-
-            conn.close()
             return True
         except Exception as e:
             logger.error(f"Erro ao finalizar pairing Swiss: {e}")
             return False
 
-    return await asyncio.to_thread(_finish)
+    return await enqueue_ordered_write(swiss_write_key(tournament_id), _finish)
 
 async def start_swiss_tournament(tournament_id: int):
     """Inicia um torneio Swiss."""
@@ -2190,21 +3168,55 @@ async def start_swiss_tournament(tournament_id: int):
             return False, f"Erro ao iniciar torneio: {str(e)}"
         finally:
             conn.close()
-    return await asyncio.to_thread(_start)
+    return await enqueue_ordered_write(swiss_write_key(tournament_id), _start)
 
 async def generate_and_save_swiss_round(tournament_id: int, round_number: int):
-    """Gera e salva uma rodada do torneio Swiss."""
+    """Gera e salva uma rodada do torneio Swiss.
+
+    O cálculo dos pairings (somente leitura) roda numa thread; a gravação passa pelo writer
+    central. Ambos ficam sob o lock do torneio, então rodadas de torneios diferentes são
+    geradas em paralelo enquanto as escritas de um mesmo torneio seguem estritamente em ordem.
+    """
+    from swiss_tournament import SwissTournament
+
     def _generate():
+        swiss = SwissTournament(tournament_id)
         try:
-            from swiss_tournament import SwissTournament
-
-            swiss = SwissTournament(tournament_id)
             participants = swiss.get_participants()
             logger.info(f"Tournament {tournament_id} has {len(participants)} participants")
             pairings = swiss.generate_pairings(round_number)
             logger.info(f"Generated {len(pairings)} pairings for round {round_number}")
+            return participants, pairings
+        finally:
             swiss.close()
 
+    def _save(pairings):
+        conn = get_conn()
+        try:
+            cursor = conn.cursor()
+            # A rodada anterior fecha o período de rating antes dos novos pairings
+            _apply_pending_swiss_ratings(cursor, tournament_id)
+            # Bye: o jogador 1 vence automaticamente
+            cursor.executemany('''
+                INSERT INTO swiss_pairings (tournament_id, round_number, player1_id, player2_id, status, winner_id, finished_at)
+                VALUES (?, ?, ?, NULL, 'finished', ?, CURRENT_TIMESTAMP)
+            ''', [(tournament_id, round_number, p1, p1) for p1, p2 in pairings if p2 is None])
+            cursor.executemany('''
+                INSERT INTO swiss_pairings (tournament_id, round_number, player1_id, player2_id, status)
+                VALUES (?, ?, ?, ?, 'pending')
+            ''', [(tournament_id, round_number, p1, p2) for p1, p2 in pairings if p2 is not None])
+            conn.commit()
+        finally:
+            conn.close()
+
+        swiss = SwissTournament(tournament_id)
+        swiss.update_standings()
+        swiss.close()
+
+    try:
+        async with ordered_write_lock(swiss_write_key(tournament_id)):
+            participants, pairings = await asyncio.to_thread(_generate)
+
             if not participants:
                 return False, "Nenhum participante encontrado no torneio"
 
@@ -2212,35 +3224,10 @@ async def generate_and_save_swiss_round(tournament_id: int, round_number: int):
                 logger.info(f"Nenhum pairing possível na rodada {round_number}. Torneio finalizando.")
                 return False, f"Nenhum pairing possível - nenhum jogador encontrou oponente que não tenha enfrentado"
 
-            conn = get_conn()
-            cursor = conn.cursor()
-            try:
-                for player1_id, player2_id in pairings:
-                    if player2_id is None:
-                        cursor.execute('''
-                            INSERT INTO swiss_pairings (tournament_id, round_number, player1_id, player2_id, status, winner_id, finished_at)
-                            VALUES (?, ?, ?, ?, 'finished', ?, CURRENT_TIMESTAMP)
-                        ''', (tournament_id, round_number, player1_id, player2_id, player1_id))
-                    else:
-                        cursor.execute('''
-                            INSERT INTO swiss_pairings (tournament_id, round_number, player1_id, player2_id, status)
-                            VALUES (?, ?, ?, ?, 'pending')
-                        ''', (tournament_id, round_number, player1_id, player2_id))
-
-                conn.commit()
-                conn.close()
-                
-                swiss = SwissTournament(tournament_id)
-                swiss.update_standings()
-                swiss.close()
-                
-                return True, pairings
-            finally:
-                pass
-        except Exception as e:
-            return False, str(e)
-
-    return await asyncio.to_thread(_generate)
+            await enqueue_write(_save, pairings)
+            return True, pairings
+    except Exception as e:
+        return False, str(e)
 
 async def get_swiss_pairings_for_round(tournament_id: int, round_number: int):
     """Busca os pairings de uma rodada específica do torneio Swiss."""
@@ -2270,7 +3257,7 @@ async def update_swiss_pairing_game_url(pairing_id: int, game_url: str):
         ''', (game_url, pairing_id))
         conn.commit()
         conn.close()
-    return await enqueue_write(_update)
+    return await enqueue_swiss_pairing_write([pairing_id], _update)
 
 
 async def get_lichess_username(discord_id: str) -> str:
@@ -2290,12 +3277,12 @@ async def get_swiss_standings(tournament_id: int):
     def _get():
         conn = get_conn()
         cursor = conn.cursor()
-        cursor.execute('''
+        cursor.execute(f'''
             SELECT sp.*, p.discord_username, p.lichess_username
             FROM swiss_participants sp
             JOIN players p ON sp.player_id = p.discord_id
             WHERE sp.tournament_id = ?
-            ORDER BY sp.points DESC, sp.tiebreak_score DESC
+            ORDER BY {STANDINGS_ORDER_SQL}
         ''', (tournament_id,))
         standings = cursor.fetchall()
         conn.close()
@@ -2327,7 +3314,7 @@ async def update_swiss_pairing_challenge(pairing_id: int, challenge_id: int):
         conn.commit()
         conn.close()
 
-    await enqueue_write(_update)
+    await enqueue_swiss_pairing_write([pairing_id], _update)
 
 async def update_swiss_pairing_result(pairing_id: int, winner_id: str, loser_id: str, result: str):
     """Atualiza o resultado de um pairing suíço."""
@@ -2342,7 +3329,7 @@ async def update_swiss_pairing_result(pairing_id: int, winner_id: str, loser_id:
         logger.info(f"✅ Pairing {pairing_id} marcado como finished. Winner: {winner_id}, Result: {result}")
         conn.close()
 
-    await enqueue_write(_update)
+    await enqueue_swiss_pairing_write([pairing_id], _update)
 
 async def update_swiss_standings(tournament_id: int, player1_id: str, player2_id: str, result: str, reason: str = 'unknown'):
     """Atualiza a classificação do torneio suíço com o resultado de uma partida.
@@ -2387,53 +3374,73 @@ async def update_swiss_standings(tournament_id: int, player1_id: str, player2_id
         finally:
             conn.close()
     
-    await enqueue_write(_update)
+    await enqueue_ordered_write(swiss_write_key(tournament_id), _update)
 
 async def apply_draw_ratings(player1_id: str, player2_id: str, mode: str):
-    """Aplica mudanças de rating ELO para empate entre dois jogadores."""
-    def _apply():
-        conn = get_conn()
-        cursor = conn.cursor()
-        try:
-            cursor.execute(f"SELECT rating_{mode} FROM players WHERE discord_id = ?", (player1_id,))
-            player1_rating_row = cursor.fetchone()
-            cursor.execute(f"SELECT rating_{mode} FROM players WHERE discord_id = ?", (player2_id,))
-            player2_rating_row = cursor.fetchone()
-
-            if not player1_rating_row or not player2_rating_row:
-                return None
-
-            player1_rating = player1_rating_row[0] or 1200
-            player2_rating = player2_rating_row[0] or 1200
+    """Aplica mudanças de rating para empate entre dois jogadores."""
+    changes = await apply_rating_period([(player1_id, player2_id, 0.5)], mode)
+    if not changes:
+        return None
+    return {
+        'player1': changes[str(player1_id)],
+        'player2': changes[str(player2_id)]
+    }
 
-            player1_expected = 1 / (1 + 10 ** ((player2_rating - player1_rating) / 400))
-            player2_expected = 1 / (1 + 10 ** ((player1_rating - player2_rating) / 400))
 
-            k_factor = 32
+async def queue_swiss_pairing_rating(pairing_id: int):
+    """Marca um pairing suíço jogado para entrar no período de rating da rodada."""
+    def _mark():
+        conn = get_conn()
+        try:
+            conn.execute("UPDATE swiss_pairings SET rating_pending = 1 WHERE id = ?", (pairing_id,))
+            conn.commit()
+        finally:
+            conn.close()
+    await enqueue_swiss_pairing_write([pairing_id], _mark)
 
-            player1_change = round(k_factor * (0.5 - player1_expected))
-            player2_change = round(k_factor * (0.5 - player2_expected))
 
-            new_player1_rating = player1_rating + player1_change
-            new_player2_rating = player2_rating + player2_change
+def _apply_pending_swiss_ratings(cursor, tournament_id: int):
+    """
+    Aplica como um único período de rating todas as partidas suíças jogadas e ainda não avaliadas.
 
-            cursor.execute(f"UPDATE players SET rating_{mode} = ? WHERE discord_id = ?", (new_player1_rating, player1_id))
-            cursor.execute(f"UPDATE players SET rating_{mode} = ? WHERE discord_id = ?", (new_player2_rating, player2_id))
-
-            conn.commit()
-
-            return {
-                'player1': {'old': player1_rating, 'new': new_player1_rating, 'change': player1_change},
-                'player2': {'old': player2_rating, 'new': new_player2_rating, 'change': player2_change}
-            }
-        except Exception as e:
-            logger.error(f"Erro ao aplicar ratings de empate: {e}")
-            conn.rollback()
-            return None
-        finally:
-            conn.close()
-
-    return await enqueue_write(_apply)
+    Retorna as mudanças, ou None se o período não pôde ser aplicado (aí nada é marcado como avaliado).
+    """
+    tournament = cursor.execute("SELECT time_control FROM swiss_tournaments WHERE id = ?", (tournament_id,)).fetchone()
+    if not tournament:
+        return None
+    rows = cursor.execute("""
+        SELECT id, player1_id, player2_id, winner_id, game_url FROM swiss_pairings
+        WHERE tournament_id = ? AND rating_pending = 1 AND status = 'finished' AND player2_id IS NOT NULL
+    """, (tournament_id,)).fetchall()
+    if not rows:
+        return {}
+
+    games = [
+        (row['player1_id'], row['player2_id'], 0.5 if not row['winner_id'] else (1.0 if row['winner_id'] == row['player1_id'] else 0.0))
+        for row in rows
+    ]
+    changes = _apply_rating_period(cursor, games, get_mode_from_time_control(tournament['time_control']))
+    if changes is None:
+        # Jogador ausente ou modo inválido: os pairings continuam pendentes para a próxima tentativa
+        logger.error(f"Torneio suíço {tournament_id}: período de rating não aplicado, {len(rows)} partida(s) continuam pendentes")
+        return None
+    cursor.executemany("UPDATE swiss_pairings SET rating_pending = 0 WHERE id = ?", [(row['id'],) for row in rows])
+    # Cada jogador tem uma partida por rodada: o antes/depois do período é o da partida no histórico
+    # (o registro pode ter os jogadores na ordem inversa à do pairing)
+    history = []
+    for row in rows:
+        if not row['game_url'] or str(row['player1_id']) not in changes or str(row['player2_id']) not in changes:
+            continue
+        for p1, p2 in ((row['player1_id'], row['player2_id']), (row['player2_id'], row['player1_id'])):
+            c1, c2 = changes[str(p1)], changes[str(p2)]
+            history.append((c1['old'], c1['new'], c2['old'], c2['new'], row['game_url'], p1, p2))
+    cursor.executemany("""
+        UPDATE game_history
+        SET player1_rating_before = ?, player1_rating_after = ?, player2_rating_before = ?, player2_rating_after = ?
+        WHERE game_url = ? AND player1_id = ? AND player2_id = ?
+    """, history)
+    logger.info(f"📈 Torneio suíço {tournament_id}: {len(rows)} partida(s) avaliadas num único período de rating")
+    return changes
 
 async def finish_swiss_tournament(tournament_id: int):
     """Marca um torneio suíço como finalizado."""
@@ -2441,6 +3448,8 @@ async def finish_swiss_tournament(tournament_id: int):
         conn = get_conn()
         cursor = conn.cursor()
         try:
+            # Última rodada: aplica o período de rating pendente
+            _apply_pending_swiss_ratings(cursor, tournament_id)
             cursor.execute(
                 "UPDATE swiss_tournaments SET status = 'finished', finished_at = CURRENT_TIMESTAMP WHERE id = ?",
                 (tournament_id,)
@@ -2455,32 +3464,117 @@ async def finish_swiss_tournament(tournament_id: int):
         finally:
             conn.close()
     
-    return await asyncio.to_thread(_finish)
+    return await enqueue_ordered_write(swiss_write_key(tournament_id), _finish)
 
 # ==============================================================================
 # --- FUNÇÕES PARA HISTÓRICO DE PARTIDAS E ESTATÍSTICAS ---
 # ==============================================================================
 
+OPPOSITE_COLOR = {'white': 'black', 'black': 'white'}
+
+def _upsert_player_stats_agg(cursor, player1_id: str, player2_id: str, winner_id: str, result: str, mode: str,
+                             player1_color: str = None, opening_eco: str = None, opening_name: str = None, plies: int = None):
+    """Soma a partida nos agregados dos dois jogadores (um upsert por jogador, num único executemany)."""
+    if not player1_id or not player2_id or player1_id == player2_id or not mode:
+        return
+    rows = []
+    for player_id, color in ((player1_id, player1_color), (player2_id, OPPOSITE_COLOR.get(player1_color))):
+        outcome = _player_outcome(player_id, winner_id, result)
+        if outcome is None:
+            continue
+        rows.append((
+            player_id, mode, color or '', opening_eco or '', opening_name,
+            int(outcome == 'win'), int(outcome == 'draw'), int(outcome == 'loss'),
+            plies or 0, int(plies is not None)
+        ))
+    cursor.executemany('''
+        INSERT INTO player_stats_agg (player_id, mode, color, eco, opening_name, games, wins, draws, losses,
+                                      total_plies, plies_games)
+        VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?)
+        ON CONFLICT(player_id, mode, color, eco) DO UPDATE SET
+            opening_name = COALESCE(excluded.opening_name, opening_name),
+            games = games + 1,
+            wins = wins + excluded.wins,
+            draws = draws + excluded.draws,
+            losses = losses + excluded.losses,
+            total_plies = total_plies + excluded.total_plies,
+            plies_games = plies_games + excluded.plies_games
+    ''', rows)
+
 async def save_game_history(player1_id: str, player2_id: str, player1_name: str, player2_name: str,
                             winner_id: str, result: str, mode: str, time_control: str = None,
                             game_url: str = None, p1_rating_before: int = None, p2_rating_before: int = None,
-                            p1_rating_after: int = None, p2_rating_after: int = None):
-    """Salva um registro de partida no histórico de jogos."""
+                            p1_rating_after: int = None, p2_rating_after: int = None, rated: bool = None,
+                            player1_color: str = None, opening_eco: str = None, opening_name: str = None,
+                            plies: int = None):
+    """Salva um registro de partida no histórico de jogos (com confronto direto e agregados na mesma transação)."""
     def _save():
         conn = get_conn()
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO game_history (player1_id, player2_id, player1_name, player2_name, winner_id, result,
                                       mode, time_control, game_url, player1_rating_before, player2_rating_before,
-                                      player1_rating_after, player2_rating_after)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                      player1_rating_after, player2_rating_after, rated,
+                                      player1_color, opening_eco, opening_name, plies)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (player1_id, player2_id, player1_name, player2_name, winner_id, result, mode,
-              time_control, game_url, p1_rating_before, p2_rating_before, p1_rating_after, p2_rating_after))
+              time_control, game_url, p1_rating_before, p2_rating_before, p1_rating_after, p2_rating_after,
+              None if rated is None else int(bool(rated)), player1_color, opening_eco, opening_name, plies))
+        # Confronto direto e agregados na mesma transação da partida
+        _upsert_head_to_head(cursor, player1_id, player2_id, winner_id, result)
+        _upsert_player_stats_agg(cursor, player1_id, player2_id, winner_id, result, mode,
+                                 player1_color, opening_eco, opening_name, plies)
         conn.commit()
         conn.close()
     
     await enqueue_write(_save)
 
+async def get_player_stats_agg(discord_id: str, top_openings: int = 5):
+    """
+    Estatísticas agregadas de um jogador numa consulta (faixa da chave primária de player_stats_agg).
+
+    Retorna {'games', 'wins', 'draws', 'losses', 'avg_plies', 'by_mode': {modo: totais},
+    'by_color': {'white'|'black': totais}, 'openings': [totais por ECO, mais jogadas primeiro]}.
+    """
+    def _fetch():
+        conn = get_conn()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT mode, color, eco, opening_name, games, wins, draws, losses, total_plies, plies_games
+            FROM player_stats_agg WHERE player_id = ?
+        ''', (discord_id,))
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+    rows = await asyncio.to_thread(_fetch)
+
+    def empty():
+        return {'games': 0, 'wins': 0, 'draws': 0, 'losses': 0}
+
+    def add(target, row):
+        for key in ('games', 'wins', 'draws', 'losses'):
+            target[key] += row[key]
+
+    summary = dict(empty(), by_mode={}, by_color={}, openings=[])
+    openings = {}
+    total_plies = plies_games = 0
+    for row in rows:
+        add(summary, row)
+        add(summary['by_mode'].setdefault(row['mode'], empty()), row)
+        if row['color']:
+            add(summary['by_color'].setdefault(row['color'], empty()), row)
+        if row['eco']:
+            opening = openings.setdefault(row['eco'], dict(empty(), eco=row['eco'], name=row['opening_name']))
+            opening['name'] = opening['name'] or row['opening_name']
+            add(opening, row)
+        total_plies += row['total_plies']
+        plies_games += row['plies_games']
+
+    summary['avg_plies'] = total_plies / plies_games if plies_games else None
+    summary['openings'] = sorted(openings.values(), key=lambda o: (-o['games'], o['eco']))[:top_openings]
+    return summary
+
 async def get_player_game_history(discord_id: str, limit: int = 10):
     """Retorna as últimas partidas de um jogador."""
     def _fetch():
@@ -2498,37 +3592,235 @@ async def get_player_game_history(discord_id: str, limit: int = 10):
     
     return await asyncio.to_thread(_fetch)
 
+async def get_player_game_page(discord_id: str, limit: int = 5, before: tuple = None):
+    """
+    Uma página do histórico de um jogador, da mais recente para a mais antiga (keyset em played_at, id).
+
+    `before`: (played_at, id) da última partida da página anterior; None = primeira página.
+    Cada partida já vem do ponto de vista do jogador: outcome ('win', 'loss', 'draw'), opponent_id,
+    opponent_name, rating_before e rating_after. Cada lado lê só `limit` entradas do seu índice.
+    """
+    # Sem cursor não há filtro; com cursor a condição vira um seek no índice (played_at, id)
+    keyset = "AND (played_at, id) < (?, ?)" if before else ""
+    side_params = (discord_id, *before, limit) if before else (discord_id, limit)
+
+    def _fetch():
+        conn = get_conn()
+        cursor = conn.cursor()
+        side_query = '''
+            SELECT * FROM (
+                SELECT id, played_at, mode, result, winner_id, game_url,
+                       {opponent}_id AS opponent_id, {opponent}_name AS stored_opponent_name,
+                       {me}_rating_before AS rating_before, {me}_rating_after AS rating_after
+                FROM game_history
+                WHERE {me}_id = ? {extra} {keyset}
+                ORDER BY played_at DESC, id DESC
+                LIMIT ?
+            )
+        '''
+        cursor.execute(f'''
+            SELECT g.*, COALESCE(p.discord_username, g.stored_opponent_name) AS opponent_name
+            FROM (
+                {side_query.format(me='player1', opponent='player2', extra='', keyset=keyset)}
+                UNION ALL
+                {side_query.format(me='player2', opponent='player1', extra='AND player1_id <> player2_id', keyset=keyset)}
+            ) g
+            LEFT JOIN players p ON p.discord_id = g.opponent_id
+            ORDER BY g.played_at DESC, g.id DESC
+            LIMIT ?
+        ''', (*side_params, *side_params, limit))
+        rows = cursor.fetchall()
+        conn.close()
+
+        games = []
+        for row in rows:
+            game = dict(row)
+            del game['stored_opponent_name']
+            if game['winner_id']:
+                game['outcome'] = 'win' if game['winner_id'] == discord_id else 'loss'
+            else:
+                game['outcome'] = 'draw' if game['result'] == 'draw' else game['result']
+            games.append(game)
+        return games
+
+    return await asyncio.to_thread(_fetch)
+
+async def get_opening_stats(player_id: str = None, limit: int = 10):
+    """
+    Tabela de aberturas (opening_stats) do servidor ou de um jogador, mais jogadas primeiro.
+
+    Servidor: eco, opening_name, games, white_wins, draws, black_wins, avg_plies.
+    Jogador: eco, opening_name, games, wins, draws, losses, white_games, black_games, avg_plies.
+    """
+    def _fetch():
+        conn = get_conn()
+        cursor = conn.cursor()
+        if player_id is None:
+            cursor.execute('''
+                SELECT eco, opening_name, games, white_wins, draws, black_wins,
+                       CAST(total_plies AS REAL) / games AS avg_plies
+                FROM opening_stats
+                WHERE player_id = '' AND color = ''
+                ORDER BY games DESC, eco
+                LIMIT ?
+            ''', (limit,))
+        else:
+            cursor.execute('''
+                SELECT eco, MAX(opening_name) AS opening_name, SUM(games) AS games,
+                       SUM(CASE color WHEN 'white' THEN white_wins ELSE black_wins END) AS wins,
+                       SUM(draws) AS draws,
+                       SUM(CASE color WHEN 'white' THEN black_wins ELSE white_wins END) AS losses,
+                       SUM(CASE color WHEN 'white' THEN games ELSE 0 END) AS white_games,
+                       SUM(CASE color WHEN 'black' THEN games ELSE 0 END) AS black_games,
+                       CAST(SUM(total_plies) AS REAL) / SUM(games) AS avg_plies
+                FROM opening_stats
+                WHERE player_id = ?
+                GROUP BY eco
+                ORDER BY games DESC, eco
+                LIMIT ?
+            ''', (player_id, limit))
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    return await asyncio.to_thread(_fetch)
+
+async def get_position_evals(zobrist_keys, min_depth: int = 0) -> dict:
+    """Avaliações salvas com profundidade >= min_depth: {zobrist: {'depth', 'cp', 'mate', 'best_move'}}."""
+    keys = list(dict.fromkeys(zobrist_keys))
+    if not keys:
+        return {}
+
+    def _fetch():
+        conn = get_conn()
+        try:
+            found = {}
+            # Lotes abaixo do limite de parâmetros do SQLite
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = conn.execute(f'''
+                    SELECT zobrist, depth, cp, mate, best_move FROM position_evals
+                    WHERE zobrist IN ({", ".join("?" * len(chunk))}) AND depth >= ?
+                ''', (*chunk, min_depth)).fetchall()
+                found.update({row['zobrist']: {'depth': row['depth'], 'cp': row['cp'], 'mate': row['mate'], 'best_move': row['best_move']}
+                              for row in rows})
+            return found
+        finally:
+            conn.close()
+
+    return await asyncio.to_thread(_fetch)
+
+async def save_position_evals(evals: dict, source: str = None):
+    """Grava {zobrist: avaliação}; uma linha existente só é trocada por uma avaliação mais profunda."""
+    if not evals:
+        return
+
+    def _save():
+        conn = get_conn()
+        try:
+            conn.executemany('''
+                INSERT INTO position_evals (zobrist, depth, cp, mate, best_move, source)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(zobrist) DO UPDATE SET
+                    depth = excluded.depth, cp = excluded.cp, mate = excluded.mate,
+                    best_move = excluded.best_move, source = excluded.source,
+                    updated_at = excluded.updated_at
+                WHERE excluded.depth > position_evals.depth
+            ''', [(key, entry['depth'], entry.get('cp'), entry.get('mate'), entry.get('best_move'), source)
+                  for key, entry in evals.items()])
+            conn.commit()
+        finally:
+            conn.close()
+
+    await enqueue_write(_save)
+
 async def save_rating_snapshot(discord_id: str, mode: str, rating: int):
-    """Salva um snapshot do rating para histórico de evolução."""
+    """Salva um snapshot do rating para histórico de evolução (as partidas já gravam o seu automaticamente)."""
+    if mode not in RATING_MODE_CODES:
+        logger.warning(f"Modo de rating inválido para snapshot: {mode}")
+        return
+
     def _save():
         conn = get_conn()
         cursor = conn.cursor()
         cursor.execute('''
             INSERT INTO rating_history (player_id, mode, rating)
             VALUES (?, ?, ?)
-        ''', (discord_id, mode, rating))
+        ''', (discord_id, RATING_MODE_CODES[mode], rating))
         conn.commit()
         conn.close()
     
     await enqueue_write(_save)
 
-async def get_rating_history(discord_id: str, mode: str, limit: int = 30):
-    """Retorna o histórico de ratings de um jogador para um modo específico."""
+async def get_rating_history(discord_id: str, mode: str, limit: int = 30, since: int = None):
+    """
+    Retorna os últimos `limit` pontos do histórico de ratings (ordem cronológica).
+
+    `since` (epoch) limita aos pontos a partir dessa data. recorded_at vem em epoch (segundos).
+    """
+    if mode not in RATING_MODE_CODES:
+        return []
+
     def _fetch():
         conn = get_conn()
         cursor = conn.cursor()
         cursor.execute('''
-            SELECT * FROM rating_history
-            WHERE player_id = ? AND mode = ?
-            ORDER BY recorded_at ASC
-            LIMIT ?
-        ''', (discord_id, mode, limit))
+            SELECT id, rating, recorded_at FROM (
+                SELECT id, rating, recorded_at FROM rating_history
+                WHERE player_id = ? AND mode = ? AND recorded_at >= ?
+                ORDER BY recorded_at DESC, id DESC
+                LIMIT ?
+            ) ORDER BY recorded_at ASC, id ASC
+        ''', (discord_id, RATING_MODE_CODES[mode], since or 0, limit))
         history = cursor.fetchall()
         conn.close()
-        return [dict(record) for record in history]
+        return [dict(record, player_id=discord_id, mode=mode) for record in history]
     
     return await asyncio.to_thread(_fetch)
 
+async def get_peak_rating(discord_id: str, mode: str):
+    """Maior rating já registrado no modo e quando foi atingido. Retorna dict (rating, recorded_at) ou None."""
+    if mode not in RATING_MODE_CODES:
+        return None
+
+    def _fetch():
+        conn = get_conn()
+        row = conn.execute('''
+            SELECT rating, recorded_at FROM rating_history
+            WHERE player_id = ? AND mode = ?
+            ORDER BY rating DESC, recorded_at ASC
+            LIMIT 1
+        ''', (discord_id, RATING_MODE_CODES[mode])).fetchone()
+        conn.close()
+        return dict(row) if row else None
+
+    return await asyncio.to_thread(_fetch)
+
+async def downsample_rating_history(older_than_days: int = 90):
+    """
+    Compacta o histórico antigo: antes do corte, mantém só o último ponto de cada jogador/modo por dia.
+    Retorna quantos pontos foram removidos.
+    """
+    def _downsample():
+        conn = get_conn()
+        try:
+            cursor = conn.cursor()
+            cutoff = int(datetime.datetime.now(datetime.timezone.utc).timestamp()) - older_than_days * 86400
+            cursor.execute('''
+                DELETE FROM rating_history
+                WHERE recorded_at < ? AND id NOT IN (
+                    SELECT MAX(id) FROM rating_history
+                    WHERE recorded_at < ?
+                    GROUP BY player_id, mode, recorded_at / 86400
+                )
+            ''', (cutoff, cutoff))
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    return await enqueue_write(_downsample)
+
 async def unlock_achievement(discord_id: str, achievement_type: str, achievement_name: str, description: str = None):
     """Desbloqueia um achievement para um jogador."""
     def _unlock():
@@ -2538,6 +3830,10 @@ async def unlock_achievement(discord_id: str, achievement_type: str, achievement
             INSERT OR IGNORE INTO achievements (player_id, achievement_type, achievement_name, description)
             VALUES (?, ?, ?, ?)
         ''', (discord_id, achievement_type, achievement_name, description))
+        cursor.execute(
+            "UPDATE players SET achievements_mask = COALESCE(achievements_mask, 0) | ? WHERE discord_id = ?",
+            (ACHIEVEMENT_BITS.get(achievement_type, 0), discord_id)
+        )
         conn.commit()
         conn.close()
     
@@ -2560,235 +3856,363 @@ async def get_player_achievements(discord_id: str):
     
     return await asyncio.to_thread(_fetch)
 
+def _upsert_head_to_head(cursor, player1_id: str, player2_id: str, winner_id: str, result: str):
+    """Soma uma partida ao confronto direto (um único upsert; o par é gravado em ordem)."""
+    if not player1_id or not player2_id or player1_id == player2_id:
+        return
+    low, high = min(player1_id, player2_id), max(player1_id, player2_id)
+    if winner_id == low:
+        counts = (1, 0, 0)
+    elif winner_id == high:
+        counts = (0, 1, 0)
+    elif result == 'draw' and not winner_id:
+        counts = (0, 0, 1)
+    else:
+        return
+    cursor.execute('''
+        INSERT INTO head_to_head (player1_id, player2_id, player1_wins, player2_wins, draws, last_game_at)
+        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(player1_id, player2_id) DO UPDATE SET
+            player1_wins = player1_wins + excluded.player1_wins,
+            player2_wins = player2_wins + excluded.player2_wins,
+            draws = draws + excluded.draws,
+            last_game_at = excluded.last_game_at
+    ''', (low, high, *counts))
+
 async def update_head_to_head(player1_id: str, player2_id: str, result: str):
-    """Atualiza o record head-to-head entre dois jogadores. result: 'win', 'loss' ou 'draw'."""
+    """Atualiza o record head-to-head entre dois jogadores. result: 'win', 'loss' ou 'draw' (do ponto de vista do player1).
+
+    Partidas gravadas com save_game_history já atualizam o confronto direto.
+    """
+    winner_id = {'win': player1_id, 'loss': player2_id}.get(result)
+
     def _update():
         conn = get_conn()
-        cursor = conn.cursor()
-        
-        # Garantir que player1_id < player2_id para manter apenas um registro
-        if player1_id > player2_id:
-            player1_id, player2_id = player2_id, player1_id
-            if result == 'win':
-                result = 'loss'
-            elif result == 'loss':
-                result = 'win'
-        
-        cursor.execute('''
-            SELECT * FROM head_to_head
-            WHERE player1_id = ? AND player2_id = ?
-        ''', (player1_id, player2_id))
-        
-        record = cursor.fetchone()
-        
-        if record:
-            if result == 'win':
-                cursor.execute('''
-                    UPDATE head_to_head
-                    SET player1_wins = player1_wins + 1, last_game_at = CURRENT_TIMESTAMP
-                    WHERE player1_id = ? AND player2_id = ?
-                ''', (player1_id, player2_id))
-            elif result == 'loss':
-                cursor.execute('''
-                    UPDATE head_to_head
-                    SET player2_wins = player2_wins + 1, last_game_at = CURRENT_TIMESTAMP
-                    WHERE player1_id = ? AND player2_id = ?
-                ''', (player1_id, player2_id))
-            elif result == 'draw':
-                cursor.execute('''
-                    UPDATE head_to_head
-                    SET draws = draws + 1, last_game_at = CURRENT_TIMESTAMP
-                    WHERE player1_id = ? AND player2_id = ?
-                ''', (player1_id, player2_id))
-        else:
-            if result == 'win':
-                cursor.execute('''
-                    INSERT INTO head_to_head (player1_id, player2_id, player1_wins, player2_wins, draws)
-                    VALUES (?, ?, 1, 0, 0)
-                ''', (player1_id, player2_id))
-            elif result == 'loss':
-                cursor.execute('''
-                    INSERT INTO head_to_head (player1_id, player2_id, player1_wins, player2_wins, draws)
-                    VALUES (?, ?, 0, 1, 0)
-                ''', (player1_id, player2_id))
-            elif result == 'draw':
-                cursor.execute('''
-                    INSERT INTO head_to_head (player1_id, player2_id, player1_wins, player2_wins, draws)
-                    VALUES (?, ?, 0, 0, 1)
-                ''', (player1_id, player2_id))
-        
-        conn.commit()
-        conn.close()
-    
+        try:
+            _upsert_head_to_head(conn.cursor(), player1_id, player2_id, winner_id, result)
+            conn.commit()
+        finally:
+            conn.close()
+
     await enqueue_write(_update)
 
 async def get_head_to_head(player1_id: str, player2_id: str):
     """Retorna o record head-to-head entre dois jogadores."""
+    # Garantir que player1_id < player2_id para manter apenas um registro
+    low, high = min(player1_id, player2_id), max(player1_id, player2_id)
+
     def _fetch():
         conn = get_conn()
         cursor = conn.cursor()
-        
-        # Garantir que player1_id < player2_id para manter apenas um registro
-        if player1_id > player2_id:
-            player1_id, player2_id = player2_id, player1_id
-        
         cursor.execute('''
             SELECT * FROM head_to_head
             WHERE player1_id = ? AND player2_id = ?
-        ''', (player1_id, player2_id))
-        
+        ''', (low, high))
         record = cursor.fetchone()
         conn.close()
         return dict(record) if record else None
-    
+
+    return await asyncio.to_thread(_fetch)
+
+async def get_rivalries(discord_id: str, limit: int = None):
+    """
+    Tabela de confrontos de um jogador contra todos os adversários, numa consulta.
+
+    Cada linha traz opponent_id, opponent_name, wins, draws, losses, games e last_game_at
+    (do ponto de vista do jogador), ordenada por número de partidas.
+    """
+    def _fetch():
+        conn = get_conn()
+        cursor = conn.cursor()
+        # As duas metades usam índices (UNIQUE(player1_id, player2_id) e idx_head_to_head_player2)
+        cursor.execute('''
+            SELECT r.opponent_id, p.discord_username AS opponent_name, r.wins, r.draws, r.losses,
+                   r.wins + r.draws + r.losses AS games, r.last_game_at
+            FROM (
+                SELECT player2_id AS opponent_id, player1_wins AS wins, draws, player2_wins AS losses, last_game_at
+                FROM head_to_head WHERE player1_id = ?
+                UNION ALL
+                SELECT player1_id, player2_wins, draws, player1_wins, last_game_at
+                FROM head_to_head WHERE player2_id = ?
+            ) r
+            LEFT JOIN players p ON p.discord_id = r.opponent_id
+            ORDER BY games DESC, r.last_game_at DESC
+            LIMIT ?
+        ''', (discord_id, discord_id, limit if limit else -1))
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
     return await asyncio.to_thread(_fetch)
 
 async def check_and_unlock_achievements(player_id: str, mode: str, result: str, opponent_id: str = None):
-    """Verifica e desbloqueia achievements baseado no resultado de uma partida."""
-    achievements_unlocked = []
-    
+    """
+    Processa uma partida finalizada no motor de achievements. Chamar uma vez por jogador por partida,
+    depois dos ratings aplicados (a sequência de vitórias avança a cada chamada).
+
+    Lê máscara, sequência, rating e confronto direto numa consulta, avalia as regras em memória
+    (achievement_rules) e grava tudo numa transação. Retorna os tipos desbloqueados.
+    """
+    rating_column = f"rating_{mode}" if mode in RATING_MODES else "NULL"
+    p1, p2 = (min(player_id, opponent_id), max(player_id, opponent_id)) if opponent_id else (None, None)
+
     def _check_achievements():
         conn = get_conn()
         cursor = conn.cursor()
-        
         try:
-            cursor.execute("SELECT * FROM players WHERE discord_id = ?", (player_id,))
+            cursor.execute(f'''
+                SELECT COALESCE(achievements_mask, 0) AS mask, COALESCE(win_streak, 0) AS win_streak,
+                       {rating_column} AS rating,
+                       (SELECT player1_wins + player2_wins + draws FROM head_to_head
+                        WHERE player1_id = ? AND player2_id = ?) AS h2h_games
+                FROM players WHERE discord_id = ?
+            ''', (p1, p2, player_id))
             player = cursor.fetchone()
             if not player:
                 return []
-            
-            player_dict = dict(player)
-            unlocked = []
-            
-            # Primeira Vitória
-            if result == 'win':
-                cursor.execute("SELECT COUNT(*) as count FROM achievements WHERE player_id = ? AND achievement_type = ?", 
-                             (player_id, 'first_win'))
-                if cursor.fetchone()['count'] == 0:
-                    cursor.execute('''
-                        INSERT OR IGNORE INTO achievements (player_id, achievement_type, achievement_name, description)
-                        VALUES (?, ?, ?, ?)
-                    ''', (player_id, 'first_win', '🎯 Primeira Vitória', 'Vença sua primeira partida'))
-                    conn.commit()
-                    unlocked.append('first_win')
-                    logger.info(f"🏆 Achievement 'Primeira Vitória' desbloqueado para {player_id}")
-            
-            # Win Streak 3 e 5
-            if result == 'win':
-                current_wins = sum([player_dict.get(f'wins_{m}', 0) or 0 for m in ['bullet', 'blitz', 'rapid', 'classic']])
-                
-                if current_wins >= 5:
-                    cursor.execute("SELECT COUNT(*) as count FROM achievements WHERE player_id = ? AND achievement_type = ?", 
-                                 (player_id, 'win_streak_5'))
-                    if cursor.fetchone()['count'] == 0:
-                        cursor.execute('''
-                            INSERT OR IGNORE INTO achievements (player_id, achievement_type, achievement_name, description)
-                            VALUES (?, ?, ?, ?)
-                        ''', (player_id, 'win_streak_5', '🌟 Win Streak 5', 'Vença 5 partidas consecutivas'))
-                        conn.commit()
-                        unlocked.append('win_streak_5')
-                        logger.info(f"🏆 Achievement 'Win Streak 5' desbloqueado para {player_id}")
-                
-                elif current_wins >= 3:
-                    cursor.execute("SELECT COUNT(*) as count FROM achievements WHERE player_id = ? AND achievement_type = ?", 
-                                 (player_id, 'win_streak_3'))
-                    if cursor.fetchone()['count'] == 0:
-                        cursor.execute('''
-                            INSERT OR IGNORE INTO achievements (player_id, achievement_type, achievement_name, description)
-                            VALUES (?, ?, ?, ?)
-                        ''', (player_id, 'win_streak_3', '🔥 Win Streak 3', 'Vença 3 partidas consecutivas'))
-                        conn.commit()
-                        unlocked.append('win_streak_3')
-                        logger.info(f"🏆 Achievement 'Win Streak 3' desbloqueado para {player_id}")
-            
-            # Rating Achievements
-            rating = player_dict.get(f'rating_{mode}', 1200) or 1200
-            
-            if rating >= 1800:
-                cursor.execute("SELECT COUNT(*) as count FROM achievements WHERE player_id = ? AND achievement_type = ?", 
-                             (player_id, 'rating_1800'))
-                if cursor.fetchone()['count'] == 0:
-                    cursor.execute('''
-                        INSERT OR IGNORE INTO achievements (player_id, achievement_type, achievement_name, description)
-                        VALUES (?, ?, ?, ?)
-                    ''', (player_id, 'rating_1800', '👑 Rating 1800+', 'Atinja rating de 1800 ou mais'))
-                    conn.commit()
-                    unlocked.append('rating_1800')
-                    logger.info(f"🏆 Achievement 'Rating 1800+' desbloqueado para {player_id}")
-            
-            elif rating >= 1500:
-                cursor.execute("SELECT COUNT(*) as count FROM achievements WHERE player_id = ? AND achievement_type = ?", 
-                             (player_id, 'rating_1500'))
-                if cursor.fetchone()['count'] == 0:
-                    cursor.execute('''
-                        INSERT OR IGNORE INTO achievements (player_id, achievement_type, achievement_name, description)
-                        VALUES (?, ?, ?, ?)
-                    ''', (player_id, 'rating_1500', '⭐ Rating 1500+', 'Atinja rating de 1500 ou mais'))
-                    conn.commit()
-                    unlocked.append('rating_1500')
-                    logger.info(f"🏆 Achievement 'Rating 1500+' desbloqueado para {player_id}")
-            
-            # Head-to-head achievements
-            if opponent_id:
-                p1 = min(player_id, opponent_id)
-                p2 = max(player_id, opponent_id)
-                cursor.execute('''
-                    SELECT (player1_wins + player2_wins + draws) as total_games
-                    FROM head_to_head
-                    WHERE player1_id = ? AND player2_id = ?
-                ''', (p1, p2))
-                h2h_record = cursor.fetchone()
-                
-                if h2h_record and h2h_record['total_games'] >= 5:
-                    cursor.execute("SELECT COUNT(*) as count FROM achievements WHERE player_id = ? AND achievement_type = ?", 
-                                 (player_id, 'head_to_head_5'))
-                    if cursor.fetchone()['count'] == 0:
-                        cursor.execute('''
-                            INSERT OR IGNORE INTO achievements (player_id, achievement_type, achievement_name, description)
-                            VALUES (?, ?, ?, ?)
-                        ''', (player_id, 'head_to_head_5', '🎪 Rival', 'Jogue 5 partidas contra o mesmo adversário'))
-                        conn.commit()
-                        unlocked.append('head_to_head_5')
-                        logger.info(f"🏆 Achievement 'Rival' desbloqueado para {player_id}")
-            
+
+            win_streak = next_win_streak(player['win_streak'], result)
+            event = {
+                'result': result,
+                'rating': player['rating'],
+                'win_streak': win_streak,
+                'h2h_games': player['h2h_games'],
+            }
+            unlocked = evaluate_achievements(event, player['mask'])
+            unlocked_mask = mask_of(unlocked)
+
+            cursor.execute('''
+                UPDATE players
+                SET win_streak = ?, best_win_streak = MAX(COALESCE(best_win_streak, 0), ?),
+                    achievements_mask = COALESCE(achievements_mask, 0) | ?
+                WHERE discord_id = ?
+            ''', (win_streak, win_streak, unlocked_mask, player_id))
+            if unlocked:
+                rows = [(player_id, t, ACHIEVEMENTS[t][1], ACHIEVEMENTS[t][2]) for t in unlocked]
+                cursor.execute(
+                    "INSERT OR IGNORE INTO achievements (player_id, achievement_type, achievement_name, description) VALUES "
+                    + ", ".join(["(?, ?, ?, ?)"] * len(rows)),
+                    [value for row in rows for value in row]
+                )
+            conn.commit()
+            for achievement_type in unlocked:
+                logger.info(f"🏆 Achievement '{ACHIEVEMENTS[achievement_type][1]}' desbloqueado para {player_id}")
             return unlocked
-        
         except Exception as e:
+            conn.rollback()
             logger.error(f"Erro ao verificar achievements para {player_id}: {e}")
             return []
+        finally:
+            conn.close()
+
+    return await enqueue_write(_check_achievements)
 
 
 async def check_pairing_notified(pairing_id: int) -> bool:
     """Verifica se um pairing já foi notificado para evitar duplicatas."""
-    try:
+    def _check():
         conn = get_conn()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT notified FROM swiss_pairings WHERE id = ?", (pairing_id,))
-        result = cursor.fetchone()
-        
-        if result:
-            return result['notified'] == 1
-        
-        return False
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT notified FROM swiss_pairings WHERE id = ?", (pairing_id,))
+            result = cursor.fetchone()
+            return bool(result) and result['notified'] == 1
+        finally:
+            conn.close()
+    try:
+        return await asyncio.to_thread(_check)
     except Exception as e:
         logger.error(f"Erro ao verificar se pairing foi notificado: {e}")
         return False
 
 
+async def get_unnotified_swiss_pairings(tournament_id: int, round_number: int):
+    """Busca, numa única consulta, os pairings da rodada que ainda não foram notificados."""
+    def _get():
+        conn = get_conn()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT sp.*, p1.discord_username as player1_name, p2.discord_username as player2_name
+            FROM swiss_pairings sp
+            LEFT JOIN players p1 ON sp.player1_id = p1.discord_id
+            LEFT JOIN players p2 ON sp.player2_id = p2.discord_id
+            WHERE sp.tournament_id = ? AND sp.round_number = ? AND COALESCE(sp.notified, 0) = 0
+            ORDER BY sp.id
+        ''', (tournament_id, round_number))
+        pairings = cursor.fetchall()
+        conn.close()
+        return [dict(p) for p in pairings]
+    return await asyncio.to_thread(_get)
+
+
+async def mark_pairings_notified(pairing_ids: list) -> int:
+    """Marca vários pairings como notificados com um único UPDATE. Retorna o número de linhas afetadas."""
+    pairing_ids = [int(pid) for pid in pairing_ids if pid is not None]
+    if not pairing_ids:
+        return 0
+
+    def _mark():
+        conn = get_conn()
+        try:
+            cursor = conn.cursor()
+            placeholders = ",".join("?" for _ in pairing_ids)
+            cursor.execute(f"UPDATE swiss_pairings SET notified = 1 WHERE id IN ({placeholders})", pairing_ids)
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+    return await enqueue_swiss_pairing_write(pairing_ids, _mark)
+
+
 async def mark_pairing_notified(pairing_id: int) -> bool:
     """Marca um pairing como notificado."""
     try:
-        conn = get_conn()
-        cursor = conn.cursor()
-        
-        cursor.execute("UPDATE swiss_pairings SET notified = 1 WHERE id = ?", (pairing_id,))
-        conn.commit()
-        
+        await mark_pairings_notified([pairing_id])
         return True
     except Exception as e:
         logger.error(f"Erro ao marcar pairing como notificado: {e}")
         return False
+
+
+async def mark_swiss_pairing_accepted(pairing_id: int, player_id: str) -> set:
+    """Registra que o jogador aceitou o pairing. Retorna o conjunto de quem já aceitou."""
+    def _mark():
+        conn = get_conn()
+        try:
+            cursor = conn.cursor()
+            row = cursor.execute("SELECT accepted_by FROM swiss_pairings WHERE id = ?", (pairing_id,)).fetchone()
+            accepted = set(filter(None, (row['accepted_by'] or '').split(','))) if row else set()
+            if row and str(player_id) not in accepted:
+                accepted.add(str(player_id))
+                cursor.execute("UPDATE swiss_pairings SET accepted_by = ? WHERE id = ?", (','.join(sorted(accepted)), pairing_id))
+                conn.commit()
+            return accepted
+        finally:
+            conn.close()
+    return await enqueue_swiss_pairing_write([pairing_id], _mark)
+
+
+async def get_persistent_view_state():
+    """
+    Tudo o que precisa de view persistente no startup, numa única consulta.
+
+    Linhas com `kind`:
+    - 'official': torneio oficial aberto (botões entrar/sair), com o modo em `mode`
+    - 'swiss': torneio suíço aberto ou em andamento (botões entrar/sair)
+    - 'swiss_pairing': pairing suíço ainda não finalizado (aceitar/abandonar ou finalizar, se já tem jogo)
+    """
+    def _get():
+        conn = get_conn()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT 'official' AS kind, id, id AS tournament_id, mode, status,
+                   NULL AS player1_id, NULL AS player2_id, NULL AS round_number, NULL AS game_url, NULL AS accepted_by
+            FROM tournaments WHERE status = 'open'
+            UNION ALL
+            SELECT 'swiss', id, id, NULL, status, NULL, NULL, NULL, NULL, NULL
+            FROM swiss_tournaments WHERE status IN ('open', 'in_progress')
+            UNION ALL
+            SELECT 'swiss_pairing', sp.id, sp.tournament_id, NULL, sp.status,
+                   sp.player1_id, sp.player2_id, sp.round_number, sp.game_url, sp.accepted_by
+            FROM swiss_pairings sp
+            JOIN swiss_tournaments st ON st.id = sp.tournament_id
+            WHERE st.status = 'in_progress' AND sp.status NOT IN ('finished', 'cancelled')
+              AND sp.player2_id IS NOT NULL
+        """)
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+    return await asyncio.to_thread(_get)
+
+
+# ==============================================================================
+# --- FUNÇÕES PARA PRAZOS DOS TORNEIOS SUÍÇOS ---
+# ==============================================================================
+
+async def schedule_swiss_deadlines(deadlines: list):
+    """Registra (ou reagenda) prazos de pairings suíços numa única transação.
+
+    Cada item é um dict com tournament_id, pairing_id, round_number, kind ('accept'/'finish')
+    e due_at (epoch em segundos). Retorna a lista de dicts com o id de cada prazo.
+    """
+    if not deadlines:
+        return []
+
+    def _schedule():
+        conn = get_conn()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT INTO swiss_deadlines (tournament_id, pairing_id, round_number, kind, due_at, status)
+                VALUES (?, ?, ?, ?, ?, 'pending')
+                ON CONFLICT(pairing_id, kind) DO UPDATE SET due_at = excluded.due_at, status = 'pending'
+            ''', [(d['tournament_id'], d['pairing_id'], d['round_number'], d['kind'], int(d['due_at'])) for d in deadlines])
+            conn.commit()
+
+            placeholders = ",".join("?" for _ in deadlines)
+            cursor.execute(f'''
+                SELECT * FROM swiss_deadlines
+                WHERE status = 'pending' AND pairing_id IN ({placeholders})
+            ''', [d['pairing_id'] for d in deadlines])
+            wanted = {(d['pairing_id'], d['kind']) for d in deadlines}
+            return [dict(row) for row in cursor.fetchall() if (row['pairing_id'], row['kind']) in wanted]
+        finally:
+            conn.close()
+    return await enqueue_swiss_write([d['tournament_id'] for d in deadlines], _schedule)
+
+
+async def get_pending_swiss_deadlines():
+    """Busca todos os prazos suíços ainda pendentes, do mais próximo ao mais distante."""
+    def _get():
+        conn = get_conn()
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM swiss_deadlines WHERE status = 'pending' ORDER BY due_at")
+        rows = cursor.fetchall()
+        conn.close()
+        return [dict(r) for r in rows]
+    return await asyncio.to_thread(_get)
+
+
+async def claim_swiss_deadline(deadline_id: int, due_at: int) -> bool:
+    """Marca um prazo vencido como disparado. Retorna False se ele foi cancelado ou reagendado."""
+    def _claim():
+        conn = get_conn()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE swiss_deadlines SET status = 'fired'
+                WHERE id = ? AND status = 'pending' AND due_at = ?
+            ''', (deadline_id, int(due_at)))
+            conn.commit()
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+    return await enqueue_write(_claim)
+
+
+async def cancel_swiss_deadlines(pairing_id: int, kind: str = None):
+    """Cancela os prazos pendentes de um pairing (todos ou apenas de um tipo)."""
+    def _cancel():
+        conn = get_conn()
+        try:
+            cursor = conn.cursor()
+            if kind:
+                cursor.execute('''
+                    UPDATE swiss_deadlines SET status = 'cancelled'
+                    WHERE pairing_id = ? AND kind = ? AND status = 'pending'
+                ''', (pairing_id, kind))
+            else:
+                cursor.execute('''
+                    UPDATE swiss_deadlines SET status = 'cancelled'
+                    WHERE pairing_id = ? AND status = 'pending'
+                ''', (pairing_id,))
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+    return await enqueue_swiss_pairing_write([pairing_id], _cancel)
+
+
 # ==============================================================================
 # --- FUNÇÕES PARA API (Retorno de dados formatados) ---
 # ==============================================================================
@@ -2843,4 +4267,89 @@ async def get_ranking_by_mode_for_api(mode: str):
             'ultimo_update': datetime.datetime.now().isoformat()
         }
     
-    return await asyncio.to_thread(_get)
\ No newline at end of file
+    return await asyncio.to_thread(_get)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Compara o cabeçalho If-None-Match (aceita lista, '*' e prefixo W/) com o ETag atual."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == '*' or tag == etag:
+            return True
+    return False
+
+
+def bracket_etag(tournament_id: int, version: int) -> str:
+    """ETag do bracket de um torneio numa versão."""
+    return f'"bracket-{tournament_id}-{version}"'
+
+
+async def get_tournament_bracket_for_api(tournament_id: int, if_none_match: str = None, since: int = None):
+    """Retorna o bracket para o API do site com versionamento.
+
+    Retorna um dict com:
+    - status: 200, 304 (If-None-Match bate com a versão atual) ou 404
+    - etag: ETag da versão atual (enviar no cabeçalho ETag)
+    - data: JSON do bracket (None em 304/404). Com `since`, data['matches'] traz só as partidas
+      alteradas depois dessa versão e data['full'] é False.
+    """
+    def _get():
+        conn = get_conn()
+        cursor = conn.cursor()
+        try:
+            # Consulta barata primeiro: só a versão, sem os joins
+            row = cursor.execute("SELECT bracket_version FROM tournaments WHERE id = ?", (tournament_id,)).fetchone()
+            if not row:
+                return {'status': 404, 'etag': None, 'data': None}
+
+            version = row['bracket_version'] or 0
+            etag = bracket_etag(tournament_id, version)
+            if _etag_matches(if_none_match, etag):
+                return {'status': 304, 'etag': etag, 'data': None}
+
+            # Versão futura ou inválida: devolve o bracket completo
+            incremental = since is not None and 0 <= since <= version
+            data = _get_bracket_payload(cursor, tournament_id, since if incremental else None)
+            data['full'] = not incremental
+            if incremental:
+                data['since'] = since
+            return {'status': 200, 'etag': bracket_etag(tournament_id, data['version']), 'data': data}
+        finally:
+            conn.close()
+    return await asyncio.to_thread(_get)
+
+
+async def get_in_progress_tournaments_for_api(if_none_match: str = None):
+    """Retorna os torneios em andamento para o API do site com ETag.
+
+    Retorna um dict com status (200/304), etag e data ({'torneios': [...], 'version': N}).
+    Cada torneio traz sua bracket_version para o frontend buscar só os brackets que mudaram.
+    """
+    def _get():
+        conn = get_conn()
+        cursor = conn.cursor()
+        try:
+            version = cursor.execute("SELECT version FROM api_versions WHERE name = 'tournaments'").fetchone()
+            version = version['version'] if version else 0
+            etag = f'"tournaments-{version}"'
+            if _etag_matches(if_none_match, etag):
+                return {'status': 304, 'etag': etag, 'data': None}
+
+            cursor.execute("""
+                SELECT t.id, t.name, t.description, t.mode, t.time_control, t.started_at, t.bracket_version,
+                       (SELECT COUNT(*) FROM tournament_participants tp WHERE tp.tournament_id = t.id) as participantes,
+                       (SELECT MAX(tm.round_number) FROM tournament_matches tm
+                        WHERE tm.tournament_id = t.id AND tm.status != 'waiting') as rodada_atual
+                FROM tournaments t
+                WHERE t.status = 'in_progress'
+                ORDER BY t.started_at DESC
+            """)
+            torneios = [dict(t) for t in cursor.fetchall()]
+            return {'status': 200, 'etag': etag, 'data': {'torneios': torneios, 'version': version}}
+        finally:
+            conn.close()
+    return await asyncio.to_thread(_get)
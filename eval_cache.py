@@ -0,0 +1,87 @@
+"""
+Cache de avaliações de posições, compartilhado entre análises.
+
+A chave é o hash Zobrist do python-chess (peças, lado que joga, roques e en passant), então a mesma
+posição vinda de partidas ou ordens de lances diferentes cai na mesma entrada. Cada entrada guarda a
+avaliação mais profunda conhecida (do ponto de vista das brancas) e só atende consultas que pedem
+profundidade igual ou menor.
+
+Dois níveis: um LRU em memória e a tabela position_evals no SQLite. É consultado antes do pool de
+engines (stockfish_analysis) e da cloud eval do Lichess; as aberturas, que se repetem em quase toda
+partida do servidor, deixam de ser analisadas de novo.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+import chess
+import chess.polyglot
+
+import database
+
+EVAL_CACHE_SIZE = 50000
+# Profundidade mínima aceita quando o pedido só tem movetime/nodes
+EVAL_CACHE_MIN_DEPTH = 12
+
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def position_key(board: chess.Board) -> int:
+    """Hash Zobrist da posição como inteiro de 64 bits com sinal (cabe no INTEGER do SQLite)."""
+    key = chess.polyglot.zobrist_hash(board)
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+def _remember(key: int, entry: dict):
+    with _memory_lock:
+        current = _memory.get(key)
+        if current is None or entry['depth'] >= current['depth']:
+            _memory[key] = entry
+        _memory.move_to_end(key)
+        while len(_memory) > EVAL_CACHE_SIZE:
+            _memory.popitem(last=False)
+
+
+def _from_memory(key: int, min_depth: int) -> Optional[dict]:
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry is None:
+            return None
+        _memory.move_to_end(key)
+        return entry if entry['depth'] >= min_depth else None
+
+
+async def get_evals(keys: Iterable[int], min_depth: int = EVAL_CACHE_MIN_DEPTH) -> Dict[int, dict]:
+    """Avaliações em cache para as chaves: memória primeiro, o resto numa consulta ao SQLite."""
+    found = {}
+    missing = []
+    for key in dict.fromkeys(keys):
+        entry = _from_memory(key, min_depth)
+        if entry is not None:
+            found[key] = entry
+        else:
+            missing.append(key)
+
+    if missing:
+        stored = await database.get_position_evals(missing, min_depth)
+        for key, entry in stored.items():
+            _remember(key, entry)
+        found.update(stored)
+    return found
+
+
+async def get_eval(board: chess.Board, min_depth: int = EVAL_CACHE_MIN_DEPTH) -> Optional[dict]:
+    key = position_key(board)
+    return (await get_evals([key], min_depth)).get(key)
+
+
+async def store_evals(evals: Dict[int, dict], source: str = None):
+    """Guarda {chave: {'depth', 'cp', 'mate', 'best_move'}} na memória e no SQLite (pelo writer)."""
+    for key, entry in evals.items():
+        _remember(key, entry)
+    await database.save_position_evals(evals, source)
+
+
+async def store_eval(board: chess.Board, entry: dict, source: str = None):
+    await store_evals({position_key(board): entry}, source)
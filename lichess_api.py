@@ -5,6 +5,9 @@ import os
 from typing import Optional, Dict
 from urllib.parse import urlencode
 import aiohttp
+import chess
+
+import eval_cache
 
 LICHESS_API_BASE = "https://lichess.org"
 
@@ -84,6 +87,7 @@ async def get_game_outcome(game_url: str) -> Optional[Dict]:
             'moves': int | None,
             'time_control': str | None,
             'opening': str | None,
+            'eco': str | None,
             'created_at': str | None,
             'last_move_at': str | None
         }
@@ -94,7 +98,7 @@ async def get_game_outcome(game_url: str) -> Optional[Dict]:
     """
     # Extract game id from URL like https://lichess.org/<gameId> or .../embed/...
     game_id = game_url.rstrip('/').split('/')[-1]
-    json_url = f"{LICHESS_API_BASE}/game/export/{game_id}?format=json&evals=1&opening=true"
+    json_url = f"{LICHESS_API_BASE}/game/export/{game_id}?format=json&evals=1&opening=true&pgnInJson=true"
 
     async with ManagedClientSession() as session:
         try:
@@ -121,6 +125,7 @@ async def get_game_outcome(game_url: str) -> Optional[Dict]:
         clock = data.get('clock')
         time_control = f"{clock['initial']//60}+{clock['increment']}" if clock else None
         opening = data.get('opening', {}).get('name') if data.get('opening') else None
+        opening_eco = data.get('opening', {}).get('eco') if data.get('opening') else None
         created_at = data.get('createdAt')
         last_move_at = data.get('lastMoveAt')
 
@@ -188,6 +193,7 @@ async def get_game_outcome(game_url: str) -> Optional[Dict]:
                 'moves': moves,
                 'time_control': time_control,
                 'opening': opening,
+                'eco': opening_eco,
                 'created_at': created_at,
                 'last_move_at': last_move_at
             },
@@ -199,13 +205,17 @@ async def get_game_outcome(game_url: str) -> Optional[Dict]:
 async def get_game_pgn(game_id: str) -> Optional[str]:
     """
     Fetches the PGN for a given Lichess game ID.
+    Retorna '' se a partida não existe mais (404) e None em erros temporários (ex: 429).
     """
-    url = f"{LICHESS_API_BASE}/game/export/{game_id}"
+    url = f"{LICHESS_API_BASE}/game/export/{game_id}?opening=true"
     async with ManagedClientSession() as session:
         try:
             async with session.get(url, headers={"Accept": "application/x-chess-pgn"}, timeout=20) as resp:
                 if resp.status == 200:
                     return await resp.text()
+                elif resp.status == 404:
+                    logger.debug(f"Jogo {game_id} não encontrado ao buscar PGN")
+                    return ''
                 else:
                     logger.warning(f"Erro ao buscar PGN do jogo {game_id}. Status: {resp.status}, Resposta: {await resp.text()}")
                     return None
@@ -214,22 +224,47 @@ async def get_game_pgn(game_id: str) -> Optional[str]:
             return None
 
 
-async def get_cloud_eval(fen: str) -> Optional[Dict]:
+async def get_cloud_eval(fen: str, min_depth: int = eval_cache.EVAL_CACHE_MIN_DEPTH) -> Optional[Dict]:
     """
     Fetches the cloud evaluation for a given FEN from Lichess.
-    Returns a dict with 'cp', 'mate', 'pv' or None if not found.
+    Returns a dict with 'cp', 'mate', 'pv', 'depth' or None if not found.
+    Posições já no eval_cache com profundidade >= min_depth nem chegam a ir para a API.
     """
-    url = f"{LICHESS_API_BASE}/api/cloud-eval/{fen}"
+    try:
+        board = chess.Board(fen)
+    except ValueError as e:
+        logger.warning(f"FEN inválida para cloud eval {fen}: {e}")
+        return None
+    cached = await eval_cache.get_eval(board, min_depth)
+    if cached:
+        return {
+            'cp': cached['cp'],
+            'mate': cached['mate'],
+            'pv': [cached['best_move']] if cached['best_move'] else [],
+            'depth': cached['depth'],
+        }
+
+    url = f"{LICHESS_API_BASE}/api/cloud-eval?{urlencode({'fen': fen})}"
     async with ManagedClientSession() as session:
         try:
             async with session.get(url, headers={"Accept": "application/json"}, timeout=10) as resp:
                 if resp.status == 200:
                     data = await resp.json()
-                    return {
-                        'cp': data.get('cp'),
-                        'mate': data.get('mate'),
-                        'pv': data.get('pv', [])
+                    line = (data.get('pvs') or [{}])[0]
+                    pv = line.get('moves', '').split()
+                    evaluation = {
+                        'cp': line.get('cp'),
+                        'mate': line.get('mate'),
+                        'pv': pv,
+                        'depth': data.get('depth') or 0,
                     }
+                    await eval_cache.store_eval(board, {
+                        'depth': evaluation['depth'],
+                        'cp': evaluation['cp'],
+                        'mate': evaluation['mate'],
+                        'best_move': pv[0] if pv else None,
+                    }, source='cloud')
+                    return evaluation
                 else:
                     logger.debug(f"Cloud eval not found for FEN {fen}. Status: {resp.status}")
                     return None
@@ -144,6 +144,16 @@ async def on_ready():
     tasks.set_bot_instance(bot)
     asyncio.create_task(tasks.start_background_tasks())
 
+    # Recarrega os prazos pendentes dos torneios suíços e inicia o agendador único
+    from cogs.tournaments import get_deadline_scheduler, register_persistent_views
+    await get_deadline_scheduler(bot).start()
+
+    # Reanexa os botões dos torneios (entrar/sair, aceitar/finalizar partidas) às mensagens já enviadas
+    try:
+        await register_persistent_views(bot)
+    except Exception as e:
+        print(f"❌ Erro ao registrar views persistentes dos torneios: {e}")
+
 @bot.event
 async def on_interaction(interaction: discord.Interaction):
     """Intercepta interações de comandos slash para verificar permissões de servidor."""
@@ -195,7 +205,14 @@ async def on_close():
         print("✅ Sessões HTTP fechadas com sucesso")
     except Exception as e:
         print(f"⚠️ Erro ao fechar sessões HTTP: {e}")
-    
+
+    # Encerra os processos do pool de engines (se foi usado)
+    import stockfish
+    try:
+        await stockfish.close_engine_pool()
+    except Exception as e:
+        print(f"⚠️ Erro ao encerrar as engines: {e}")
+
     print("✅ Bot fechado com sucesso.")
 
 async def load_cogs():
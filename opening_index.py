@@ -0,0 +1,305 @@
+"""
+Indexador de aberturas a partir dos PGNs salvos em matches.pgn.
+
+Os PGNs são lidos em lotes por id e analisados com chess.pgn num pool de processos (só
+cabeçalhos e linha principal). Partidas antigas guardaram só a URL do Lichess: o PGN delas é
+baixado uma vez (lichess_api.get_game_pgn) e gravado em matches.pgn junto com o lote. ECO/abertura, resultado e número de meios-lances vão para
+opening_stats, somados para o servidor e para cada jogador por cor. O último id processado
+fica em opening_index_state na mesma transação, então cada execução só lê partidas novas.
+
+O bot roda o indexador em segundo plano (tasks.check_games_loop). Manualmente:
+    python opening_index.py             # processa o que falta
+    python opening_index.py --rebuild   # zera opening_stats e reprocessa tudo
+"""
+import argparse
+import asyncio
+import io
+import logging
+import multiprocessing
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import chess.pgn
+
+import database
+import lichess_api
+
+logger = logging.getLogger(__name__)
+
+SOURCE = 'matches'
+BATCH_SIZE = 500
+PARSE_CHUNKSIZE = 25
+INDEX_WORKERS = 2
+UNKNOWN_ECO = '?'
+PGN_FETCH_CONCURRENCY = 2
+LICHESS_GAME_URL = re.compile(r"lichess\.org/([a-zA-Z0-9]{8})")
+
+RESULT_COLUMNS = {'1-0': 'white_wins', '1/2-1/2': 'draws', '0-1': 'black_wins'}
+
+_index_task = None
+
+
+def _new_pool() -> ProcessPoolExecutor:
+    # spawn: o bot tem várias threads (writer, to_thread), e fork a partir delas não é seguro
+    return ProcessPoolExecutor(max_workers=INDEX_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+
+
+class _OpeningVisitor(chess.pgn.BaseVisitor):
+    """Coleta cabeçalhos e conta os lances da linha principal; variações são puladas."""
+
+    def begin_game(self):
+        self.headers = {}
+        self.plies = 0
+
+    def visit_header(self, tagname, tagvalue):
+        self.headers[tagname] = tagvalue
+
+    def begin_variation(self):
+        return chess.pgn.SKIP
+
+    def visit_move(self, board, move):
+        self.plies += 1
+
+    def result(self):
+        return self.headers, self.plies
+
+
+def parse_pgn(text: str):
+    """Roda nos workers. Retorna (eco, abertura, resultado, meios-lances, brancas, pretas) ou None."""
+    try:
+        parsed = chess.pgn.read_game(io.StringIO(text), Visitor=_OpeningVisitor)
+    except Exception:
+        return None
+    if parsed is None:
+        return None
+    headers, plies = parsed
+    result = headers.get('Result')
+    if result not in RESULT_COLUMNS:
+        return None
+    eco = headers.get('ECO')
+    eco = eco if eco and eco != '?' else UNKNOWN_ECO
+    opening = headers.get('Opening')
+    return eco, opening if opening and opening != '?' else None, result, plies, headers.get('White'), headers.get('Black')
+
+
+def _colors(row, white: str, black: str, lichess_ids: dict):
+    """Discord id das brancas e das pretas (None quando não dá para saber)."""
+    participants = {row['challenger_id'], row['challenged_id']}
+    white_id = lichess_ids.get((white or '').lower())
+    black_id = lichess_ids.get((black or '').lower())
+    white_id = white_id if white_id in participants else None
+    black_id = black_id if black_id in participants and black_id != white_id else None
+    # Só um lado vinculado ao Lichess: o outro participante tem a outra cor
+    if white_id and not black_id:
+        black_id = next(iter(participants - {white_id}), None)
+    elif black_id and not white_id:
+        white_id = next(iter(participants - {black_id}), None)
+    return white_id, black_id
+
+
+def accumulate(deltas: dict, row, parsed, lichess_ids: dict):
+    """Soma uma partida analisada em deltas {(player_id, cor, eco): [abertura, partidas, brancas, empates, pretas, lances]}."""
+    eco, opening, result, plies, white, black = parsed
+    white_id, black_id = _colors(row, white, black, lichess_ids)
+    result_index = 2 + list(RESULT_COLUMNS).index(result)
+    for key in (('', '', eco), (white_id, 'white', eco), (black_id, 'black', eco)):
+        if key[0] is None:
+            continue
+        delta = deltas.setdefault(key, [opening, 0, 0, 0, 0, 0])
+        delta[0] = delta[0] or opening
+        delta[1] += 1
+        delta[result_index] += 1
+        delta[5] += plies
+
+
+def load_lichess_ids(conn) -> dict:
+    rows = conn.execute("SELECT discord_id, lichess_username FROM players WHERE lichess_username IS NOT NULL").fetchall()
+    return {row['lichess_username'].lower(): row['discord_id'] for row in rows}
+
+
+def read_batch(conn, last_id: int = None):
+    """Próximo lote de partidas depois do último id processado. Retorna (linhas, último id lido)."""
+    if last_id is None:
+        state = conn.execute("SELECT last_id FROM opening_index_state WHERE source = ?", (SOURCE,)).fetchone()
+        last_id = state['last_id'] if state else 0
+    rows = conn.execute(
+        "SELECT id, challenger_id, challenged_id, pgn FROM matches WHERE id > ? ORDER BY id LIMIT ?",
+        (last_id, BATCH_SIZE)
+    ).fetchall()
+    return rows, rows[-1]['id'] if rows else last_id
+
+
+def _has_pgn(row) -> bool:
+    return bool(row['pgn']) and row['pgn'].lstrip().startswith('[')
+
+
+async def fetch_missing_pgns(rows):
+    """
+    Baixa o PGN das linhas que só têm a URL do Lichess. Retorna (linhas, {id: pgn baixado}).
+
+    Partidas que não existem mais ficam sem PGN e são puladas. Num erro temporário (ex: 429) o lote
+    é cortado antes da linha, para ela ser tentada de novo na próxima execução.
+    """
+    rows = [dict(row) for row in rows]
+    missing = {}
+    for index, row in enumerate(rows):
+        match = None if _has_pgn(row) else LICHESS_GAME_URL.search(row['pgn'] or '')
+        if match:
+            missing[index] = match.group(1)
+    if not missing:
+        return rows, {}
+
+    semaphore = asyncio.Semaphore(PGN_FETCH_CONCURRENCY)
+
+    async def _fetch(game_id):
+        async with semaphore:
+            return await lichess_api.get_game_pgn(game_id)
+
+    results = await asyncio.gather(*(_fetch(game_id) for game_id in missing.values()))
+    fetched = {}
+    for index, pgn in zip(missing, results):
+        if pgn is None:
+            logger.warning(f"📖 PGN da partida {rows[index]['id']} indisponível agora; o indexador continua dela na próxima execução")
+            return rows[:index], fetched
+        if pgn:
+            rows[index]['pgn'] = pgn
+            fetched[rows[index]['id']] = pgn
+    return rows, fetched
+
+
+def parse_batch(pool, rows, lichess_ids: dict):
+    """Analisa o lote no pool e devolve (deltas, partidas indexadas). Linhas sem PGN são puladas."""
+    pgn_rows = [row for row in rows if _has_pgn(row)]
+    deltas = {}
+    indexed = 0
+    for row, parsed in zip(pgn_rows, pool.map(parse_pgn, [row['pgn'] for row in pgn_rows], chunksize=PARSE_CHUNKSIZE)):
+        if parsed:
+            accumulate(deltas, row, parsed, lichess_ids)
+            indexed += 1
+    return deltas, indexed
+
+
+def write_batch(conn, deltas: dict, last_id: int, pgns: dict = None):
+    """Grava os deltas do lote, os PGNs baixados e o novo último id numa transação."""
+    cursor = conn.cursor()
+    try:
+        if pgns:
+            cursor.executemany("UPDATE matches SET pgn = ? WHERE id = ?", [(pgn, match_id) for match_id, pgn in pgns.items()])
+        cursor.executemany('''
+            INSERT INTO opening_stats (player_id, color, eco, opening_name, games, white_wins, draws, black_wins, total_plies)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(player_id, color, eco) DO UPDATE SET
+                opening_name = COALESCE(opening_name, excluded.opening_name),
+                games = games + excluded.games,
+                white_wins = white_wins + excluded.white_wins,
+                draws = draws + excluded.draws,
+                black_wins = black_wins + excluded.black_wins,
+                total_plies = total_plies + excluded.total_plies
+        ''', [(*key, *delta) for key, delta in deltas.items()])
+        cursor.execute('''
+            INSERT INTO opening_index_state (source, last_id) VALUES (?, ?)
+            ON CONFLICT(source) DO UPDATE SET last_id = excluded.last_id
+        ''', (SOURCE, last_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def reset_index(conn):
+    conn.execute("DELETE FROM opening_stats")
+    conn.execute("DELETE FROM opening_index_state WHERE source = ?", (SOURCE,))
+    conn.commit()
+
+
+async def run_opening_index() -> int:
+    """Processa todas as partidas novas (leitura em thread, análise no pool, escrita pelo writer). Retorna quantas indexou."""
+    def _read(reader, *args):
+        conn = database.get_conn()
+        try:
+            return reader(conn, *args)
+        finally:
+            conn.close()
+
+    def _write(deltas, last_id, pgns):
+        conn = database.get_conn()
+        try:
+            write_batch(conn, deltas, last_id, pgns)
+        finally:
+            conn.close()
+
+    rows, last_id = await asyncio.to_thread(_read, read_batch, None)
+    if not rows:
+        return 0
+    lichess_ids = await asyncio.to_thread(_read, load_lichess_ids)
+
+    total = 0
+    with _new_pool() as pool:
+        while rows:
+            batch_size = len(rows)
+            rows, pgns = await fetch_missing_pgns(rows)
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            deltas, indexed = await asyncio.to_thread(parse_batch, pool, rows, lichess_ids)
+            await database.enqueue_write(_write, deltas, last_id, pgns)
+            total += indexed
+            if len(rows) < batch_size:
+                break  # lote cortado por erro temporário ao baixar PGNs
+            rows, last_id = await asyncio.to_thread(_read, read_batch, last_id)
+    return total
+
+
+def schedule_opening_index():
+    """Dispara o indexador em segundo plano, se ainda não estiver rodando."""
+    global _index_task
+    if _index_task and not _index_task.done():
+        return
+
+    async def _run():
+        try:
+            indexed = await run_opening_index()
+            if indexed:
+                logger.info(f"📖 Aberturas indexadas: {indexed} partida(s) nova(s)")
+        except Exception as e:
+            logger.error(f"Erro ao indexar aberturas: {e}", exc_info=True)
+
+    _index_task = asyncio.create_task(_run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexa as aberturas dos PGNs salvos em opening_stats.")
+    parser.add_argument('--rebuild', action='store_true', help="Zera opening_stats e reprocessa todas as partidas")
+    args = parser.parse_args()
+
+    conn = database.get_conn()
+    try:
+        if args.rebuild:
+            reset_index(conn)
+        started = time.perf_counter()
+        lichess_ids = load_lichess_ids(conn)
+        total = 0
+        with _new_pool() as pool:
+            rows, last_id = read_batch(conn)
+            while rows:
+                batch_size = len(rows)
+                rows, pgns = asyncio.run(fetch_missing_pgns(rows))
+                if not rows:
+                    break
+                last_id = rows[-1]['id']
+                deltas, indexed = parse_batch(pool, rows, lichess_ids)
+                write_batch(conn, deltas, last_id, pgns)
+                total += indexed
+                print(f"  ... até a partida {last_id}: {total} indexadas ({len(pgns)} PGNs baixados do Lichess)")
+                if len(rows) < batch_size:
+                    print("⚠️ Erro temporário ao baixar PGNs; rode de novo mais tarde para continuar.")
+                    break
+                rows, last_id = read_batch(conn, last_id)
+        print(f"📖 {total} partidas indexadas em {time.perf_counter() - started:.2f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import asyncio
+import datetime
+import functools
+import io
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+try:
+    from PIL import Image, ImageDraw, ImageFont
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+logger = logging.getLogger(__name__)
+
+# Dimensões e cores do gráfico (mesma paleta do bracket)
+CHART_W = 800
+CHART_H = 400
+CHART_MARGIN_LEFT = 60
+CHART_MARGIN_RIGHT = 20
+CHART_MARGIN_TOP = 40
+CHART_MARGIN_BOTTOM = 40
+CHART_BG = (54, 57, 63)
+CHART_GRID = (79, 84, 92)
+CHART_TEXT = (220, 221, 222)
+CHART_LINE = (205, 0, 0)
+CHART_PEAK = (250, 166, 26)
+CHART_GRID_LINES = 5
+
+# Pontos do histórico usados no gráfico
+CHART_MAX_POINTS = 200
+
+# PNGs prontos por (player_id, modo, id do último ponto, título): só um jogo novo invalida a imagem
+CHART_CACHE_SIZE = 128
+_chart_png_cache = OrderedDict()
+_chart_cache_lock = threading.Lock()
+_chart_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chart-render")
+
+
+@functools.lru_cache(maxsize=None)
+def get_chart_font(size: int = 13):
+    """Carrega a fonte do gráfico uma única vez por tamanho."""
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except Exception:
+        return ImageFont.load_default()
+
+
+def _format_day(epoch: int) -> str:
+    return datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc).strftime("%d/%m/%y")
+
+
+def draw_rating_chart(points, title: str) -> bytes:
+    """Desenha a evolução do rating (pontos em ordem cronológica com rating e recorded_at). Retorna o PNG."""
+    img = Image.new('RGB', (CHART_W, CHART_H), color=CHART_BG)
+    draw = ImageDraw.Draw(img)
+    font = get_chart_font()
+
+    ratings = [p['rating'] for p in points]
+    low, high = min(ratings), max(ratings)
+    # Margem vertical para a linha não encostar nas bordas
+    padding = max(20, (high - low) // 10)
+    low, high = low - padding, high + padding
+
+    plot_left, plot_right = CHART_MARGIN_LEFT, CHART_W - CHART_MARGIN_RIGHT
+    plot_top, plot_bottom = CHART_MARGIN_TOP, CHART_H - CHART_MARGIN_BOTTOM
+
+    def y_of(rating):
+        return plot_bottom - (rating - low) * (plot_bottom - plot_top) / (high - low)
+
+    # Grade horizontal com os ratings
+    for i in range(CHART_GRID_LINES + 1):
+        rating = low + (high - low) * i / CHART_GRID_LINES
+        y = y_of(rating)
+        draw.line([(plot_left, y), (plot_right, y)], fill=CHART_GRID, width=1)
+        draw.text((8, y - 7), str(round(rating)), fill=CHART_TEXT, font=font)
+
+    # Eixo x por índice da partida (partidas próximas no tempo não se amontoam)
+    step = (plot_right - plot_left) / max(len(points) - 1, 1)
+    coords = [(plot_left + i * step, y_of(p['rating'])) for i, p in enumerate(points)]
+    if len(coords) > 1:
+        draw.line(coords, fill=CHART_LINE, width=3)
+    for x, y in (coords if len(coords) <= 40 else coords[-1:]):
+        draw.ellipse([x - 3, y - 3, x + 3, y + 3], fill=CHART_LINE)
+
+    # Pico destacado
+    peak_index = max(range(len(points)), key=lambda i: (ratings[i], -i))
+    px, py = coords[peak_index]
+    draw.ellipse([px - 5, py - 5, px + 5, py + 5], outline=CHART_PEAK, width=2)
+    draw.text((min(px + 8, plot_right - 60), max(py - 18, 2)), f"Pico {ratings[peak_index]}", fill=CHART_PEAK, font=font)
+
+    draw.text((plot_left, 10), title, fill=CHART_TEXT, font=get_chart_font(16))
+    draw.text((plot_left, plot_bottom + 12), _format_day(points[0]['recorded_at']), fill=CHART_TEXT, font=font)
+    last_day = _format_day(points[-1]['recorded_at'])
+    draw.text((plot_right - 8 * len(last_day), plot_bottom + 12), last_day, fill=CHART_TEXT, font=font)
+
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def render_rating_chart_png(player_id: str, mode: str, points, title: str):
+    """Renderiza o gráfico usando o cache por (player_id, modo, id do último ponto, título). Retorna bytes ou None."""
+    if not HAS_PIL:
+        logger.error("Biblioteca Pillow (PIL) não encontrada. Instale com 'pip install Pillow'.")
+        return None
+    if not points:
+        return None
+
+    # O título vai desenhado no PNG, então títulos diferentes são imagens diferentes
+    key = (str(player_id), mode, points[-1]['id'], title)
+    with _chart_cache_lock:
+        png = _chart_png_cache.get(key)
+        if png is not None:
+            _chart_png_cache.move_to_end(key)
+            return png
+
+    png = draw_rating_chart(points, title)
+
+    with _chart_cache_lock:
+        _chart_png_cache[key] = png
+        while len(_chart_png_cache) > CHART_CACHE_SIZE:
+            _chart_png_cache.popitem(last=False)
+    logger.debug(f"Gráfico de rating renderizado para {player_id} ({mode})")
+    return png
+
+
+async def get_rating_chart(player_id: str, mode: str, title: str = None):
+    """
+    Busca o histórico (uma consulta de faixa) e devolve (png, último ponto) ou (None, None) sem histórico.
+
+    A renderização roda num worker; com o mesmo último ponto a imagem sai do cache.
+    """
+    points = await database.get_rating_history(str(player_id), mode, limit=CHART_MAX_POINTS)
+    if not points:
+        return None, None
+
+    loop = asyncio.get_running_loop()
+    png = await loop.run_in_executor(
+        _chart_executor, render_rating_chart_png, player_id, mode, points, title or f"Rating {mode.title()}"
+    )
+    return png, points[-1]
@@ -0,0 +1,159 @@
+import math
+import os
+from typing import Dict, Sequence, Tuple
+
+# Sistema de rating em uso: 'glicko2' (padrão) ou 'elo' (K fixo, comportamento antigo)
+RATING_SYSTEMS = ('elo', 'glicko2')
+RATING_SYSTEM = os.environ.get('RATING_SYSTEM', 'glicko2').lower()
+
+DEFAULT_RATING = 1200
+
+# Código inteiro de cada modo no rating_history (armazenamento compacto)
+RATING_MODE_CODES = {'bullet': 1, 'blitz': 2, 'rapid': 3, 'classic': 4}
+RATING_MODE_NAMES = {code: mode for mode, code in RATING_MODE_CODES.items()}
+
+ELO_K_FACTOR = 32
+
+# Glicko-2: RD inicial alto para novatos convergirem rápido, limitado por baixo para o rating não congelar
+GLICKO2_DEFAULT_RD = 350.0
+GLICKO2_MIN_RD = 50.0
+GLICKO2_DEFAULT_VOL = 0.06
+GLICKO2_TAU = 0.5
+GLICKO2_SCALE = 173.7178
+GLICKO2_CENTER = 1500.0
+_EPSILON = 0.000001
+
+
+def elo_expected(rating: float, opponent_rating: float) -> float:
+    """Pontuação esperada no Elo."""
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def initial_rd(games_played: int = 0) -> float:
+    """
+    RD inicial de um jogador que ainda não tem RD salvo.
+
+    Novatos começam em GLICKO2_DEFAULT_RD; quem já jogou recebe o RD que teria após
+    `games_played` partidas contra adversários do mesmo nível, para não oscilar como novato.
+    """
+    q = math.log(10) / 400
+    info_per_game = q * q * 0.25
+    rd = 1 / math.sqrt(1 / GLICKO2_DEFAULT_RD ** 2 + max(games_played, 0) * info_per_game)
+    return max(rd, GLICKO2_MIN_RD)
+
+
+def _collect(games: Sequence[Tuple[str, str, float]]) -> Dict[str, list]:
+    """Agrupa as partidas do período por jogador: {id: [(adversário, pontuação)]}."""
+    results = {}
+    for player1_id, player2_id, score1 in games:
+        results.setdefault(player1_id, []).append((player2_id, score1))
+        results.setdefault(player2_id, []).append((player1_id, 1.0 - score1))
+    return results
+
+
+def elo_rate_period(states: Dict[str, dict], games: Sequence[Tuple[str, str, float]], k_factor: int = ELO_K_FACTOR) -> Dict[str, dict]:
+    """Elo de K fixo sobre um período: cada jogador soma K * (S - E) de todas as suas partidas, com os ratings de antes."""
+    new_states = {}
+    for player_id, results in _collect(games).items():
+        state = states[player_id]
+        rating = state['rating']
+        change = round(k_factor * sum(score - elo_expected(rating, states[opp]['rating']) for opp, score in results))
+        new_states[player_id] = dict(state, rating=rating + change)
+    return new_states
+
+
+def _g(phi: float) -> float:
+    return 1 / math.sqrt(1 + 3 * phi * phi / (math.pi * math.pi))
+
+
+def _new_volatility(phi: float, vol: float, v: float, delta: float, tau: float) -> float:
+    """Passo 5 do Glicko-2: nova volatilidade pelo método de Illinois."""
+    a = math.log(vol * vol)
+
+    def f(x):
+        ex = math.exp(x)
+        return ex * (delta * delta - phi * phi - v - ex) / (2 * (phi * phi + v + ex) ** 2) - (x - a) / (tau * tau)
+
+    A = a
+    if delta * delta > phi * phi + v:
+        B = math.log(delta * delta - phi * phi - v)
+    else:
+        k = 1
+        while f(a - k * tau) < 0:
+            k += 1
+        B = a - k * tau
+
+    fA, fB = f(A), f(B)
+    while abs(B - A) > _EPSILON:
+        C = A + (A - B) * fA / (fB - fA)
+        fC = f(C)
+        if fC * fB <= 0:
+            A, fA = B, fB
+        else:
+            fA /= 2
+        B, fB = C, fC
+    return math.exp(A / 2)
+
+
+def glicko2_rate_period(states: Dict[str, dict], games: Sequence[Tuple[str, str, float]], tau: float = GLICKO2_TAU) -> Dict[str, dict]:
+    """
+    Glicko-2 sobre um período de rating (ex: uma rodada suíça inteira).
+
+    Todos os jogadores são atualizados a partir dos valores de antes do período, numa única
+    passada pelas partidas agrupadas por jogador. Só quem jogou no período é atualizado.
+    """
+    # Converte todo mundo para a escala do Glicko-2 uma vez só
+    scaled = {
+        player_id: (
+            (state['rating'] - GLICKO2_CENTER) / GLICKO2_SCALE,
+            (state.get('rd') or GLICKO2_DEFAULT_RD) / GLICKO2_SCALE,
+        )
+        for player_id, state in states.items()
+    }
+
+    new_states = {}
+    for player_id, results in _collect(games).items():
+        state = states[player_id]
+        mu, phi = scaled[player_id]
+        vol = state.get('vol') or GLICKO2_DEFAULT_VOL
+
+        v_inv = 0.0
+        delta_sum = 0.0
+        for opp, score in results:
+            opp_mu, opp_phi = scaled[opp]
+            g = _g(opp_phi)
+            expected = 1 / (1 + math.exp(-g * (mu - opp_mu)))
+            v_inv += g * g * expected * (1 - expected)
+            delta_sum += g * (score - expected)
+
+        v = 1 / v_inv
+        new_vol = _new_volatility(phi, vol, v, v * delta_sum, tau)
+        phi_star = math.sqrt(phi * phi + new_vol * new_vol)
+        new_phi = 1 / math.sqrt(1 / (phi_star * phi_star) + 1 / v)
+        new_mu = mu + new_phi * new_phi * delta_sum
+
+        new_states[player_id] = dict(
+            state,
+            rating=round(new_mu * GLICKO2_SCALE + GLICKO2_CENTER),
+            rd=max(new_phi * GLICKO2_SCALE, GLICKO2_MIN_RD),
+            vol=new_vol,
+        )
+    return new_states
+
+
+RATING_ENGINES = {
+    'elo': elo_rate_period,
+    'glicko2': glicko2_rate_period,
+}
+
+
+def rate_period(states: Dict[str, dict], games: Sequence[Tuple[str, str, float]], system: str = None) -> Dict[str, dict]:
+    """
+    Processa um lote de resultados como um período de rating.
+
+    `states`: {player_id: {'rating', 'rd', 'vol'}} de todos os jogadores envolvidos.
+    `games`: [(player1_id, player2_id, pontuação do player1)] com 1, 0.5 ou 0.
+    Retorna {player_id: estado novo} apenas para quem jogou.
+    """
+    engine = RATING_ENGINES.get(system or RATING_SYSTEM, glicko2_rate_period)
+    return engine(states, games)
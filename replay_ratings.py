@@ -0,0 +1,214 @@
+"""
+Recalcula todos os ratings a partir do game_history (replay), com o motor de rating configurado.
+
+Percorre as partidas em ordem de played_at com um cursor em lotes, recalcula a trajetória de
+cada jogador em memória e, com --apply, grava numa única transação os ratings finais, o
+rating_history reconstruído e os ratings antes/depois de cada partida. Como no jogo ao vivo,
+cada partida avulsa é um período de rating e cada rodada suíça inteira é um único período,
+aplicado quando a última partida da rodada aparece no histórico.
+
+Uso:
+    python replay_ratings.py                  # dry-run: só mostra o diff com os ratings atuais
+    python replay_ratings.py --apply          # grava o resultado do replay
+    python replay_ratings.py --system elo     # força um motor (padrão: RATING_SYSTEM)
+"""
+import argparse
+import time
+from collections import Counter
+
+import database
+from bracket_seeding import RATING_MODES
+from rating_engine import (
+    DEFAULT_RATING, GLICKO2_DEFAULT_RD, GLICKO2_DEFAULT_VOL, RATING_MODE_CODES, RATING_SYSTEM, RATING_SYSTEMS, rate_period,
+)
+
+BATCH_SIZE = 5000
+
+
+def _player1_score(game) -> float:
+    """Pontuação do player1 numa partida do histórico (None se o resultado não for reconhecido)."""
+    if game['winner_id']:
+        if game['winner_id'] == game['player1_id']:
+            return 1.0
+        if game['winner_id'] == game['player2_id']:
+            return 0.0
+        return None
+    return 0.5 if game['result'] == 'draw' else None
+
+
+def iter_games(conn):
+    """Partidas que valem rating em ordem cronológica, lidas do cursor em lotes de BATCH_SIZE."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, player1_id, player2_id, winner_id, result, mode, game_url, played_at
+        FROM game_history
+        WHERE COALESCE(rated, 1) = 1
+        ORDER BY played_at, id
+    """)
+    while True:
+        rows = cursor.fetchmany(BATCH_SIZE)
+        if not rows:
+            break
+        yield from rows
+
+
+def load_swiss_rounds(conn):
+    """
+    Partidas suíças do histórico (ligadas pela URL ao swiss_pairings).
+
+    Retorna ({game_url: (torneio, rodada)}, Counter com quantas partidas de cada rodada estão no histórico).
+    """
+    rows = conn.execute("""
+        SELECT gh.game_url, sp.tournament_id, sp.round_number
+        FROM game_history gh
+        JOIN swiss_pairings sp ON sp.game_url = gh.game_url AND sp.player2_id IS NOT NULL
+        WHERE COALESCE(gh.rated, 1) = 1
+    """).fetchall()
+    rounds = {row['game_url']: (row['tournament_id'], row['round_number']) for row in rows}
+    return rounds, Counter((row['tournament_id'], row['round_number']) for row in rows)
+
+
+def replay(conn, system: str = None):
+    """
+    Reexecuta o histórico inteiro com os mesmos períodos de rating do jogo ao vivo: cada partida
+    avulsa é um período e cada rodada suíça é um período só, fechado na última partida da rodada.
+
+    Retorna (states, history, game_ratings, skipped):
+    - states: {(player_id, modo): {'rating', 'rd', 'vol'}} finais
+    - history: [(player_id, código do modo, rating, played_at)] para o rating_history
+    - game_ratings: [(p1_antes, p2_antes, p1_depois, p2_depois, game_id)]
+    """
+    states = {}
+    history = []
+    game_ratings = []
+    skipped = 0
+    swiss_rounds, round_sizes = load_swiss_rounds(conn)
+    open_rounds = {}
+
+    def _rate(mode: str, games: list, played_at):
+        """Aplica um período: games = [(game_id, player1_id, player2_id, pontuação do player1)]."""
+        before = {
+            player_id: states.get((player_id, mode)) or {
+                'rating': DEFAULT_RATING, 'rd': GLICKO2_DEFAULT_RD, 'vol': GLICKO2_DEFAULT_VOL
+            }
+            for _, player1_id, player2_id, _ in games for player_id in (player1_id, player2_id)
+        }
+        after = rate_period(before, [(player1_id, player2_id, score) for _, player1_id, player2_id, score in games], system)
+        for player_id, state in after.items():
+            states[(player_id, mode)] = state
+            history.append((player_id, RATING_MODE_CODES[mode], state['rating'], played_at))
+        for game_id, player1_id, player2_id, _ in games:
+            game_ratings.append((
+                before[player1_id]['rating'], before[player2_id]['rating'],
+                after[player1_id]['rating'], after[player2_id]['rating'], game_id
+            ))
+
+    for game in iter_games(conn):
+        mode = (game['mode'] or '').lower()
+        score = _player1_score(game)
+        player1_id, player2_id = game['player1_id'], game['player2_id']
+        valid = mode in RATING_MODES and score is not None and player1_id and player2_id and player1_id != player2_id
+        if not valid:
+            skipped += 1
+
+        round_key = swiss_rounds.get(game['game_url'])
+        if round_key is None:
+            if valid:
+                _rate(mode, [(game['id'], player1_id, player2_id, score)], game['played_at'])
+            continue
+
+        # Rodada suíça: acumula até a última partida dela aparecer
+        period = open_rounds.setdefault(round_key, {'seen': 0, 'mode': None, 'games': []})
+        period['seen'] += 1
+        if valid:
+            period['mode'] = period['mode'] or mode
+            period['games'].append((game['id'], player1_id, player2_id, score))
+        if period['seen'] == round_sizes[round_key]:
+            del open_rounds[round_key]
+            if period['games']:
+                _rate(period['mode'], period['games'], game['played_at'])
+
+    return states, history, game_ratings, skipped
+
+
+def diff_report(conn, states: dict, limit: int = 30) -> list:
+    """Compara os ratings atuais com os do replay. Retorna [(player_id, nome, modo, atual, replay)] ordenado pela diferença."""
+    rating_columns = ", ".join(f"rating_{mode}" for mode in RATING_MODES)
+    rows = conn.execute(f"SELECT discord_id, discord_username, {rating_columns} FROM players").fetchall()
+
+    diffs = []
+    for row in rows:
+        for mode in RATING_MODES:
+            current = row[f"rating_{mode}"] or DEFAULT_RATING
+            replayed = states.get((row['discord_id'], mode), {}).get('rating', DEFAULT_RATING)
+            if current != replayed:
+                diffs.append((row['discord_id'], row['discord_username'], mode, current, replayed))
+    diffs.sort(key=lambda d: -abs(d[4] - d[3]))
+    return diffs[:limit] if limit else diffs
+
+
+def apply_replay(conn, states: dict, history: list, game_ratings: list):
+    """Grava o replay numa única transação: ratings finais, rating_history e ratings das partidas."""
+    player_ids = [row['discord_id'] for row in conn.execute("SELECT discord_id FROM players").fetchall()]
+    known = set(player_ids)
+    cursor = conn.cursor()
+    try:
+        for mode in RATING_MODES:
+            # Quem não tem partidas no modo volta ao rating inicial
+            cursor.executemany(
+                f"UPDATE players SET rating_{mode} = ?, rd_{mode} = ?, vol_{mode} = ? WHERE discord_id = ?",
+                [
+                    (state['rating'], state.get('rd'), state.get('vol'), player_id)
+                    if (state := states.get((player_id, mode))) else (DEFAULT_RATING, None, None, player_id)
+                    for player_id in player_ids
+                ]
+            )
+        cursor.execute("DELETE FROM rating_history")
+        cursor.executemany(
+            """INSERT INTO rating_history (player_id, mode, rating, recorded_at)
+               VALUES (?, ?, ?, COALESCE(CAST(strftime('%s', ?) AS INTEGER), CAST(strftime('%s', 'now') AS INTEGER)))""",
+            [entry for entry in history if entry[0] in known]
+        )
+        cursor.executemany(
+            """UPDATE game_history SET player1_rating_before = ?, player2_rating_before = ?,
+                   player1_rating_after = ?, player2_rating_after = ? WHERE id = ?""",
+            game_ratings
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcula os ratings a partir do histórico de partidas.")
+    parser.add_argument('--apply', action='store_true', help="Grava o resultado (sem isso é só dry-run)")
+    parser.add_argument('--system', choices=RATING_SYSTEMS, default=RATING_SYSTEM, help="Motor de rating")
+    parser.add_argument('--limit', type=int, default=30, help="Linhas do diff a exibir (0 = todas)")
+    args = parser.parse_args()
+
+    conn = database.get_conn()
+    try:
+        started = time.perf_counter()
+        states, history, game_ratings, skipped = replay(conn, args.system)
+        elapsed = time.perf_counter() - started
+        print(f"🔁 Replay ({args.system}): {len(game_ratings)} partidas em {elapsed:.2f}s, {skipped} ignoradas, "
+              f"{len({player_id for player_id, _ in states})} jogadores")
+
+        diffs = diff_report(conn, states, args.limit)
+        if not diffs:
+            print("✅ Nenhuma diferença em relação aos ratings atuais.")
+        for player_id, name, mode, current, replayed in diffs:
+            print(f"  {name or player_id:<24} {mode:<8} {current:>5} -> {replayed:>5} ({replayed - current:+d})")
+
+        if args.apply:
+            apply_replay(conn, states, history, game_ratings)
+            print(f"✅ Ratings gravados e rating_history reconstruído ({len(history)} registros).")
+        else:
+            print("ℹ️ Dry-run: nada foi gravado. Use --apply para aplicar.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
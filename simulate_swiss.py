@@ -0,0 +1,215 @@
+"""
+Simulador e benchmark do sistema suíço.
+
+Cria um banco SQLite temporário com N jogadores sintéticos, joga M rodadas com um
+modelo de resultados determinístico (seed) usando SwissTournament.generate_pairings /
+update_standings e mede tempo, número de comandos SQL, revanches e distribuição de byes.
+
+Uso:
+    python simulate_swiss.py                       # 16, 64 e 256 jogadores
+    python simulate_swiss.py -n 128 -r 7 --seed 1  # cenário específico
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+
+# Adiciona o diretório atual ao path para importar database
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import database
+from swiss_tournament import SwissTournament
+
+DEFAULT_SIZES = (16, 64, 256)
+
+
+def expected_score(rating_a: int, rating_b: int) -> float:
+    """Pontuação esperada (Elo) de A contra B."""
+    return 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
+
+
+def play_game(rng: random.Random, rating1: int, rating2: int, draw_rate: float):
+    """Sorteia o resultado de uma partida. Retorna 1 (jogador 1), 2 (jogador 2) ou 0 (empate)."""
+    if rng.random() < draw_rate:
+        return 0
+    return 1 if rng.random() < expected_score(rating1, rating2) else 2
+
+
+class StatementCounter:
+    """Conta os comandos SQL executados numa conexão via set_trace_callback."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, statement):
+        self.count += 1
+
+    def attach(self, conn):
+        conn.set_trace_callback(self)
+
+
+def setup_database(db_path: str, n_players: int, rng: random.Random):
+    """Cria o schema no banco temporário, os jogadores sintéticos e o torneio."""
+    database.DB_NAME = db_path
+    # Silencia as mensagens de migração do schema
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(database.init_database())
+
+    ratings = {}
+    conn = database.get_conn()
+    cursor = conn.cursor()
+    for i in range(1, n_players + 1):
+        discord_id = f"{i:06d}"
+        rating = max(600, min(2800, int(rng.gauss(1500, 300))))
+        ratings[discord_id] = rating
+        cursor.execute('''
+            INSERT INTO players (discord_id, discord_username, rating_rapid)
+            VALUES (?, ?, ?)
+        ''', (discord_id, f"Sim{i}", rating))
+
+    cursor.execute('''
+        INSERT INTO swiss_tournaments (name, time_control, nb_rounds, created_by, status)
+        VALUES (?, '10+0', 0, 'simulator', 'in_progress')
+    ''', (f"Simulação {n_players} jogadores",))
+    tournament_id = cursor.lastrowid
+
+    cursor.executemany('''
+        INSERT INTO swiss_participants (tournament_id, player_id) VALUES (?, ?)
+    ''', [(tournament_id, discord_id) for discord_id in ratings])
+    conn.commit()
+    conn.close()
+    return tournament_id, ratings
+
+
+def run_simulation(n_players: int, n_rounds: int = None, seed: int = 42, draw_rate: float = 0.1) -> dict:
+    """Executa uma simulação completa e retorna as métricas coletadas."""
+    rng = random.Random(seed)
+    n_rounds = n_rounds or max(1, math.ceil(math.log2(n_players)))
+
+    tmp_dir = tempfile.mkdtemp(prefix="swiss_sim_")
+    original_db = database.DB_NAME
+    try:
+        tournament_id, ratings = setup_database(os.path.join(tmp_dir, "sim.db"), n_players, rng)
+
+        seen_pairs = set()
+        byes = Counter()
+        rematches = 0
+        unpaired = 0
+        pairing_time = standings_time = 0.0
+        pairing_sql = standings_sql = 0
+
+        for round_number in range(1, n_rounds + 1):
+            swiss = SwissTournament(tournament_id)
+            counter = StatementCounter()
+            counter.attach(swiss.conn)
+
+            start = time.perf_counter()
+            pairings = swiss.generate_pairings(round_number)
+            pairing_time += time.perf_counter() - start
+            pairing_sql += counter.count
+
+            paired = set()
+            for player1_id, player2_id in pairings:
+                paired.add(player1_id)
+                if player2_id is None:
+                    byes[player1_id] += 1
+                    continue
+                paired.add(player2_id)
+                pair = frozenset((player1_id, player2_id))
+                if pair in seen_pairs:
+                    rematches += 1
+                seen_pairs.add(pair)
+            unpaired += len(ratings) - len(paired)
+
+            # Registra resultados fora do contador (simula o fluxo do bot)
+            swiss.conn.set_trace_callback(None)
+            cursor = swiss.conn.cursor()
+            for player1_id, player2_id in pairings:
+                if player2_id is None:
+                    winner_id = player1_id
+                else:
+                    outcome = play_game(rng, ratings[player1_id], ratings[player2_id], draw_rate)
+                    winner_id = {0: None, 1: player1_id, 2: player2_id}[outcome]
+                cursor.execute('''
+                    INSERT INTO swiss_pairings
+                    (tournament_id, round_number, player1_id, player2_id, winner_id, status, finished_at)
+                    VALUES (?, ?, ?, ?, ?, 'finished', CURRENT_TIMESTAMP)
+                ''', (tournament_id, round_number, player1_id, player2_id, winner_id))
+            swiss.conn.commit()
+
+            counter.count = 0
+            counter.attach(swiss.conn)
+            start = time.perf_counter()
+            swiss.update_standings()
+            standings_time += time.perf_counter() - start
+            standings_sql += counter.count
+            swiss.close()
+
+        swiss = SwissTournament(tournament_id)
+        standings = swiss.get_participants()
+        swiss.close()
+
+        return {
+            'players': n_players,
+            'rounds': n_rounds,
+            'pairing_time': pairing_time,
+            'standings_time': standings_time,
+            'pairing_sql': pairing_sql,
+            'standings_sql': standings_sql,
+            'rematches': rematches,
+            'unpaired': unpaired,
+            'byes': byes,
+            'leader': standings[0] if standings else None,
+        }
+    finally:
+        database.DB_NAME = original_db
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def format_report(result: dict) -> str:
+    """Formata as métricas de uma simulação para o terminal."""
+    byes = result['byes']
+    bye_hist = Counter(byes.values())
+    bye_text = ", ".join(f"{count}x: {players} jogador(es)" for count, players in sorted(bye_hist.items())) or "nenhum"
+    total_time = result['pairing_time'] + result['standings_time']
+    lines = [
+        f"♟️ {result['players']} jogadores, {result['rounds']} rodadas",
+        f"   Tempo total: {total_time:.3f}s (pairings {result['pairing_time']:.3f}s, standings {result['standings_time']:.3f}s)",
+        f"   Comandos SQL: {result['pairing_sql'] + result['standings_sql']} (pairings {result['pairing_sql']}, standings {result['standings_sql']})",
+        f"   Revanches: {result['rematches']} | Jogadores sem pairing: {result['unpaired']}",
+        f"   Byes: {sum(byes.values())} ({bye_text})",
+    ]
+    leader = result.get('leader')
+    if leader:
+        lines.append(f"   Líder: {leader['discord_username']} com {leader['points']} pts")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador/benchmark de torneios suíços.")
+    parser.add_argument("-n", "--players", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Quantidade de jogadores (aceita vários valores)")
+    parser.add_argument("-r", "--rounds", type=int, default=None,
+                        help="Número de rodadas (padrão: ceil(log2(N)))")
+    parser.add_argument("--seed", type=int, default=42, help="Seed do modelo de resultados")
+    parser.add_argument("--draw-rate", type=float, default=0.1, help="Probabilidade de empate")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    for n_players in args.players:
+        result = run_simulation(n_players, args.rounds, args.seed, args.draw_rate)
+        print(format_report(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,80 +1,292 @@
-import subprocess
-import time
-import re
+"""
+Pool assíncrono de engines UCI (Stockfish) para análise pós-partida.
 
-class Stockfish:
-    def __init__(self, path="stockfish"):
+Cada engine é um processo persistente com stdin/stdout assíncronos (asyncio.create_subprocess_exec),
+então esperar a engine nunca bloqueia o event loop do bot. O pool sobe ENGINE_POOL_SIZE processos
+(por padrão um por núcleo, deixando um para o bot), cada um com Threads=1: muitas posições em paralelo
+rendem mais que uma posição com várias threads.
+
+Os jobs entram numa fila por usuário e os workers atendem os usuários em rodízio: quem manda uma
+partida de 80 lances não segura a fila de quem pediu uma análise curta depois.
+
+Configuração (.env): STOCKFISH_PATH, ENGINE_POOL_SIZE, ENGINE_HASH_MB.
+"""
+import asyncio
+import logging
+import os
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ENGINE_HASH_MB = int(os.getenv("ENGINE_HASH_MB", "64"))
+DEFAULT_MOVETIME_MS = 1000
+# Tempo extra além do movetime antes de considerar a engine travada
+JOB_TIMEOUT_MARGIN = 5.0
+# Limite quando o job só tem depth/nodes
+JOB_TIMEOUT = 30.0
+STOP_GRACE = 2.0
+
+
+def default_pool_size() -> int:
+    """ENGINE_POOL_SIZE do .env ou um processo por núcleo, deixando um livre para o bot."""
+    configured = os.getenv("ENGINE_POOL_SIZE")
+    if configured:
+        return max(1, int(configured))
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def parse_info(line: str, info: dict):
+    """Atualiza `info` com depth, nodes e score de uma linha 'info' (só a linha principal do multipv)."""
+    tokens = line.split()
+    if 'score' not in tokens or ('multipv' in tokens and tokens[tokens.index('multipv') + 1] != '1'):
+        return
+    i = 1
+    while i < len(tokens) - 1:
+        token = tokens[i]
+        if token == 'depth' or token == 'nodes':
+            info[token] = int(tokens[i + 1])
+        elif token == 'score' and i + 2 < len(tokens):
+            info['evaluation'] = {'type': tokens[i + 1], 'value': int(tokens[i + 2])}
+            i += 2
+        elif token == 'pv':
+            break
+        i += 2 if token in ('depth', 'seldepth', 'multipv', 'nodes', 'nps', 'time', 'hashfull', 'tbhits', 'currmovenumber') else 1
+
+
+class UCIEngine:
+    """Um processo UCI persistente. Não é seguro para uso concorrente: o pool dá um job por vez a cada engine."""
+
+    def __init__(self, path: str, hash_mb: int = ENGINE_HASH_MB):
         self.path = path
-        self.process = subprocess.Popen(
-            path,
-            universal_newlines=True,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+        self.hash_mb = hash_mb
+        self.process = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            self.path,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
         )
-        self._set_option("UCI_AnalyseMode", "true")
-        self._set_option("Contempt", 0) # No contempt for analysis
-        self._set_option("Threads", 4)
-        self._set_option("Hash", 256)
         self._put("uci")
-        self._wait_for_ready()
+        await self._read_until("uciok", JOB_TIMEOUT)
+        self._put("setoption name Threads value 1")
+        self._put(f"setoption name Hash value {self.hash_mb}")
+        self._put("setoption name UCI_AnalyseMode value true")
+        await self.ready()
+
+    def _put(self, command: str):
+        self.process.stdin.write(f"{command}\n".encode())
 
-    def _set_option(self, name, value):
-        self._put(f"setoption name {name} value {value}")
+    async def _readline(self) -> str:
+        line = await self.process.stdout.readline()
+        if not line:
+            raise RuntimeError("engine encerrou inesperadamente")
+        return line.decode(errors='replace').strip()
 
-    def _put(self, command):
-        if self.process.stdin:
-            self.process.stdin.write(f"{command}\n")
-            self.process.stdin.flush()
+    async def _read_until(self, prefix: str, timeout: float) -> str:
+        async def _read():
+            while True:
+                line = await self._readline()
+                if line.startswith(prefix):
+                    return line
+        return await asyncio.wait_for(_read(), timeout)
 
-    def _wait_for_ready(self):
+    async def ready(self):
         self._put("isready")
+        await self._read_until("readyok", JOB_TIMEOUT)
+
+    async def new_game(self):
+        self._put("ucinewgame")
+        await self.ready()
+
+    async def analyse(self, fen: str = None, moves: List[str] = None,
+                      depth: int = None, nodes: int = None, movetime: int = None) -> dict:
+        """
+        Analisa a posição (FEN ou inicial, mais os lances UCI). Retorna
+        {'evaluation': {'type': 'cp'|'mate', 'value'}, 'best_move', 'depth', 'nodes'}.
+        O score é do ponto de vista de quem joga na posição, como no protocolo UCI.
+        """
+        position = f"position fen {fen}" if fen else "position startpos"
+        if moves:
+            position += " moves " + " ".join(moves)
+        self._put(position)
+
+        go = ["go"]
+        if depth:
+            go += ["depth", str(depth)]
+        if nodes:
+            go += ["nodes", str(nodes)]
+        if movetime or not (depth or nodes):
+            movetime = movetime or DEFAULT_MOVETIME_MS
+            go += ["movetime", str(movetime)]
+        self._put(" ".join(go))
+        await self.process.stdin.drain()
+
+        timeout = movetime / 1000 + JOB_TIMEOUT_MARGIN if movetime else JOB_TIMEOUT
+        info = {'evaluation': {'type': 'cp', 'value': 0}, 'depth': 0, 'nodes': 0}
+
+        async def _search():
+            while True:
+                line = await self._readline()
+                if line.startswith("info"):
+                    parse_info(line, info)
+                elif line.startswith("bestmove"):
+                    parts = line.split()
+                    info['best_move'] = parts[1] if len(parts) > 1 and parts[1] != '(none)' else None
+                    return info
+
+        try:
+            return await asyncio.wait_for(_search(), timeout)
+        except asyncio.TimeoutError:
+            # Pede para parar e fica com o melhor até aqui; se nem assim responder, o pool descarta a engine
+            self._put("stop")
+            return await asyncio.wait_for(_search(), STOP_GRACE)
+
+    async def close(self):
+        if not self.alive:
+            return
+        try:
+            self._put("quit")
+            await asyncio.wait_for(self.process.wait(), STOP_GRACE)
+        except Exception:
+            self.process.kill()
+            await self.process.wait()
+
+
+@dataclass
+class EngineJob:
+    fen: Optional[str]
+    moves: Optional[List[str]]
+    limits: dict
+    future: asyncio.Future
+    new_game: bool = False
+
+
+@dataclass
+class _FairQueue:
+    """Uma fila FIFO por usuário, atendidas em rodízio."""
+    queues: Dict[str, deque] = field(default_factory=dict)
+    order: deque = field(default_factory=deque)
+    ready: asyncio.Condition = field(default_factory=asyncio.Condition)
+
+    async def put(self, user_id: str, job: EngineJob):
+        async with self.ready:
+            queue = self.queues.get(user_id)
+            if queue is None:
+                queue = self.queues[user_id] = deque()
+                self.order.append(user_id)
+            queue.append(job)
+            self.ready.notify()
+
+    async def get(self) -> EngineJob:
+        async with self.ready:
+            while not self.order:
+                await self.ready.wait()
+            user_id = self.order.popleft()
+            queue = self.queues[user_id]
+            job = queue.popleft()
+            if queue:
+                self.order.append(user_id)
+            else:
+                del self.queues[user_id]
+            return job
+
+    def pending(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+
+class EnginePool:
+    """N engines persistentes atendendo uma fila justa entre usuários."""
+
+    def __init__(self, path: str, size: int = None, hash_mb: int = ENGINE_HASH_MB):
+        self.path = path
+        self.size = size or default_pool_size()
+        self.hash_mb = hash_mb
+        self._queue = None
+        self._workers = []
+
+    def _ensure_started(self):
+        if self._workers:
+            return
+        self._queue = _FairQueue()
+        self._workers = [asyncio.create_task(self._worker(index)) for index in range(self.size)]
+        logger.info(f"♟️ Pool de engines iniciado: {self.size} processo(s) de {self.path}")
+
+    async def _worker(self, index: int):
+        engine = None
         while True:
-            line = self.process.stdout.readline().strip()
-            if line == "readyok":
-                break
-
-    def set_fen_position(self, fen_string):
-        self._put(f"position fen {fen_string}")
-
-    def get_evaluation(self, time_ms=3000):
-        self._put(f"go movetime {time_ms}")
-        return self._read_evaluation_output()
-
-    def _read_evaluation_output(self):
-        last_eval = {"type": "cp", "value": 0}
-        best_move = None
-        start_time = time.time()
-        timeout = 25  # 25 second timeout per move
-        
-        while time.time() - start_time < timeout:
+            job = await self._queue.get()
+            if job.future.done():  # cancelado enquanto esperava
+                continue
             try:
-                line = self.process.stdout.readline(1024).strip()
-                if not line:
-                    # If empty line received but no bestmove yet, continue waiting
-                    time.sleep(0.01)
-                    continue
-
-                # Look for 'info depth X score cp Y' or 'info depth X score mate Z'
-                match_cp = re.search(r"score cp (-?\d+)", line)
-                match_mate = re.search(r"score mate (-?\d+)", line)
-                match_bestmove = re.search(r"bestmove (\S+)", line)
-
-                if match_cp:
-                    last_eval = {"type": "cp", "value": int(match_cp.group(1))}
-                elif match_mate:
-                    last_eval = {"type": "mate", "value": int(match_mate.group(1))}
-                
-                if match_bestmove:
-                    best_move = match_bestmove.group(1)
-                    break  # Stop when bestmove is found
-
+                if engine is None or not engine.alive:
+                    engine = UCIEngine(self.path, self.hash_mb)
+                    await engine.start()
+                if job.new_game:
+                    await engine.new_game()
+                result = await engine.analyse(job.fen, job.moves, **job.limits)
+                if not job.future.done():
+                    job.future.set_result(result)
+            except asyncio.CancelledError:
+                if engine:
+                    await engine.close()
+                raise
             except Exception as e:
-                time.sleep(0.01)
-                continue
+                logger.warning(f"Engine {index} falhou, reiniciando: {e!r}")
+                if not job.future.done():
+                    job.future.set_exception(e)
+                if engine:
+                    await engine.close()
+                engine = None
 
-        return {"evaluation": last_eval, "best_move": best_move}
+    async def analyse(self, user_id, fen: str = None, moves: List[str] = None, depth: int = None,
+                      nodes: int = None, movetime: int = None, new_game: bool = False) -> dict:
+        """Enfileira uma posição para o usuário e espera o resultado (ver UCIEngine.analyse)."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        limits = {'depth': depth, 'nodes': nodes, 'movetime': movetime}
+        await self._queue.put(str(user_id), EngineJob(fen, moves, limits, future, new_game))
+        return await future
 
-    def __del__(self):
-        if self.process:
-            self.process.kill()
+    async def analyse_game(self, user_id, moves: List[str], fen: str = None, **limits) -> List[dict]:
+        """Analisa todas as posições da partida (antes do 1º lance até depois do último) em paralelo no pool."""
+        return await asyncio.gather(*(
+            self.analyse(user_id, fen, moves[:ply], **limits) for ply in range(len(moves) + 1)
+        ))
+
+    def pending(self) -> int:
+        return self._queue.pending() if self._queue else 0
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+_pool = None
+
+
+def get_engine_pool() -> Optional[EnginePool]:
+    """Pool compartilhado do bot (criado no primeiro uso). None se STOCKFISH_PATH não estiver configurado."""
+    global _pool
+    if _pool is None:
+        path = os.getenv("STOCKFISH_PATH")
+        if not path:
+            return None
+        _pool = EnginePool(path)
+    return _pool
+
+
+async def close_engine_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
@@ -1,6 +1,8 @@
 import chess
 import chess.pgn
-from stockfish import Stockfish
+import stockfish
+import eval_cache
+import asyncio
 import io
 import os
 import logging
@@ -8,6 +10,10 @@ from typing import Dict, Any, List, Optional
 
 logger = logging.getLogger(__name__)
 
+# Profundidade da análise pós-partida (/analisar) e perda mínima (centipeões) de cada classificação
+ANALYSIS_DEPTH = 14
+MOVE_CLASSES = (('blunders', 300), ('mistakes', 100), ('inaccuracies', 50))
+
 class GameAnalysis:
     """Análise de partida usando avaliações da API do Lichess"""
     
@@ -15,15 +21,6 @@ class GameAnalysis:
         self.moves = moves
         self.analysis: List[Dict[str, Any]] = []
 
-    def _init_stockfish(self):
-        """Initialize Stockfish lazily"""
-        if self.stockfish is None:
-            try:
-                self.stockfish = Stockfish(self.stockfish_path)
-            except Exception as e:
-                logger.error(f"Erro ao inicializar Stockfish: {e}")
-                raise
-
     def _eval_to_cp(self, eval_dict: Dict) -> int:
         """Convert evaluation to centipawns, handling mate"""
         if not eval_dict:
@@ -97,3 +94,109 @@ class GameAnalysis:
 def get_stockfish_path():
     """Gets the path to the Stockfish executable from the .env file."""
     return os.getenv("STOCKFISH_PATH")
+
+
+def _cache_entry(result: dict, white_to_move: bool) -> dict:
+    """Converte o resultado da engine (score do lado que joga) para uma entrada do eval_cache (ponto de vista das brancas)."""
+    evaluation = result['evaluation']
+    value = evaluation['value'] if white_to_move else -evaluation['value']
+    return {
+        'depth': result.get('depth') or 0,
+        'cp': None if evaluation['type'] == 'mate' else value,
+        'mate': value if evaluation['type'] == 'mate' else None,
+        'best_move': result.get('best_move'),
+    }
+
+
+async def analyze_game_with_engine(moves: List[str], user_id, fen: str = None,
+                                   depth: int = None, nodes: int = None, movetime: int = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Analisa a partida (lances UCI) no pool local de engines, com as posições em paralelo.
+
+    Posições já avaliadas com profundidade suficiente vêm do eval_cache (as aberturas quase
+    sempre); só as demais vão para o pool. Monta os lances no formato da API do Lichess e
+    reaproveita GameAnalysis, então o resultado é igual ao de analyze_game.
+    Retorna None se STOCKFISH_PATH não estiver configurado.
+    """
+    pool = stockfish.get_engine_pool()
+    if pool is None:
+        return None
+
+    board = chess.Board(fen) if fen else chess.Board()
+    keys = [eval_cache.position_key(board)]
+    white_to_move = [board.turn == chess.WHITE]
+    for move_uci in moves:
+        board.push_uci(move_uci)
+        keys.append(eval_cache.position_key(board))
+        white_to_move.append(board.turn == chess.WHITE)
+
+    entries = await eval_cache.get_evals(keys, depth or eval_cache.EVAL_CACHE_MIN_DEPTH)
+
+    # Só a primeira ocorrência de cada posição ainda não avaliada vai para o pool
+    pending = {}
+    for ply, key in enumerate(keys):
+        if key not in entries:
+            pending.setdefault(key, ply)
+    if pending:
+        results = await asyncio.gather(*(
+            pool.analyse(user_id, fen, moves[:ply], depth=depth, nodes=nodes, movetime=movetime)
+            for ply in pending.values()
+        ))
+        fresh = {key: _cache_entry(result, white_to_move[ply]) for (key, ply), result in zip(pending.items(), results)}
+        entries.update(fresh)
+        await eval_cache.store_evals(fresh, source='engine')
+    logger.info(f"Análise local: {len(keys) - len(pending)}/{len(keys)} posições vieram do cache")
+
+    api_moves = []
+    for ply, move_uci in enumerate(moves, start=1):
+        after = entries[keys[ply]]
+        api_move = {'uci': move_uci, 'best': entries[keys[ply - 1]].get('best_move') or ''}
+        if after.get('mate') is not None:
+            api_move['mate'] = after['mate']
+        else:
+            api_move['eval'] = after.get('cp')
+        api_moves.append(api_move)
+    return GameAnalysis(api_moves).analyze_game()
+
+
+def moves_from_pgn(pgn: str):
+    """
+    (fen inicial, lances UCI da linha principal, é Chess960) de um PGN. O fen é None na posição
+    padrão; partidas de posição personalizada trazem [FEN]/[SetUp]. Retorna (None, None, False)
+    se não der para ler.
+    """
+    try:
+        game = chess.pgn.read_game(io.StringIO(pgn))
+    except Exception:
+        return None, None, False
+    if game is None:
+        return None, None, False
+    board = game.board()
+    fen = None if board.fen() == chess.STARTING_FEN else board.fen()
+    return fen, [move.uci() for move in game.mainline_moves()], board.chess960
+
+
+def summarize_analysis(analysis: List[Dict[str, Any]], worst: int = 3) -> Dict[str, Any]:
+    """
+    Resumo por cor: lances iguais ao melhor da engine e imprecisões/erros/erros graves pela perda
+    de avaliação (eval_change > 0 é perda para quem jogou). Inclui os `worst` piores lances da partida.
+    """
+    summary = {color: {'moves': 0, 'best': 0, **{name: 0 for name, _ in MOVE_CLASSES}} for color in ('white', 'black')}
+    losses = []
+    for move in analysis:
+        color = 'white' if move['ply'] % 2 == 1 else 'black'
+        side = summary[color]
+        side['moves'] += 1
+        side['best'] += int(move['is_best'])
+        loss = move['eval_change']
+        if loss is None:
+            continue
+        for name, threshold in MOVE_CLASSES:
+            if loss >= threshold:
+                side[name] += 1
+                break
+        if loss >= MOVE_CLASSES[-1][1]:
+            losses.append((loss, move, color))
+    losses.sort(key=lambda item: -item[0])
+    summary['worst'] = [dict(move, color=color, loss=loss) for loss, move, color in losses[:worst]]
+    return summary
@@ -0,0 +1,113 @@
+import json
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+# Ordem de desempate usada na classificação do torneio suíço (colunas de swiss_participants).
+# Segue a recomendação da FIDE para sistema suíço: Buchholz Cut-1, Buchholz, Sonneborn-Berger,
+# pontuação progressiva, confronto direto e número de vitórias; Buchholz mediano como último critério.
+STANDINGS_ORDER_SQL = (
+    "sp.points DESC, sp.buchholz_cut1 DESC, sp.tiebreak_score DESC, sp.sonneborn_berger DESC, "
+    "sp.progressive_score DESC, sp.direct_encounter DESC, sp.wins DESC, sp.median_buchholz DESC"
+)
+
+# Colunas de desempate calculadas por compute_tiebreaks (além de points/wins/draws/losses)
+TIEBREAK_COLUMNS = (
+    'tiebreak_score', 'buchholz_cut1', 'median_buchholz', 'sonneborn_berger',
+    'direct_encounter', 'progressive_score', 'h2h_record',
+)
+
+
+def _game_scores(player1_id: str, player2_id: Optional[str], winner_id: Optional[str]):
+    """Retorna os pontos (jogador 1, jogador 2) de um pairing finalizado."""
+    if player2_id is None:
+        # Bye: o jogador 1 recebe o ponto
+        return 1.0, 0.0
+    if winner_id is None:
+        return 0.5, 0.5
+    if winner_id == player1_id:
+        return 1.0, 0.0
+    if winner_id == player2_id:
+        return 0.0, 1.0
+    # Vencedor inválido (ex: jogador removido): ninguém pontua
+    return 0.0, 0.0
+
+
+def compute_tiebreaks(player_ids: Iterable[str], games: Iterable) -> Dict[str, Dict]:
+    """
+    Calcula pontuação e todos os critérios de desempate de um torneio suíço numa única passada.
+
+    `games` são os pairings finalizados, com as chaves round_number, player1_id, player2_id e
+    winner_id (ex: linhas de swiss_pairings). Byes contam como vitória, mas não entram no
+    Buchholz/Sonneborn-Berger por não terem adversário.
+
+    Retorna {player_id: {points, wins, draws, losses, tiebreak_score, buchholz_cut1,
+    median_buchholz, sonneborn_berger, direct_encounter, progressive_score, h2h_record}}.
+    """
+    player_ids = [str(pid) for pid in player_ids]
+    points = dict.fromkeys(player_ids, 0.0)
+    wins = dict.fromkeys(player_ids, 0)
+    draws = dict.fromkeys(player_ids, 0)
+    losses = dict.fromkeys(player_ids, 0)
+    # Matriz de confrontos: h2h[jogador][oponente] = pontos obtidos contra o oponente
+    h2h: Dict[str, Dict[str, float]] = {pid: defaultdict(float) for pid in player_ids}
+    # Lista de (oponente, pontos obtidos) por jogador, uma entrada por partida
+    results: Dict[str, List] = {pid: [] for pid in player_ids}
+    round_points: Dict[str, Dict[int, float]] = {pid: defaultdict(float) for pid in player_ids}
+
+    for game in games:
+        player1_id = str(game['player1_id'])
+        player2_id = str(game['player2_id']) if game['player2_id'] is not None else None
+        winner_id = str(game['winner_id']) if game['winner_id'] is not None else None
+        score1, score2 = _game_scores(player1_id, player2_id, winner_id)
+        round_number = int(game['round_number'] or 0)
+
+        for player_id, opponent_id, score in ((player1_id, player2_id, score1), (player2_id, player1_id, score2)):
+            if player_id is None or player_id not in points:
+                continue
+            points[player_id] += score
+            round_points[player_id][round_number] += score
+            if score == 1.0:
+                wins[player_id] += 1
+            elif score == 0.5:
+                draws[player_id] += 1
+            elif winner_id is not None:
+                losses[player_id] += 1
+            if opponent_id is not None:
+                results[player_id].append((opponent_id, score))
+                h2h[player_id][opponent_id] += score
+
+    # Confronto direto: pontos obtidos contra os demais jogadores empatados na mesma pontuação
+    tied_groups = defaultdict(set)
+    for player_id, total in points.items():
+        tied_groups[total].add(player_id)
+
+    standings = {}
+    for player_id in player_ids:
+        opponent_scores = sorted(points.get(opp, 0.0) for opp, _ in results[player_id])
+        buchholz = sum(opponent_scores)
+        sonneborn_berger = sum(points.get(opp, 0.0) * score for opp, score in results[player_id])
+
+        progressive = 0.0
+        running = 0.0
+        for round_number in sorted(round_points[player_id]):
+            running += round_points[player_id][round_number]
+            progressive += running
+
+        tied = tied_groups[points[player_id]]
+        direct_encounter = sum(score for opp, score in h2h[player_id].items() if opp in tied)
+
+        standings[player_id] = {
+            'points': points[player_id],
+            'wins': wins[player_id],
+            'draws': draws[player_id],
+            'losses': losses[player_id],
+            'tiebreak_score': buchholz,
+            'buchholz_cut1': buchholz - opponent_scores[0] if opponent_scores else 0.0,
+            'median_buchholz': float(sum(opponent_scores[1:-1])),
+            'sonneborn_berger': sonneborn_berger,
+            'direct_encounter': float(direct_encounter),
+            'progressive_score': progressive,
+            'h2h_record': json.dumps(dict(h2h[player_id]), sort_keys=True),
+        }
+
+    return standings
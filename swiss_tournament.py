@@ -1,17 +1,15 @@
-import sqlite3
 import logging
 from typing import List, Dict, Optional, Tuple
 from collections import defaultdict
 
-logger = logging.getLogger(__name__)
+import database
+from swiss_tiebreaks import STANDINGS_ORDER_SQL, compute_tiebreaks
 
-DB_NAME = 'legion_chess.db'
+logger = logging.getLogger(__name__)
 
 def get_conn():
-    """Cria uma conexão com o banco de dados."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Cria uma conexão com o banco de dados (mesma configuração do database.py: timeout e WAL)."""
+    return database.get_conn()
 
 class SwissTournament:
     def __init__(self, tournament_id: int):
@@ -30,12 +28,12 @@ class SwissTournament:
     def get_participants(self) -> List[Dict]:
         """Obtém todos os participantes do torneio."""
         cursor = self.conn.cursor()
-        cursor.execute('''
+        cursor.execute(f'''
             SELECT sp.*, p.discord_username, p.rating_blitz, p.rating_bullet, p.rating_rapid, p.rating_classic
             FROM swiss_participants sp
             LEFT JOIN players p ON sp.player_id = p.discord_id
             WHERE sp.tournament_id = ?
-            ORDER BY sp.points DESC, sp.sonneborn_berger DESC, sp.tiebreak_score DESC, sp.wins DESC
+            ORDER BY {STANDINGS_ORDER_SQL}
         ''', (self.tournament_id,))
         results = cursor.fetchall()
 
@@ -248,45 +246,38 @@ class SwissTournament:
             return False
 
     def update_standings(self) -> bool:
-        """Atualiza os standings (pontuação e todos os tiebreak criteria) de todos os participantes."""
+        """
+        Atualiza os standings (pontuação e todos os tiebreak criteria) de todos os participantes.
+
+        Lê os pairings finalizados numa única consulta, calcula os desempates em memória
+        (swiss_tiebreaks) e grava tudo com um único executemany.
+        """
         try:
             cursor = self.conn.cursor()
-            participants = self.get_participants()
-
-            for participant in participants:
-                player_id = participant['player_id']
-
-                cursor.execute('''
-                    SELECT COUNT(*) as wins FROM swiss_pairings
-                    WHERE tournament_id = ? AND winner_id = ?
-                ''', (self.tournament_id, player_id))
-                wins = cursor.fetchone()['wins']
-
-                cursor.execute('''
-                    SELECT COUNT(*) as draws FROM swiss_pairings
-                    WHERE tournament_id = ? AND status = 'finished' AND 
-                    (player1_id = ? OR player2_id = ?) AND winner_id IS NULL
-                ''', (self.tournament_id, player_id, player_id))
-                draws = cursor.fetchone()['draws']
-
-                cursor.execute('''
-                    SELECT COUNT(*) as losses FROM swiss_pairings
-                    WHERE tournament_id = ? AND status = 'finished' AND 
-                    (player1_id = ? OR player2_id = ?) AND winner_id IS NOT NULL AND winner_id != ?
-                ''', (self.tournament_id, player_id, player_id, player_id))
-                losses = cursor.fetchone()['losses']
-
-                points = float(wins) + (float(draws) * 0.5)
-                tiebreak = self.calculate_tiebreak(player_id)
-                sonneborn_berger = self.calculate_sonneborn_berger(player_id)
+            cursor.execute('''
+                SELECT player_id FROM swiss_participants WHERE tournament_id = ?
+            ''', (self.tournament_id,))
+            player_ids = [row['player_id'] for row in cursor.fetchall()]
 
-                cursor.execute('''
-                    UPDATE swiss_participants
-                    SET points = ?, tiebreak_score = ?, sonneborn_berger = ?, 
-                        wins = ?, draws = ?, losses = ?
-                    WHERE tournament_id = ? AND player_id = ?
-                ''', (points, tiebreak, sonneborn_berger, wins, draws, losses, 
-                      self.tournament_id, player_id))
+            cursor.execute('''
+                SELECT round_number, player1_id, player2_id, winner_id FROM swiss_pairings
+                WHERE tournament_id = ? AND status = 'finished'
+            ''', (self.tournament_id,))
+            standings = compute_tiebreaks(player_ids, cursor.fetchall())
+
+            cursor.executemany('''
+                UPDATE swiss_participants
+                SET points = ?, wins = ?, draws = ?, losses = ?,
+                    tiebreak_score = ?, buchholz_cut1 = ?, median_buchholz = ?, sonneborn_berger = ?,
+                    direct_encounter = ?, progressive_score = ?, h2h_record = ?
+                WHERE tournament_id = ? AND player_id = ?
+            ''', [
+                (row['points'], row['wins'], row['draws'], row['losses'],
+                 row['tiebreak_score'], row['buchholz_cut1'], row['median_buchholz'], row['sonneborn_berger'],
+                 row['direct_encounter'], row['progressive_score'], row['h2h_record'],
+                 self.tournament_id, player_id)
+                for player_id, row in standings.items()
+            ])
 
             self.conn.commit()
             return True
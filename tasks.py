@@ -7,6 +7,7 @@ import traceback
 import discord
 import database
 import lichess_api
+import opening_index
 
 from discord.ext import tasks
 
@@ -158,6 +159,7 @@ class ChallengeMonitor:
                 mode = ch.get('time_control_mode', 'blitz')
                 is_draw = outcome.get('is_draw', False)
                 rating_changes = None
+                achievement_events = []
 
                 if is_draw:
                     result = 'draw'
@@ -300,12 +302,12 @@ class ChallengeMonitor:
                                 await database.update_player_stats(linked_player, mode, 'win')
                                 await database.update_player_stats(other_player, mode, 'loss')
                                 logger.info(f"Estatísticas atualizadas (um anônimo presente): {linked_player} (win), {other_player} (loss)")
-                                await database.check_and_unlock_achievements(linked_player, mode, 'win', other_player)
                                 if is_rated:
                                     rating_changes = await database.apply_match_ratings(linked_player, other_player, mode)
                                     if rating_changes:
                                         logger.info(f"Ratings atualizados para desafio {ch.get('id')} (um anônimo presente)")
-                                        await database.check_and_unlock_achievements(linked_player, mode, 'win', other_player)
+                                achievement_events.append((linked_player, 'win', other_player))
+                                achievement_events.append((other_player, 'loss', linked_player))
                             elif p_black and not p_white:
                                 linked_player = p_black['discord_id']
                                 other_player = challenger_id if str(challenger_id) != str(linked_player) else challenged_id
@@ -316,6 +318,8 @@ class ChallengeMonitor:
                                     rating_changes = await database.apply_match_ratings(linked_player, other_player, mode)
                                     if rating_changes:
                                         logger.info(f"Ratings atualizados para desafio {ch.get('id')} (um anônimo presente)")
+                                achievement_events.append((linked_player, 'win', other_player))
+                                achievement_events.append((other_player, 'loss', linked_player))
                             else:
                                 # Both players linked — standard flow
                                 if not is_swiss_game:
@@ -323,16 +327,11 @@ class ChallengeMonitor:
                                     await database.update_player_stats(loser_id, mode, 'loss')
                                     logger.info(f"Estatísticas atualizadas: {winner_id} (win), {loser_id} (loss)")
 
-                                    await database.check_and_unlock_achievements(winner_id, mode, 'win', loser_id)
-                                    await database.check_and_unlock_achievements(loser_id, mode, 'loss', winner_id)
-
                                     # Sempre atualiza rating se is_rated=True
                                     if is_rated:
                                         rating_changes = await database.apply_match_ratings(winner_id, loser_id, mode)
                                         if rating_changes:
                                             logger.info(f"Ratings atualizados para desafio {ch.get('id')}")
-                                            await database.check_and_unlock_achievements(winner_id, mode, 'win', loser_id)
-                                            await database.check_and_unlock_achievements(loser_id, mode, 'loss', winner_id)
                                             try:
                                                 from cogs.rankings import Rankings
                                                 rankings_cog = self.bot.get_cog('Rankings')
@@ -342,6 +341,10 @@ class ChallengeMonitor:
                                                 logger.error(f"Erro ao atualizar ranking fixo para desafio {ch.get('id')}: {e}")
                                         else:
                                             logger.warning(f"Falha ao atualizar ratings para desafio {ch.get('id')}")
+
+                                    # Achievements: uma avaliação por jogador por partida, depois de salvar o histórico
+                                    achievement_events.append((winner_id, 'win', loser_id))
+                                    achievement_events.append((loser_id, 'loss', winner_id))
                                 else:
                                     logger.info(f"Jogo suíço finalizado: {winner_id} venceu {loser_id} (sem atualização de ratings)")
                         elif result == 'draw':
@@ -366,6 +369,14 @@ class ChallengeMonitor:
                                         rating_changes = await database.apply_draw_ratings(players_for_rating[0], players_for_rating[1], mode)
                                         if rating_changes:
                                             logger.info(f"Ratings atualizados (empate) para desafio {ch.get('id')}")
+
+                                # Empate zera a sequência de vitórias dos jogadores vinculados
+                                if challenger_id and challenged_id:
+                                    for linked in (p_white, p_black):
+                                        if linked and linked.get('discord_id'):
+                                            linked_id = linked['discord_id']
+                                            opponent = challenged_id if str(challenger_id) == str(linked_id) else challenger_id
+                                            achievement_events.append((linked_id, 'draw', opponent))
                 except Exception as e:
                     logger.error(f"Failed to update stats/ratings for challenge {challenge_id}: {e}", exc_info=True)
 
@@ -427,11 +438,17 @@ class ChallengeMonitor:
                         p2_rating_before=p2_rating_before,
                         p1_rating_after=p1_rating_after,
                         p2_rating_after=p2_rating_after,
+                        rated=is_rated,
+                        **game_details(outcome, p1_id, p_white, p_black),
                     )
                     logger.info(f"Partida salva no histórico para desafio {challenge_id}")
                 except Exception as e:
                     logger.error(f"Erro ao salvar partida no histórico para desafio {challenge_id}: {e}", exc_info=True)
 
+                # Achievements depois do histórico: o confronto direto já inclui esta partida
+                for player_id, player_result, opponent_id in achievement_events:
+                    await database.check_and_unlock_achievements(player_id, mode, player_result, opponent_id)
+
 
                 # Verificar se é torneio (para atualizar standings se necessário)
                 try:
@@ -453,6 +470,9 @@ class ChallengeMonitor:
                         swiss_game_pairing = await database.get_swiss_pairing_by_game_url(ch.get('game_url'))
                         logger.info(f"🔍 Swiss pairing por game_url {ch.get('game_url')}: {swiss_game_pairing}")
 
+                    if tournament_match and not (swiss_pairing or swiss_game_pairing):
+                        await record_tournament_result(tournament_match, result, winner_id)
+
                     if swiss_pairing or swiss_game_pairing:
                         # Determinar qual pairing usar
                         active_pairing = swiss_pairing or swiss_game_pairing
@@ -977,6 +997,36 @@ async def create_result_embeds(bot, ch, outcome, winner_id, loser_id, result, ra
 
     return embeds_to_send
 
+def game_details(outcome, p1_id, p_white, p_black) -> dict:
+    """Cor do player1, abertura e duração da partida no Lichess, para o histórico e os agregados."""
+    player1_color = None
+    if p_white and str(p_white.get('discord_id')) == str(p1_id):
+        player1_color = 'white'
+    elif p_black and str(p_black.get('discord_id')) == str(p1_id):
+        player1_color = 'black'
+    elif p_white or p_black:
+        # Só o adversário está vinculado ao Lichess: o player1 tem a outra cor
+        player1_color = 'black' if p_white else 'white'
+    game_stats = (outcome or {}).get('game_stats') or {}
+    return {
+        'player1_color': player1_color,
+        'opening_eco': game_stats.get('eco'),
+        'opening_name': game_stats.get('opening'),
+        'plies': game_stats.get('moves'),
+    }
+
+async def record_tournament_result(tournament_match, result, winner_id):
+    """Registra o resultado de uma partida de torneio (bracket, todos-contra-todos ou arena) e libera as próximas."""
+    if result not in ('win', 'draw') or (result == 'win' and not winner_id):
+        logger.info(f"Partida de torneio {tournament_match['id']} terminou sem resultado válido ({result}); aguardando definição")
+        return None
+    advance = await database.record_tournament_match_result(tournament_match['id'], winner_id if result == 'win' else None)
+    if advance is None:
+        logger.info(f"Partida de torneio {tournament_match['id']} não avançou (já finalizada ou empate em eliminatória)")
+    else:
+        logger.info(f"🏆 Partida de torneio {tournament_match['id']} registrada ({result}, vencedor {winner_id}): {advance}")
+    return advance
+
 async def process_challenge_result(bot, ch):
     """Processa o resultado de um desafio individual (usado para finalização manual)."""
     game_url = ch.get('game_url')
@@ -1034,6 +1084,7 @@ async def process_challenge_result(bot, ch):
         mode = ch.get('time_control_mode', 'blitz')
         is_draw = outcome.get('is_draw', False)
         rating_changes = None
+        achievement_events = []
 
         if is_draw:
             result = 'draw'
@@ -1183,39 +1234,34 @@ async def process_challenge_result(bot, ch):
                         await database.update_player_stats(linked_player, mode, 'win')
                         await database.update_player_stats(other_player, mode, 'loss')
                         logger.info(f"Estatísticas atualizadas (um anônimo presente): {linked_player} (win), {other_player} (loss)")
-                        await database.check_and_unlock_achievements(linked_player, mode, 'win', other_player)
                         if is_rated:
                             rating_changes = await database.apply_match_ratings(linked_player, other_player, mode)
                             if rating_changes:
                                 logger.info(f"Ratings atualizados para desafio {ch['id']} (um anônimo presente)")
-                                await database.check_and_unlock_achievements(linked_player, mode, 'win', other_player)
+                        achievement_events.append((linked_player, 'win', other_player))
+                        achievement_events.append((other_player, 'loss', linked_player))
                     elif p_black and not p_white:
                         linked_player = p_black['discord_id']
                         other_player = challenger_id if str(challenger_id) != str(linked_player) else challenged_id
                         await database.update_player_stats(linked_player, mode, 'win')
                         await database.update_player_stats(other_player, mode, 'loss')
                         logger.info(f"Estatísticas atualizadas (um anônimo presente): {linked_player} (win), {other_player} (loss)")
-                        await database.check_and_unlock_achievements(linked_player, mode, 'win', other_player)
                         if is_rated:
                             rating_changes = await database.apply_match_ratings(linked_player, other_player, mode)
                             if rating_changes:
                                 logger.info(f"Ratings atualizados para desafio {ch['id']} (um anônimo presente)")
-                                await database.check_and_unlock_achievements(linked_player, mode, 'win', other_player)
+                        achievement_events.append((linked_player, 'win', other_player))
+                        achievement_events.append((other_player, 'loss', linked_player))
                     else:
                         # Both linked — standard flow
                         await database.update_player_stats(winner_id, mode, 'win')
                         await database.update_player_stats(loser_id, mode, 'loss')
                         logger.info(f"Estatísticas atualizadas: {winner_id} (win), {loser_id} (loss)")
 
-                        await database.check_and_unlock_achievements(winner_id, mode, 'win', loser_id)
-                        await database.check_and_unlock_achievements(loser_id, mode, 'loss', winner_id)
-
                         if is_rated:
                             rating_changes = await database.apply_match_ratings(winner_id, loser_id, mode)
                             if rating_changes:
                                 logger.info(f"Ratings atualizados para desafio {ch['id']}")
-                                await database.check_and_unlock_achievements(winner_id, mode, 'win', loser_id)
-                                await database.check_and_unlock_achievements(loser_id, mode, 'loss', winner_id)
                                 try:
                                     from cogs.rankings import Rankings
                                     rankings_cog = bot.get_cog('Rankings')
@@ -1223,6 +1269,10 @@ async def process_challenge_result(bot, ch):
                                         await rankings_cog.update_fixed_ranking()
                                 except Exception as e:
                                     logger.error(f"Erro ao atualizar ranking fixo para desafio {ch['id']}: {e}")
+
+                        # Achievements: uma avaliação por jogador por partida, depois de salvar o histórico
+                        achievement_events.append((winner_id, 'win', loser_id))
+                        achievement_events.append((loser_id, 'loss', winner_id))
                 elif result == 'draw':
                     # In draw, credit draw to linked participants
                     if p_white and p_white.get('discord_id'):
@@ -1235,6 +1285,14 @@ async def process_challenge_result(bot, ch):
                         rating_changes = await database.apply_draw_ratings(p_white['discord_id'], p_black['discord_id'], mode)
                         if rating_changes:
                             logger.info(f"Ratings atualizados (empate) para desafio {ch['id']}")
+
+                    # Empate zera a sequência de vitórias dos jogadores vinculados
+                    if challenger_id and challenged_id:
+                        for linked in (p_white, p_black):
+                            if linked and linked.get('discord_id'):
+                                linked_id = linked['discord_id']
+                                opponent = challenged_id if str(challenger_id) == str(linked_id) else challenger_id
+                                achievement_events.append((linked_id, 'draw', opponent))
         except Exception as e:
             logger.error(f"Failed to update stats/ratings for challenge {ch['id']}: {e}", exc_info=True)
 
@@ -1285,11 +1343,25 @@ async def process_challenge_result(bot, ch):
                 p2_rating_before=p2_rating_before,
                 p1_rating_after=p1_rating_after,
                 p2_rating_after=p2_rating_after,
+                rated=is_rated,
+                **game_details(outcome, p1_id, p_white, p_black),
             )
             logger.info(f"Partida salva no histórico para desafio {ch['id']}")
         except Exception as e:
             logger.error(f"Erro ao salvar partida no histórico para desafio {ch['id']}: {e}", exc_info=True)
 
+        # Achievements depois do histórico: o confronto direto já inclui esta partida
+        for player_id, player_result, opponent_id in achievement_events:
+            await database.check_and_unlock_achievements(player_id, mode, player_result, opponent_id)
+
+        # Partida de torneio (bracket, todos-contra-todos ou arena): registra e libera as próximas
+        try:
+            tournament_match = await database.get_tournament_match_by_challenge(ch['id'])
+            if tournament_match:
+                await record_tournament_result(tournament_match, result, winner_id)
+        except Exception as e:
+            logger.error(f"Erro ao registrar resultado de torneio para desafio {ch['id']}: {e}", exc_info=True)
+
 
         # Announce result to channel
         try:
@@ -1423,6 +1495,24 @@ async def check_games_loop():
     # Limpar jogos inválidos a cada 10 execuções (20 minutos)
     if check_games_loop.current_loop % 10 == 0:
         await cleanup_invalid_games()
+    # Compactar o histórico de ratings antigo uma vez por dia (720 execuções de 2 minutos)
+    if check_games_loop.current_loop % 720 == 0:
+        try:
+            removed = await database.downsample_rating_history()
+            if removed:
+                logger.info(f"📉 Histórico de ratings compactado: {removed} ponto(s) antigos removidos")
+        except Exception as e:
+            logger.error(f"Erro ao compactar histórico de ratings: {e}")
+    # Indexar aberturas das partidas novas a cada hora (em segundo plano)
+    if check_games_loop.current_loop % 30 == 0:
+        opening_index.schedule_opening_index()
+    # Encerrar arenas que já passaram do horário
+    try:
+        finished = await database.finish_due_arena_tournaments()
+        if finished:
+            logger.info(f"🏟️ Arenas finalizadas: {finished}")
+    except Exception as e:
+        logger.error(f"Erro ao finalizar arenas: {e}")
 
 async def get_next_scheduled_challenge_time():
     """Retorna o datetime do próximo desafio agendado futuro, ou None se não houver."""
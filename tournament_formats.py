@@ -0,0 +1,85 @@
+import heapq
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Formatos de torneio (coluna tournaments.format)
+FORMAT_KNOCKOUT = 'knockout'
+FORMAT_ROUND_ROBIN = 'round_robin'
+FORMAT_ARENA = 'arena'
+TOURNAMENT_FORMATS = (FORMAT_KNOCKOUT, FORMAT_ROUND_ROBIN, FORMAT_ARENA)
+
+# Sequência de vitórias a partir da qual o jogador da arena fica "em chamas" (pontos em dobro)
+ARENA_STREAK_BONUS = 2
+
+
+def berger_schedule(player_ids: Sequence[str]) -> List[List[Tuple[str, Optional[str]]]]:
+    """
+    Gera todas as rodadas de um todos-contra-todos (método do círculo das tabelas de Berger).
+
+    Retorna uma lista de rodadas; cada rodada é uma lista de (brancas, pretas). Com número ímpar
+    de jogadores, quem enfrenta None folga na rodada. O jogador fixo alterna as cores a cada rodada,
+    o que deixa todos com diferença de no máximo uma partida de brancas.
+    """
+    players = list(player_ids)
+    if len(players) < 2:
+        return []
+    if len(players) % 2:
+        players.append(None)
+
+    n = len(players)
+    fixed = players[-1]
+    rotating = players[:-1]
+    rounds = []
+    for round_index in range(n - 1):
+        pairs = []
+        if round_index % 2 == 0:
+            pairs.append((rotating[0], fixed))
+        else:
+            pairs.append((fixed, rotating[0]))
+        for i in range(1, n // 2):
+            pairs.append((rotating[i], rotating[-i]))
+
+        # Folga sempre como (jogador, None)
+        rounds.append([(b, None) if a is None else (a, b) for a, b in pairs])
+        rotating = rotating[-1:] + rotating[:-1]
+    return rounds
+
+
+def round_robin_points(result: str) -> float:
+    """Pontos do todos-contra-todos: vitória 1, empate 0.5, derrota 0."""
+    return {'win': 1.0, 'draw': 0.5}.get(result, 0.0)
+
+
+def arena_points(result: str, streak: int) -> Tuple[float, int]:
+    """
+    Pontos da arena (estilo Lichess): vitória 2, empate 1, derrota 0, em dobro com sequência
+    de ARENA_STREAK_BONUS vitórias. Retorna (pontos, nova sequência).
+    """
+    on_fire = streak >= ARENA_STREAK_BONUS
+    if result == 'win':
+        return (4.0 if on_fire else 2.0), streak + 1
+    if result == 'draw':
+        return (2.0 if on_fire else 1.0), 0
+    return 0.0, 0
+
+
+def pair_arena(waiting: Sequence[Dict], last_opponents: Dict[str, str] = None) -> List[Tuple[str, str]]:
+    """
+    Emparelha a fila de espera da arena por faixa de pontuação.
+
+    `waiting` são dicts com player_id, points e rating. Usa um heap ordenado por (pontos, rating),
+    então cada par custa O(log n): o melhor da fila enfrenta o próximo mais próximo, evitando repetir
+    o último adversário quando há outra opção. Quem sobra continua na fila.
+    """
+    last_opponents = last_opponents or {}
+    heap = [(-(p.get('points') or 0), -(p.get('rating') or 1200), i, str(p['player_id'])) for i, p in enumerate(waiting)]
+    heapq.heapify(heap)
+
+    pairs = []
+    while len(heap) >= 2:
+        first = heapq.heappop(heap)
+        second = heapq.heappop(heap)
+        if last_opponents.get(first[3]) == second[3] and heap:
+            # Evita revanche imediata: troca pelo próximo da fila
+            second = heapq.heapreplace(heap, second)
+        pairs.append((first[3], second[3]))
+    return pairs